@@ -0,0 +1,529 @@
+# advisor.py
+
+import math
+import time
+from collections import OrderedDict, namedtuple
+from fractions import Fraction
+
+from effects import POISON, POISON_DAMAGE, POISON_TICKS
+from entities import EnemyGroup
+
+# Outcome values used by the search
+WIN_VALUE = 1.0
+FLEE_VALUE = 0.4  # Surviving by fleeing is better than dying, worse than winning
+LOSS_VALUE = 0.0
+
+FLEE_CHANCE = 0.5
+AMULET_DOUBLE_CHANCE = 0.25
+SHADOW_CLOAK_DODGE_CHANCE = 0.25
+FLAME_SWORD_DAMAGE = 10
+ENEMY_DAMAGE_CAP = 100
+MAX_TURN_CYCLE = 64  # Longest repeating turn order modelled exactly
+
+# Consumables that change the outcome of a fight; the rest only waste a turn
+DAMAGE_CONSUMABLES = {"Bomb": 20}  # Hits one enemy (a group's front member)
+AREA_DAMAGE_CONSUMABLES = {"Scroll of Fireball": 30, "Lightning Scroll": 40}  # Hits every member of a group
+HEALING_CONSUMABLES = {"Health Potion": 50, "Healing Herb": 40}
+POISON_CONSUMABLE = "Poison Dagger"
+POISON_MAX_STACKS = POISON.max_stacks
+
+ATTACK = "attack"
+SPECIAL = "special"
+FLEE = "flee"
+
+# Values that stay fixed for the whole fight. turn_order is one period of the initiative
+# order, True where the player acts and False where the enemy does. A group is one enemy
+# with its members' combined HP; enemy_members and enemy_member_hp (members alive and
+# their average HP when the fight was described) let area damage hit each of them.
+CombatParams = namedtuple("CombatParams", [
+    "player_attack", "player_max_hp", "pages", "enemy_attack", "enemy_defense",
+    "special_attack_chance", "dungeon_level", "weapon", "armor", "turn_order",
+    "enemy_members", "enemy_member_hp",
+], defaults=(1, 0))
+
+# Values that change from action to action; small and hashable so it can key the transposition
+# table. turn is the position in params.turn_order of whoever acts next. Poison on the enemy
+# deals poison_damage for each of the next poison_ticks enemy turns.
+CombatState = namedtuple("CombatState", [
+    "player_hp", "enemy_hp", "special_ready", "consumables", "turn", "poison_damage", "poison_ticks",
+], defaults=(0, 0))
+
+Advice = namedtuple("Advice", ["action", "value", "depth"])
+
+FightOdds = namedtuple("FightOdds", ["win_probability", "expected_turns", "expected_hp_left"])
+
+
+def turn_cycle(scheduler, current=None):
+    """
+    Return one period of a player-versus-enemy initiative order.
+
+    With fixed speeds the order repeats every (player speed + enemy speed) / gcd actions,
+    so searching over this cycle follows the game's schedule exactly.
+
+    Args:
+        scheduler (TurnScheduler): The fight's scheduler.
+        current (str): Who is acting right now, if the scheduler already handed out that
+            action; the cycle then starts with it.
+    """
+    ratio = (Fraction(scheduler.speed("player")).limit_denominator(1000)
+             / Fraction(scheduler.speed("enemy")).limit_denominator(1000))
+    length = min(ratio.numerator + ratio.denominator, MAX_TURN_CYCLE)
+    order = [current] if current is not None else []
+    order += scheduler.upcoming(length - len(order))
+    return tuple(actor == "player" for actor in order)
+
+
+def enemy_totals(enemy):
+    """Return (HP, attack) of an enemy; groups are modelled as one enemy with their combined HP and attack."""
+    if isinstance(enemy, EnemyGroup):
+        return enemy.total_hp(), enemy.total_attack()
+    return enemy.hp, enemy.attack
+
+
+def snapshot_combat(game, enemy, scheduler=None):
+    """
+    Build the compact combat description used by the advisor.
+
+    Args:
+        game (Game): The running game.
+        enemy (Enemy): The enemy being fought.
+        scheduler (TurnScheduler): The running fight's initiative order, during the player's
+            action; a fresh fight is assumed if not given.
+
+    Returns:
+        tuple: (CombatParams, CombatState)
+    """
+    if scheduler is None:
+        turn_order = turn_cycle(game.new_turn_scheduler())
+    else:
+        turn_order = turn_cycle(scheduler, current="player")
+    player = game.player
+    enemy_hp, enemy_attack = enemy_totals(enemy)
+    members = enemy.alive_count() if isinstance(enemy, EnemyGroup) else 1
+    weapon = player.inventory.equipped_weapon
+    armor = player.inventory.equipped_armor
+    params = CombatParams(
+        player_attack=player.attack,
+        player_max_hp=player.max_hp,
+        pages=player.pages,
+        enemy_attack=enemy_attack,
+        enemy_defense=enemy.defense,
+        special_attack_chance=enemy.special_attack_chance,
+        dungeon_level=game.current_dungeon_level,
+        weapon=weapon.name if weapon else None,
+        armor=armor.name if armor else None,
+        turn_order=turn_order,
+        enemy_members=members,
+        enemy_member_hp=enemy_hp / members if members else 0,
+    )
+    counts = {}
+    for entry in player.inventory.entries:
+        item = entry.item
+        if item.type == "consumable" and _models_consumable(item.name):
+            counts[item.name] = counts.get(item.name, 0) + entry.count
+    poison_damage = poison_ticks = 0
+    for effect in game.effects.active("enemy"):
+        if effect.kind is POISON and effect.expires_at is not None:
+            poison_damage, poison_ticks = effect.magnitude, effect.expires_at - game.effects.tick
+    state = CombatState(
+        player_hp=player.hp,
+        enemy_hp=enemy_hp,
+        special_ready=player.special_ability_ready,
+        consumables=tuple(sorted(counts.items())),
+        turn=0,
+        poison_damage=poison_damage,
+        poison_ticks=poison_ticks,
+    )
+    return params, state
+
+
+def _models_consumable(name):
+    return (name in DAMAGE_CONSUMABLES or name in AREA_DAMAGE_CONSUMABLES or name in HEALING_CONSUMABLES
+            or name == POISON_CONSUMABLE)
+
+
+def player_attack_outcomes(params):
+    """Return [(probability, damage)] for a regular attack, mirroring Game.player_attack."""
+    base = max(0, params.player_attack - params.enemy_defense) + params.pages * 2
+    if params.weapon == "Amulet of Strength":
+        outcomes = [(AMULET_DOUBLE_CHANCE, base * 2), (1 - AMULET_DOUBLE_CHANCE, base)]
+    else:
+        outcomes = [(1.0, base)]
+    if params.weapon == "Flame Sword":
+        outcomes = [(p, dmg + FLAME_SWORD_DAMAGE) for p, dmg in outcomes]
+    return outcomes
+
+
+def special_ability_damage(params):
+    """Return the damage of the special ability, mirroring Game.player_use_special_ability."""
+    return max(0, params.player_attack * 2 - params.enemy_defense) + params.pages * 3
+
+
+def enemy_attack_outcomes(params):
+    """Return [(probability, damage)] for one enemy turn, mirroring Game.enemy_turn."""
+    outcomes = []
+    attack = params.enemy_attack
+    for p, raw in ((params.special_attack_chance, attack * 2), (1 - params.special_attack_chance, attack)):
+        if p <= 0:
+            continue
+        damage = min(raw, ENEMY_DAMAGE_CAP) + params.dungeon_level
+        if params.armor == "Guardian Shield":
+            damage = int(damage * 0.9)
+        outcomes.append((p, damage))
+    if params.armor == "Shadow Cloak":
+        dodged = [(p * SHADOW_CLOAK_DODGE_CHANCE, 0) for p, _ in outcomes]
+        hit = [(p * (1 - SHADOW_CLOAK_DODGE_CHANCE), dmg) for p, dmg in outcomes]
+        outcomes = dodged + hit
+    return outcomes
+
+
+def _advance(params, state):
+    return state._replace(turn=(state.turn + 1) % len(params.turn_order))
+
+
+def area_damage(params, state, amount):
+    """
+    Damage an area attack deals to the enemy's combined HP.
+
+    Each member still standing takes amount; how many stand is estimated from the HP left,
+    as if it were spread evenly over them.
+    """
+    members = 1
+    if params.enemy_members > 1 and params.enemy_member_hp > 0:
+        members = min(params.enemy_members, math.ceil(state.enemy_hp / params.enemy_member_hp))
+    return min(state.enemy_hp, amount * members)
+
+
+def poison_per_tick(params):
+    """Poison damage per tick from one Poison Dagger, mirroring Game.use_consumable_in_combat."""
+    return (POISON_DAMAGE + params.pages) // POISON_TICKS
+
+
+def _poison_tick(state):
+    """
+    Run the enemy's poison for one tick.
+
+    Effects tick once per base action time; the model ticks once per enemy turn, which is
+    the same unless haste or slow change the enemy's speed.
+    """
+    if not state.poison_ticks:
+        return state
+    ticks = state.poison_ticks - 1
+    return state._replace(enemy_hp=state.enemy_hp - state.poison_damage, poison_ticks=ticks,
+                          poison_damage=state.poison_damage if ticks else 0)
+
+
+def _enemy_turn_outcomes(params, state):
+    state = _poison_tick(state)
+    after = _advance(params, state)
+    if state.enemy_hp <= 0:
+        return [(1.0, after)]  # The poison finished it off
+    return [(p, after._replace(player_hp=state.player_hp - dmg)) for p, dmg in enemy_attack_outcomes(params)]
+
+
+def legal_actions(state):
+    """List the actions available in a combat state."""
+    actions = [ATTACK]
+    for name, count in state.consumables:
+        if count > 0:
+            actions.append(name)
+    if state.special_ready:
+        actions.append(SPECIAL)
+    actions.append(FLEE)
+    return actions
+
+
+def _use_consumable(state, name):
+    consumables = tuple((n, c - 1 if n == name else c) for n, c in state.consumables)
+    return state._replace(consumables=tuple((n, c) for n, c in consumables if c > 0))
+
+
+def _is_terminal(state):
+    return state.enemy_hp <= 0 or state.player_hp <= 0
+
+
+def _policy_turn_outcomes(params, state):
+    """The fixed fight policy: spend the special ability as soon as it is ready, otherwise attack."""
+    after = _advance(params, state)
+    if state.special_ready:
+        return [(1.0, after._replace(enemy_hp=state.enemy_hp - special_ability_damage(params), special_ready=False))]
+    return [(p, after._replace(enemy_hp=state.enemy_hp - dmg)) for p, dmg in player_attack_outcomes(params)]
+
+
+def _fight_round(params, state):
+    """
+    Play the fixed fight policy from state.turn to the end of the turn cycle.
+
+    Returns:
+        list: (probability, player_turns, next_state) for every distinct end state, where
+        player_turns is the probability-weighted number of player actions taken on the way.
+    """
+    reached = {state: [1.0, 0.0]}
+    for turn in range(state.turn, len(params.turn_order)):
+        player_acts = params.turn_order[turn]
+        after = {}
+        for current, (p, turns) in reached.items():
+            if _is_terminal(current):
+                outcomes = [(1.0, current)]
+            elif player_acts:
+                turns += p
+                outcomes = _policy_turn_outcomes(params, current)
+            else:
+                outcomes = _enemy_turn_outcomes(params, current)
+            for q, nxt in outcomes:
+                # The player-turn count is split between outcomes like the probability
+                entry = after.setdefault(nxt, [0.0, 0.0])
+                entry[0] += p * q
+                entry[1] += turns * q
+        reached = after
+    return [(p, turns, nxt) for nxt, (p, turns) in reached.items()]
+
+
+class OutcomeCalculator:
+    """
+    Exact odds of a fight, by memoized dynamic programming over the combat Markov chain.
+
+    The only randomness in a fight is a handful of Bernoulli events (enemy special
+    attacks, Amulet double damage, Shadow Cloak dodges), so every reachable state can be
+    enumerated instead of sampling fights. Steps of the chain are whole turn cycles, so
+    haste and slow are followed exactly. Consumables and fleeing are not modelled.
+    """
+
+    def __init__(self, params):
+        self.params = params
+        self.memo = {}
+
+    def odds(self, state):
+        """
+        Compute the outcome of fighting to the end from the given state.
+
+        Args:
+            state (CombatState): The state to start from.
+
+        Returns:
+            FightOdds: Win probability, expected player turns and expected HP left (0 on a loss).
+        """
+        state = state._replace(consumables=())
+        # Depth-first over the state graph with an explicit stack, since long fights would
+        # overflow the recursion limit. The graph is acyclic apart from rounds where nothing
+        # changes (e.g. a dodge against zero damage), which are solved in closed form below.
+        stack = [state]
+        while stack:
+            current = stack[-1]
+            if current in self.memo:
+                stack.pop()
+                continue
+            transitions = _fight_round(self.params, current)
+            pending = [nxt for _, _, nxt in transitions
+                       if nxt != current and not _is_terminal(nxt) and nxt not in self.memo]
+            if pending:
+                stack.extend(pending)
+                continue
+            self.memo[current] = self._solve(current, transitions)
+            stack.pop()
+        return self.memo[state]
+
+    def _solve(self, state, transitions):
+        win = turns = hp_left = 0.0
+        p_self = turns_self = 0.0
+        for p, round_turns, nxt in transitions:
+            if nxt == state:
+                p_self += p
+                turns_self += round_turns
+                continue
+            if nxt.enemy_hp <= 0:
+                outcome = FightOdds(1.0, 0.0, float(nxt.player_hp))
+            elif nxt.player_hp <= 0:
+                outcome = FightOdds(0.0, 0.0, 0.0)
+            else:
+                outcome = self.memo[nxt]
+            win += p * outcome.win_probability
+            turns += round_turns + p * outcome.expected_turns
+            hp_left += p * outcome.expected_hp_left
+        if p_self >= 1.0:
+            # Neither side can ever hurt the other
+            return FightOdds(0.0, math.inf, float(state.player_hp))
+        # V = turns_self + p_self * V + rest  =>  V = (rest + turns_self) / (1 - p_self) for turns
+        scale = 1.0 / (1.0 - p_self)
+        return FightOdds(win * scale, (turns + turns_self) * scale, hp_left * scale)
+
+
+def fight_odds(game, enemy, player_hp=None):
+    """
+    Exact odds of fighting an enemy to the end with the current player.
+
+    Args:
+        game (Game): The running game.
+        enemy (Enemy): The enemy or boss to fight.
+        player_hp (int): Starting HP; defaults to the player's current HP.
+
+    Returns:
+        FightOdds: Win probability, expected turns and expected HP left.
+    """
+    params, state = snapshot_combat(game, enemy)
+    if player_hp is not None:
+        state = state._replace(player_hp=player_hp)
+    return OutcomeCalculator(params).odds(state)
+
+
+def room_fight_odds(game, mob, pack_sizes):
+    """
+    Odds of clearing a monster room, whose mob may come alone or in a pack.
+
+    Args:
+        game (Game): The running game.
+        mob (Enemy): One of the room's enemies.
+        pack_sizes (dict): Weight of each pack size, as the room draws it.
+
+    Returns:
+        FightOdds: The odds against each pack size, weighted by how often it is drawn.
+    """
+    total = sum(pack_sizes.values())
+    win = turns = hp_left = 0.0
+    for size, weight in pack_sizes.items():
+        odds = fight_odds(game, mob if size == 1 else EnemyGroup.of(mob, size))
+        share = weight / total
+        win += share * odds.win_probability
+        turns += share * odds.expected_turns
+        hp_left += share * odds.expected_hp_left
+    return FightOdds(win, turns, hp_left)
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+class CombatAdvisor:
+    """
+    Expectimax search over the combat decisions (attack, consumable, special ability, flee).
+
+    Player decisions and enemy attacks alternate as the turn order says, so a hasted
+    player gets several decisions per enemy attack. Depth counts enemy turns. The search
+    deepens iteratively until the time budget is spent and keeps a bounded LRU
+    transposition table, so positions reached again are not searched twice.
+    """
+
+    def __init__(self, time_budget=0.05, table_size=100000):
+        self.time_budget = time_budget
+        self.table_size = table_size
+        self.table = OrderedDict()
+        self._deadline = None
+
+    def advise(self, params, state, time_budget=None):
+        """
+        Pick the best action for the given combat state.
+
+        Args:
+            params (CombatParams): The fixed values of the fight.
+            state (CombatState): The current state of the fight.
+            time_budget (float): Seconds to search; defaults to the advisor's budget.
+
+        Returns:
+            Advice: The chosen action, its expected value and the depth searched.
+        """
+        budget = self.time_budget if time_budget is None else time_budget
+        self._deadline = time.perf_counter() + budget
+        # Always have an answer, even if the first iteration cannot finish
+        best = Advice(ATTACK, self._estimate(params, state), 0)
+        depth = 1
+        while True:
+            try:
+                values = [(self._action_value(params, state, action, depth), action) for action in legal_actions(state)]
+            except _SearchTimeout:
+                break
+            value, action = max(values, key=lambda va: va[0])
+            best = Advice(action, value, depth)
+            if time.perf_counter() >= self._deadline or depth >= 64:
+                break
+            depth += 1
+        return best
+
+    def advise_for_game(self, game, enemy, time_budget=None, scheduler=None):
+        """Shortcut for advise() on a live game and enemy."""
+        params, state = snapshot_combat(game, enemy, scheduler)
+        return self.advise(params, state, time_budget)
+
+    def _lookup(self, key):
+        value = self.table.get(key)
+        if value is not None:
+            self.table.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        self.table[key] = value
+        self.table.move_to_end(key)
+        if len(self.table) > self.table_size:
+            self.table.popitem(last=False)
+
+    def _value(self, params, state, depth):
+        if state.enemy_hp <= 0:
+            return WIN_VALUE
+        if state.player_hp <= 0:
+            return LOSS_VALUE
+        if depth == 0:
+            return self._estimate(params, state)
+        key = (params, state, depth)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        if time.perf_counter() >= self._deadline:
+            raise _SearchTimeout()
+        if params.turn_order[state.turn]:
+            value = max(self._action_value(params, state, action, depth) for action in legal_actions(state))
+        else:
+            value = sum(p * self._value(params, nxt, depth - 1) for p, nxt in _enemy_turn_outcomes(params, state))
+        self._store(key, value)
+        return value
+
+    def _action_value(self, params, state, action, depth):
+        if action == FLEE:
+            # A failed flee still uses up the turn
+            return FLEE_CHANCE * FLEE_VALUE + (1 - FLEE_CHANCE) * self._value(params, _advance(params, state), depth)
+        return sum(p * self._value(params, _advance(params, nxt), depth)
+                   for p, nxt in self._player_action_outcomes(params, state, action))
+
+    def _player_action_outcomes(self, params, state, action):
+        if action == ATTACK:
+            return [(p, state._replace(enemy_hp=state.enemy_hp - dmg)) for p, dmg in player_attack_outcomes(params)]
+        if action == SPECIAL:
+            return [(1.0, state._replace(enemy_hp=state.enemy_hp - special_ability_damage(params), special_ready=False))]
+        used = _use_consumable(state, action)
+        if action in DAMAGE_CONSUMABLES:
+            return [(1.0, used._replace(enemy_hp=state.enemy_hp - DAMAGE_CONSUMABLES[action]))]
+        if action in AREA_DAMAGE_CONSUMABLES:
+            damage = area_damage(params, state, AREA_DAMAGE_CONSUMABLES[action])
+            return [(1.0, used._replace(enemy_hp=state.enemy_hp - damage))]
+        if action == POISON_CONSUMABLE:
+            # Stacks like the POISON effect: the damage adds up to POISON_MAX_STACKS doses and the duration restarts
+            per_tick = poison_per_tick(params)
+            damage = min(state.poison_damage + per_tick, per_tick * POISON_MAX_STACKS)
+            return [(1.0, used._replace(poison_damage=damage, poison_ticks=POISON_TICKS))]
+        heal = HEALING_CONSUMABLES[action] + params.pages * 2
+        return [(1.0, used._replace(player_hp=min(state.player_hp + heal, params.player_max_hp)))]
+
+    def _estimate(self, params, state):
+        """Cheap leaf evaluation: compare how long each side needs to win the damage race."""
+        poisoned_hp = max(0, state.enemy_hp - state.poison_damage * state.poison_ticks)
+        if poisoned_hp <= 0:
+            return WIN_VALUE
+        player_damage = sum(p * dmg for p, dmg in player_attack_outcomes(params))
+        if player_damage <= 0:
+            return LOSS_VALUE
+        enemy_damage = sum(p * dmg for p, dmg in enemy_attack_outcomes(params))
+        if enemy_damage <= 0:
+            return WIN_VALUE
+        player_share = sum(params.turn_order) / len(params.turn_order)
+        time_to_win = math.ceil(poisoned_hp / player_damage) / player_share
+        time_to_lose = math.ceil(state.player_hp / enemy_damage) / (1 - player_share)
+        return time_to_lose / (time_to_win + time_to_lose)
+
+
+def describe_action(action):
+    """Return a short, player-facing label for an advisor action."""
+    if action == ATTACK:
+        return "Attack ⚔️"
+    if action == SPECIAL:
+        return "Use Special Ability 🌟"
+    if action == FLEE:
+        return "Flee 🏃‍♂️"
+    return f"Use {action} 🔥"
@@ -0,0 +1,330 @@
+# broadcast.py
+
+import argparse
+import os
+import queue
+import socket
+import struct
+import threading
+import zlib
+from collections import namedtuple
+
+from utils import (
+    add_screen_listener, remove_screen_listener, get_input_source, set_input_source, current_console,
+    output_stream, set_output_stream
+)
+
+DEFAULT_PORT = 7777
+DEFAULT_QUEUE_SIZE = 32  # Frames a viewer may fall behind before it starts missing frames
+COMPRESSION_LEVEL = 6
+MAX_SCREEN = 32 * 1024  # Characters of one screen that are sent; also the zlib window
+
+# Frame kinds
+FULL = 0  # The whole screen as UTF-8
+ZFULL = 1  # The whole screen, deflated
+ZDELTA = 2  # Deflated with the previous screen as preset dictionary; needs that screen to decode
+
+Frame = namedtuple("Frame", ["seq", "kind", "payload"])
+_HEADER = struct.Struct("<IBI")  # seq, kind, payload length
+
+
+class Viewer:
+    """
+    One spectator's bounded frame queue.
+
+    The player's thread never waits on a viewer: when the queue is full the frame is
+    dropped, and since the next delta would then not apply, the viewer is sent a full
+    frame as soon as there is room again.
+    """
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE):
+        self._queue = queue.Queue(queue_size)
+        self.needs_full_frame = True  # Also true for a new viewer, which has no screen yet
+        self.dropped = 0
+
+    def offer(self, frame):
+        """Queue a frame without blocking; returns False if it was dropped."""
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def get(self, timeout=None):
+        """
+        Wait for the next frame.
+
+        Returns:
+            Frame: The frame, or None once the broadcast is over.
+
+        Raises:
+            queue.Empty: If timeout seconds pass without a frame.
+        """
+        return self._queue.get(timeout=timeout)
+
+    def close(self):
+        # A viewer too far behind for the end marker loses its backlog: dropping only the
+        # oldest frame would leave deltas that no longer apply
+        while True:
+            try:
+                self._queue.put_nowait(None)
+                return
+            except queue.Full:
+                while True:
+                    try:
+                        self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+
+class _Tee:
+    """Output stream that also hands everything written to the broadcaster."""
+
+    def __init__(self, stream, broadcaster):
+        self._stream = stream
+        self._broadcaster = broadcaster
+
+    def write(self, text):
+        self._broadcaster.write(text)
+        return self._stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class Broadcaster:
+    """
+    Stream a live session to any number of read-only viewers.
+
+    Everything printed since the screen was last cleared makes up the screen. Whenever
+    the game waits for input, the screen is published as one frame if it changed. A frame
+    is encoded once and the same bytes go to every viewer: a deflated delta against the
+    previous screen (which it mostly repeats) for viewers that have that screen, and one
+    shared full frame for viewers that joined late or dropped a frame.
+
+    start() hooks a broadcaster into the current console (see utils.Console); a
+    broadcaster can also be driven directly, as a console's output stream (write, clear)
+    with input read through read().
+    """
+
+    def __init__(self, compress=True, queue_size=DEFAULT_QUEUE_SIZE):
+        self.compress = compress
+        self.queue_size = queue_size
+        self.frames = 0
+        self.encoded_bytes = 0
+        self._viewers = []
+        self._lock = threading.Lock()
+        self._screen = []  # Text of the current screen
+        self._changed = False
+        self._previous = b""  # Screen sent in the last frame
+        self._capturing = True
+        self._stream = None
+        self._source = None
+
+    def subscribe(self):
+        """Add a viewer; its first frame is a full one."""
+        viewer = Viewer(self.queue_size)
+        with self._lock:
+            self._viewers.append(viewer)
+        return viewer
+
+    def unsubscribe(self, viewer):
+        with self._lock:
+            if viewer in self._viewers:
+                self._viewers.remove(viewer)
+
+    @property
+    def viewer_count(self):
+        return len(self._viewers)
+
+    def start(self):
+        """Start capturing the current console's output and publishing a frame before every read of input."""
+        self._stream = current_console().stream
+        set_output_stream(_Tee(output_stream(), self))
+        add_screen_listener(self.clear)
+        self._source = get_input_source()
+        set_input_source(self._input)
+
+    def stop(self):
+        """Publish the final screen, stop capturing and end every viewer's stream."""
+        set_input_source(self._source)
+        remove_screen_listener(self.clear)
+        set_output_stream(self._stream)
+        self.close()
+
+    def close(self):
+        """Publish the final screen and end every viewer's stream."""
+        self.publish()
+        with self._lock:
+            viewers, self._viewers = self._viewers, []
+        for viewer in viewers:
+            viewer.close()
+
+    def write(self, text):
+        """Add text to the current screen."""
+        if self._capturing and text:
+            self._screen.append(text)
+            self._changed = True
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def clear(self):
+        """Start a new, empty screen."""
+        self._screen = []
+        self._changed = True
+
+    def read(self, source, prompt=""):
+        """Publish the screen, then read a line of input from source (called like input())."""
+        self.write(prompt)
+        self.publish()
+        # input() echoes the prompt through stdout; it is already on the screen
+        self._capturing = False
+        try:
+            line = source(prompt)
+        finally:
+            self._capturing = True
+        self.write(line + "\n")  # Let viewers see what the player chose
+        return line
+
+    def _input(self, prompt=""):
+        return self.read(self._source, prompt)
+
+    def publish(self):
+        """Send the current screen to every viewer if it changed since the last frame."""
+        if not self._changed:
+            return
+        self._changed = False
+        text = "".join(self._screen)[-MAX_SCREEN:]
+        self._screen = [text]
+        screen = text.encode("utf-8")
+        self.frames += 1
+        with self._lock:
+            viewers = list(self._viewers)
+        delta = full = None
+        for viewer in viewers:
+            if viewer.needs_full_frame:
+                if full is None:
+                    full = self._encode(screen, None)
+                frame = full
+            else:
+                if delta is None:
+                    delta = self._encode(screen, self._previous)
+                frame = delta
+            # Only a viewer that got this frame has the screen the next delta builds on
+            viewer.needs_full_frame = not viewer.offer(frame)
+        self._previous = screen
+
+    def _encode(self, screen, previous):
+        if not self.compress:
+            kind, payload = FULL, screen
+        elif previous:
+            encoder = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15, zdict=previous)
+            kind, payload = ZDELTA, encoder.compress(screen) + encoder.flush()
+        else:
+            encoder = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15)
+            kind, payload = ZFULL, encoder.compress(screen) + encoder.flush()
+        self.encoded_bytes += len(payload)
+        return Frame(self.frames, kind, payload)
+
+
+class FrameDecoder:
+    """Rebuild screens from the frames sent to one viewer, in order."""
+
+    def __init__(self):
+        self.screen = b""
+
+    def decode(self, frame):
+        """Apply a frame and return the screen it shows, as text."""
+        if frame.kind == FULL:
+            screen = frame.payload
+        elif frame.kind == ZFULL:
+            screen = zlib.decompress(frame.payload, -15)
+        else:
+            decoder = zlib.decompressobj(-15, zdict=self.screen)
+            screen = decoder.decompress(frame.payload) + decoder.flush()
+        self.screen = screen
+        return screen.decode("utf-8")
+
+
+def serve(broadcaster, host="", port=DEFAULT_PORT):
+    """
+    Accept spectators over TCP in the background.
+
+    Each connection gets its own Viewer and sender thread, so a slow network only makes
+    that viewer drop frames. Frames are sent as a header (seq, kind, length) and payload.
+
+    Returns:
+        socket.socket: The listening socket; close it to stop accepting viewers.
+    """
+    server = socket.create_server((host, port))
+
+    def send_frames(conn, viewer):
+        try:
+            with conn:
+                while True:
+                    frame = viewer.get()
+                    if frame is None:
+                        return
+                    conn.sendall(_HEADER.pack(frame.seq, frame.kind, len(frame.payload)) + frame.payload)
+        except OSError:
+            pass  # The viewer went away
+        finally:
+            broadcaster.unsubscribe(viewer)
+
+    def accept():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return  # Server closed
+            threading.Thread(target=send_frames, args=(conn, broadcaster.subscribe()), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return server
+
+
+def _read_exact(conn, size):
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def watch(host, port=DEFAULT_PORT):
+    """Connect to a broadcast and show its screens until it ends."""
+    decoder = FrameDecoder()
+    with socket.create_connection((host, port)) as conn:
+        while True:
+            header = _read_exact(conn, _HEADER.size)
+            if header is None:
+                break
+            seq, kind, length = _HEADER.unpack(header)
+            payload = _read_exact(conn, length)
+            if payload is None:
+                break
+            screen = decoder.decode(Frame(seq, kind, payload))
+            os.system('cls' if os.name == 'nt' else 'clear')
+            print(screen, end="", flush=True)
+    print("\nThe broadcast has ended.")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Watch a Rogue Slayer session started with main.py --broadcast.")
+    parser.add_argument("host", nargs="?", default="localhost", help="Host running the session.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Broadcast port.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    watch(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# dungeon_map.py
+
+import heapq
+import random
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+from colorama import Fore, Style
+
+# Values in the entity layer
+EMPTY = 0
+PLAYER = 1
+ENEMY = 2
+
+DEFAULT_SIGHT_RADIUS = 6
+
+# 4-way movement; also what "adjacent" means for starting a fight
+STEPS = ((0, -1), (0, 1), (1, 0), (-1, 0))
+
+
+@lru_cache(maxsize=16)
+def _ray_offsets(radius):
+    """
+    Sample points along rays from the origin to every tile on the edge of a square of the
+    given radius. Returns (dx, dy, in_circle) arrays shaped (rays, samples).
+    """
+    edge = [(x, -radius) for x in range(-radius, radius + 1)]
+    edge += [(x, radius) for x in range(-radius, radius + 1)]
+    edge += [(-radius, y) for y in range(-radius + 1, radius)]
+    edge += [(radius, y) for y in range(-radius + 1, radius)]
+    ends = np.array(edge, dtype=np.float64)
+    t = np.linspace(0.0, 1.0, radius * 2 + 1)[1:]
+    dx = np.rint(ends[:, 0:1] * t).astype(np.int64)
+    dy = np.rint(ends[:, 1:2] * t).astype(np.int64)
+    in_circle = dx * dx + dy * dy <= radius * radius
+    return dx, dy, in_circle
+
+
+class DungeonMap:
+    """
+    A tile-level dungeon room stored as NumPy arrays.
+
+    Layers are walls, explored tiles (fog of war), currently visible tiles and entities.
+    Field of view is computed with vectorized ray casting and paths with A*. Walls are
+    fixed once a map is made, so the floor's connected regions are labelled once and
+    reused to turn down paths to unreachable tiles without searching.
+    """
+
+    def __init__(self, walls):
+        self.walls = walls
+        self.height, self.width = walls.shape
+        self.explored = np.zeros_like(walls, dtype=bool)
+        self.visible = np.zeros_like(walls, dtype=bool)
+        self.entities = np.zeros(walls.shape, dtype=np.int8)
+        self._regions = None  # Region number of every floor tile, row-major; see regions()
+
+    @staticmethod
+    def generate(width, height, obstacle_density=0.12, rng=random):
+        """
+        Generate a walled room with scattered pillars.
+
+        Args:
+            width (int): Width in tiles, including the outer walls.
+            height (int): Height in tiles, including the outer walls.
+            obstacle_density (float): Share of interior tiles that become pillars.
+            rng (random.Random): Where the pillars are drawn from; pass the game's so runs replay.
+        """
+        walls = np.zeros((height, width), dtype=bool)
+        walls[0, :] = walls[-1, :] = True
+        walls[:, 0] = walls[:, -1] = True
+        interior = (height - 2) * (width - 2)
+        for _ in range(int(interior * obstacle_density)):
+            walls[rng.randint(1, height - 2), rng.randint(1, width - 2)] = True
+        return DungeonMap(walls)
+
+    def is_floor(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and not self.walls[y, x]
+
+    def place(self, entity, x, y):
+        self.entities[y, x] = entity
+
+    def find(self, entity):
+        ys, xs = np.nonzero(self.entities == entity)
+        return (int(xs[0]), int(ys[0])) if len(xs) else None
+
+    def move(self, entity, dx, dy):
+        """Move an entity one step if the target tile is free floor; returns True on success."""
+        x, y = self.find(entity)
+        nx, ny = x + dx, y + dy
+        if not self.is_floor(nx, ny) or self.entities[ny, nx] != EMPTY:
+            return False
+        self.entities[y, x] = EMPTY
+        self.entities[ny, nx] = entity
+        return True
+
+    def random_floor(self, far_from=None, min_distance=0, rng=random):
+        """Pick a random free floor tile, optionally at least min_distance steps from a point."""
+        ys, xs = np.nonzero(~self.walls & (self.entities == EMPTY))
+        if far_from is not None and min_distance:
+            far = np.abs(xs - far_from[0]) + np.abs(ys - far_from[1]) >= min_distance
+            if far.any():
+                ys, xs = ys[far], xs[far]
+        idx = rng.randrange(len(xs))
+        return int(xs[idx]), int(ys[idx])
+
+    def compute_fov(self, x, y, radius=DEFAULT_SIGHT_RADIUS):
+        """
+        Recompute the visible layer from (x, y) and add it to the explored layer.
+
+        Every ray is walked at once: a sample is visible if no wall comes before it on its
+        ray, so walls themselves are lit but hide what is behind them.
+        """
+        dx, dy, in_circle = _ray_offsets(radius)
+        xs, ys = dx + x, dy + y
+        in_bounds = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        cx, cy = np.clip(xs, 0, self.width - 1), np.clip(ys, 0, self.height - 1)
+        blocking = self.walls[cy, cx] | ~in_bounds
+        walls_before = np.cumsum(blocking, axis=1) - blocking
+        seen = (walls_before == 0) & in_bounds & in_circle
+        self.visible[:] = False
+        self.visible[cy[seen], cx[seen]] = True
+        self.visible[y, x] = True
+        self.explored |= self.visible
+        return self.visible
+
+    def regions(self):
+        """
+        Label the 4-connected areas of floor, computed on first use.
+
+        Returns:
+            list: The region number of every tile in row-major order, -1 for walls.
+        """
+        if self._regions is None:
+            width, size = self.width, self.width * self.height
+            labels = [-1 if wall else None for wall in self.walls.ravel().tolist()]
+            region = 0
+            for seed in range(size):
+                if labels[seed] is not None:
+                    continue
+                labels[seed] = region
+                queue = deque([seed])
+                while queue:
+                    idx = queue.popleft()
+                    x = idx % width
+                    for nidx in (idx - width, idx + width, idx + 1 if x + 1 < width else -1, idx - 1 if x else -1):
+                        if 0 <= nidx < size and labels[nidx] is None:
+                            labels[nidx] = region
+                            queue.append(nidx)
+                region += 1
+            self._regions = labels
+        return self._regions
+
+    def _regions_touching(self, idx, labels):
+        """The regions a path can start or end in at a tile: its own, or its neighbours' if it is a wall."""
+        if labels[idx] >= 0:
+            return {labels[idx]}
+        x, y = idx % self.width, idx // self.width
+        return {labels[ny * self.width + nx] for nx, ny in ((x + dx, y + dy) for dx, dy in STEPS)
+                if self.is_floor(nx, ny)}
+
+    def find_path(self, start, goal, passable=None, max_cost=None):
+        """
+        A* over 4-connected floor tiles.
+
+        With the default floor mask, a goal in another region than start is turned down at
+        once instead of by searching every tile start can reach.
+
+        Args:
+            start (tuple): (x, y) to start from.
+            goal (tuple): (x, y) to reach; may be occupied (e.g. by the enemy).
+            passable (ndarray): Optional boolean mask of walkable tiles; defaults to floor.
+            max_cost (int): Optional longest path to look for; tiles that cannot be on a
+                path that short are not searched.
+
+        Returns:
+            list: The (x, y) steps after start up to and including goal, or None.
+        """
+        width, height = self.width, self.height
+        start_idx = start[1] * width + start[0]
+        goal_idx = goal[1] * width + goal[0]
+        gx, gy = goal
+        distance = abs(start[0] - gx) + abs(start[1] - gy)
+        if max_cost is not None and distance > max_cost:
+            return None
+        if passable is None:
+            passable = ~self.walls
+            labels = self.regions()
+            if distance > 1 and not (self._regions_touching(start_idx, labels)
+                                     & self._regions_touching(goal_idx, labels)):
+                return None
+        # Plain lists are much faster than NumPy for the per-node lookups below
+        flat_passable = passable.ravel().tolist()
+        cost = {start_idx: 0}
+        came_from = {}
+        # Ties on f are broken towards the deepest node, which keeps open areas cheap
+        frontier = [(distance, 0, start_idx)]
+        while frontier:
+            _, neg_cost, idx = heapq.heappop(frontier)
+            current_cost = -neg_cost
+            if idx == goal_idx:
+                path = []
+                while idx != start_idx:
+                    path.append((idx % width, idx // width))
+                    idx = came_from[idx]
+                return path[::-1]
+            if current_cost > cost[idx]:
+                continue
+            x, y = idx % width, idx // width
+            for dx, dy in STEPS:
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < width and 0 <= ny < height):
+                    continue
+                nidx = ny * width + nx
+                if not flat_passable[nidx] and nidx != goal_idx:
+                    continue
+                new_cost = current_cost + 1
+                if new_cost < cost.get(nidx, new_cost + 1):
+                    estimate = new_cost + abs(nx - gx) + abs(ny - gy)
+                    if max_cost is not None and estimate > max_cost:
+                        continue  # The distance left never overestimates, so no path that short goes through here
+                    cost[nidx] = new_cost
+                    came_from[nidx] = idx
+                    heapq.heappush(frontier, (estimate, -new_cost, nidx))
+        return None
+
+    def render(self):
+        """Render the map with fog of war: unexplored tiles blank, remembered tiles dimmed."""
+        tiles = np.where(self.walls, "#", ".").astype("<U1")
+        tiles[self.entities == ENEMY] = "E"
+        tiles[self.entities == PLAYER] = "@"
+        # Enemies are only shown where they can currently be seen
+        tiles[(self.entities == ENEMY) & ~self.visible] = "."
+        lines = []
+        for row_tiles, row_visible, row_explored in zip(tiles, self.visible, self.explored):
+            line = []
+            for tile, visible, explored in zip(row_tiles, row_visible, row_explored):
+                if visible:
+                    color = Fore.RED if tile == "E" else Fore.GREEN if tile == "@" else Fore.WHITE
+                    line.append(f"{color}{tile}{Style.RESET_ALL}")
+                elif explored:
+                    line.append(f"{Style.DIM}{tile}{Style.RESET_ALL}")
+                else:
+                    line.append(" ")
+            lines.append("".join(line))
+        return "\n".join(lines)
@@ -0,0 +1,197 @@
+# effects.py
+
+from dataclasses import dataclass
+from typing import Optional
+
+WHEEL_SIZE = 32  # Slots in the timer wheel; longer effects wait extra laps
+
+# Stacking rules for re-applying an effect that is still active
+REFRESH = "refresh"  # Restart the duration and keep the stronger magnitude
+STACK = "stack"  # Add the magnitude (up to max_stacks applications) and restart the duration
+IGNORE = "ignore"  # Keep the running effect unchanged
+
+# Events reported by EffectEngine.advance() and clear()
+TICK = "tick"
+EXPIRED = "expired"
+
+
+@dataclass(frozen=True)
+class EffectType:
+    name: str
+    emoji: str
+    stacking: str = REFRESH
+    stat: Optional[str] = None  # Stat raised by the magnitude while the effect lasts, via set_modifier()
+    damage_over_time: bool = False  # Magnitude is dealt as damage every tick
+    max_stacks: int = 1
+
+
+POISON = EffectType("Poison", "☠️", stacking=STACK, damage_over_time=True, max_stacks=3)
+FORTITUDE = EffectType("Fortitude", "🛡️", stat="defense")
+EMPOWERED = EffectType("Empowered", "🔥", stat="attack")
+BLIND = EffectType("Blind", "🌑")
+
+# Tuning for the items and abilities that cause effects
+POISON_DAMAGE = 15  # Poison Dagger total damage, spread over POISON_TICKS
+POISON_TICKS = 3
+FORTITUDE_DEFENSE = 5  # Elixir of Fortitude, until the end of the next combat
+BLIND_CHANCE = 0.2  # Shadow Blade, per hit
+BLIND_TICKS = 2
+BLIND_MISS_CHANCE = 0.5
+
+
+class StatusEffect:
+    """One active effect on one target."""
+
+    __slots__ = ("kind", "owner", "target", "magnitude", "stacks", "expires_at")
+
+    def __init__(self, kind, owner, target, magnitude, expires_at):
+        self.kind = kind
+        self.owner = owner
+        self.target = target
+        self.magnitude = magnitude
+        self.stacks = 1
+        self.expires_at = expires_at  # Tick it ends on, or None to last until clear()
+
+
+class EffectEngine:
+    """
+    Timed status effects (buffs, debuffs, damage over time) on the player and enemies.
+
+    Expiries live in a hashed timer wheel: an effect ending on tick t sits in slot
+    t % WHEEL_SIZE, so each tick only looks at the one slot that can hold effects ending
+    now instead of scanning everything active. Re-applied effects are re-filed and
+    their old entries are skipped when reached. Effects are keyed by an owner name
+    ("player", "enemy") so the engine pickles with the game.
+    """
+
+    def __init__(self, wheel_size=WHEEL_SIZE):
+        self.tick = 0
+        self._wheel = [[] for _ in range(wheel_size)]
+        self._active = {}  # (owner, effect name) -> StatusEffect
+        self._damage_over_time = {}  # Same keys, only effects that deal damage every tick
+
+    def apply(self, owner, target, kind, magnitude=0, duration=None):
+        """
+        Apply an effect, or re-apply it following its stacking rule.
+
+        Args:
+            owner (str): Who the effect is on, e.g. "player" or "enemy".
+            target: The object whose HP the effect changes, or whose stats for effects with
+                a stat (it must then have set_modifier() and remove_modifier(), like Player).
+            kind (EffectType): The effect.
+            magnitude (int): Stat bonus, or damage per tick for damage over time.
+            duration (int): Ticks the effect lasts, or None to last until clear().
+
+        Returns:
+            StatusEffect: The active effect.
+        """
+        key = (owner, kind.name)
+        expires_at = None if duration is None else self.tick + duration
+        effect = self._active.get(key)
+        if effect is None:
+            effect = StatusEffect(kind, owner, target, magnitude, expires_at)
+            self._active[key] = effect
+            if kind.damage_over_time:
+                self._damage_over_time[key] = effect
+        elif kind.stacking == IGNORE:
+            return effect
+        else:
+            if kind.stacking == STACK and effect.stacks < kind.max_stacks:
+                effect.stacks += 1
+                effect.magnitude += magnitude
+            elif kind.stacking == REFRESH:
+                effect.magnitude = max(effect.magnitude, magnitude)
+            effect.expires_at = expires_at
+        if kind.stat is not None:
+            target.set_modifier(kind.name, kind.stat, effect.magnitude)
+        if expires_at is not None:
+            self._wheel[expires_at % len(self._wheel)].append(effect)
+        return effect
+
+    def has(self, owner, kind):
+        return (owner, kind.name) in self._active
+
+    def active(self, owner=None):
+        """List active effects, optionally only those on one owner."""
+        return [effect for effect in self._active.values() if owner is None or effect.owner == owner]
+
+    def advance(self, tick):
+        """
+        Run every tick up to and including the given one.
+
+        Returns:
+            list: (event, StatusEffect, amount) in order: TICK with the damage dealt,
+            EXPIRED with 0.
+        """
+        events = []
+        while self.tick < tick:
+            self.tick += 1
+            for effect in list(self._damage_over_time.values()):
+                effect.target.hp -= effect.magnitude
+                events.append((TICK, effect, effect.magnitude))
+            index = self.tick % len(self._wheel)
+            slot = self._wheel[index]
+            if not slot:
+                continue
+            waiting = []
+            for effect in slot:
+                if self._active.get((effect.owner, effect.kind.name)) is not effect:
+                    continue  # Already removed
+                if effect.expires_at == self.tick:
+                    self._remove(effect)
+                    events.append((EXPIRED, effect, 0))
+                elif effect.expires_at is not None and effect.expires_at > self.tick \
+                        and effect.expires_at % len(self._wheel) == index:
+                    waiting.append(effect)  # Ends on a later lap of the wheel
+            self._wheel[index] = waiting
+        return events
+
+    def copy(self, targets=None):
+        """
+        Return an independent engine with the same effects and timers.
+
+        Args:
+            targets (dict): Maps id() of a current target to the object the copy should act
+                on instead, e.g. a forked player; other targets are kept.
+        """
+        targets = targets or {}
+        clone = EffectEngine(len(self._wheel))
+        clone.tick = self.tick
+        copies = {}
+        for key, effect in self._active.items():
+            twin = StatusEffect(effect.kind, effect.owner, targets.get(id(effect.target), effect.target),
+                                effect.magnitude, effect.expires_at)
+            twin.stacks = effect.stacks
+            copies[id(effect)] = twin
+            clone._active[key] = twin
+            if key in self._damage_over_time:
+                clone._damage_over_time[key] = twin
+        # Stale wheel entries are dropped; they would only have been skipped
+        clone._wheel = [[copies[id(effect)] for effect in slot if id(effect) in copies] for slot in self._wheel]
+        return clone
+
+    def remove(self, owner, kind):
+        effect = self._active.get((owner, kind.name))
+        if effect is not None:
+            self._remove(effect)
+
+    def clear(self, owner=None):
+        """
+        End effects at once (e.g. when a fight is over), optionally only those on one owner.
+
+        Returns:
+            list: (EXPIRED, StatusEffect, 0) for every effect ended.
+        """
+        ended = self.active(owner)
+        for effect in ended:
+            self._remove(effect)
+        if not self._active:
+            self._wheel = [[] for _ in range(len(self._wheel))]
+        return [(EXPIRED, effect, 0) for effect in ended]
+
+    def _remove(self, effect):
+        key = (effect.owner, effect.kind.name)
+        del self._active[key]
+        self._damage_over_time.pop(key, None)
+        if effect.kind.stat is not None:
+            effect.target.remove_modifier(effect.kind.name)
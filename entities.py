@@ -1,9 +1,55 @@
 # entities.py
 
+import bisect
+import copy
+import heapq
+import itertools
 import random
-from dataclasses import dataclass, field
-from typing import List, Optional
+from array import array
+from collections import namedtuple
+from dataclasses import astuple, dataclass, field
+from typing import Dict, List, Optional
 from colorama import Fore, Style  # Importing necessary color constants
+from scheduler import BASE_SPEED
+from plugins import registry, dungeon_type as plugin_dungeon_type, ENEMIES, ITEMS, DUNGEONS, ACHIEVEMENTS
+
+
+KEY_COLORS = {
+    "Fire": Fore.RED,
+    "Ice": Fore.CYAN,
+    "Earth": Fore.GREEN,
+    "Lightning": Fore.YELLOW,
+    "Final": Fore.MAGENTA
+}
+
+# Enemies by dungeon type; "Normal" is for dungeon types without their own
+ENEMY_NAMES = {
+    "Fire": ["Flame Imp", "Lava Golem", "Ember Drake"],
+    "Ice": ["Frost Wraith", "Ice Elemental", "Glacial Yeti"],
+    "Earth": ["Stone Giant", "Mud Monster", "Terrakhan"],
+    "Lightning": ["Thunder Drake", "Electric Serpent", "Volt Phoenix"],
+    "Normal": ["Goblin", "Skeleton", "Orc", "Troll", "Bandit", "Dark Knight"]
+}
+
+
+def key_color(key_type):
+    """Color of a dungeon type's keys, including dungeon types added by content packs."""
+    color = KEY_COLORS.get(key_type)
+    if color is None:
+        dungeon = plugin_dungeon_type(key_type)
+        color = dungeon.key_color if dungeon else Fore.WHITE
+    return color
+
+
+def enemy_names(dungeon_type):
+    """Names of the enemies found in a dungeon type, with those added by content packs."""
+    names = list(ENEMY_NAMES.get(dungeon_type, ()))
+    dungeon = plugin_dungeon_type(dungeon_type)
+    if dungeon is not None:
+        names.extend(dungeon.enemy_names)
+    for pack in registry.load(ENEMIES, dungeon_type):
+        names.extend(pack)
+    return names or enemy_names("Normal")
 
 
 @dataclass
@@ -24,6 +70,10 @@ class Item:
     type: str = "equippable"  # 'consumable', 'weapon', 'armor', 'key'
     key_type: Optional[str] = None  # For keys
 
+    def stack_key(self):
+        """Identical items (every field equal) share one inventory stack."""
+        return astuple(self)
+
     def emoji(self):
         """Assign emojis and color codes based on item type and rarity."""
         rarity_colors = {
@@ -42,33 +92,365 @@ class Item:
         elif self.type == "consumable":
             return f"{color}🍎{Style.RESET_ALL}"
         elif self.type == "key":
-            key_colors = {
-                "Fire": Fore.RED,
-                "Ice": Fore.CYAN,
-                "Earth": Fore.GREEN,
-                "Lightning": Fore.YELLOW,
-                "Final": Fore.MAGENTA
-            }
-            key_color = key_colors.get(self.key_type, Fore.WHITE)
-            return f"{key_color}🔑{Style.RESET_ALL}"
+            return f"{key_color(self.key_type)}🔑{Style.RESET_ALL}"
         else:
             return f"{color}📦{Style.RESET_ALL}"
 
 
+@dataclass
+class InventoryEntry:
+    """A stack of identical items: one template Item and how many of it are held."""
+    item: Item
+    count: int = 1
+
+
+def _quantity(count):
+    return f" x{count}" if count > 1 else ""
+
+
+# Equipment slots, by the item type that goes in them, and the bonus an item gives in that slot
+EQUIPMENT_SLOTS = {"weapon": "attack_bonus", "armor": "defense_bonus"}
+_heap_order = itertools.count()  # Tie-breaker, so heap entries never compare stack keys
+
+
+class BestItemHeap:
+    """
+    Max-heap of the held stacks of one item name in one slot, by slot bonus.
+
+    Stacks that leave the inventory are not searched for: they are dropped once they
+    reach the top, and the heap is rebuilt if they ever make up most of it.
+    """
+
+    def __init__(self):
+        self.entries = []  # (-bonus, order, stack key)
+        self.live = 0  # Held stacks, i.e. entries that are not stale
+
+    def copy(self):
+        clone = BestItemHeap()
+        clone.entries = list(self.entries)
+        clone.live = self.live
+        return clone
+
+    def push(self, bonus, key):
+        heapq.heappush(self.entries, (-bonus, next(_heap_order), key))
+        self.live += 1
+
+    def top(self, stacks):
+        """The key of the held stack with the highest bonus, or None."""
+        entries = self.entries
+        if len(entries) > 2 * self.live + 16:
+            held = {}
+            for entry in entries:
+                if entry[2] in stacks:
+                    held.setdefault(entry[2], entry)  # A stack removed and added again is in twice
+            self.entries = entries = list(held.values())
+            heapq.heapify(entries)
+        while entries and entries[0][2] not in stacks:
+            heapq.heappop(entries)
+        return entries[0][2] if entries else None
+
+
+RARITIES = ("common", "uncommon", "rare", "epic", "legendary")  # Lowest to highest
+_RARITY_RANKS = {rarity: rank for rank, rarity in enumerate(RARITIES)}
+# Orders an inventory can be listed in; the first is the order items were picked up in
+INVENTORY_SORTS = ("acquired", "name", "rarity", "price")
+
+
+def _sort_key(item, seq, sort):
+    """Where a stack goes in a view; seq (unique per stack) breaks ties, so keys never compare equal."""
+    if sort == "acquired":
+        return (seq,)
+    name = item.name.lower()
+    if sort == "name":
+        return (name, seq)
+    if sort == "rarity":
+        return (-_RARITY_RANKS.get(item.rarity.lower(), -1), name, seq)
+    return (-item.price, name, seq)
+
+
+class InventoryView:
+    """
+    The held stacks of one item type and rarity (None for any), kept sorted one way.
+
+    Adding or removing a stack is a binary search and a list insert or delete, and a page
+    of the view is a slice of it, so listing a page does not depend on how much is held.
+    """
+
+    def __init__(self, item_type, rarity, sort):
+        self.item_type = item_type
+        self.rarity = rarity
+        self.sort = sort
+        self.entries = []  # sort key + (stack key,)
+
+    def copy(self):
+        clone = InventoryView(self.item_type, self.rarity, self.sort)
+        clone.entries = list(self.entries)
+        return clone
+
+    def matches(self, item):
+        return ((self.item_type is None or item.type == self.item_type)
+                and (self.rarity is None or item.rarity.lower() == self.rarity))
+
+    def add(self, item, seq, key):
+        bisect.insort(self.entries, _sort_key(item, seq, self.sort) + (key,))
+
+    def remove(self, item, seq):
+        del self.entries[bisect.bisect_left(self.entries, _sort_key(item, seq, self.sort))]
+
+    def span(self, prefix=""):
+        """(start, stop) of the entries whose name starts with prefix; only for views sorted by name."""
+        if not prefix:
+            return 0, len(self.entries)
+        prefix = prefix.lower()
+        return (bisect.bisect_left(self.entries, (prefix,)),
+                bisect.bisect_left(self.entries, (prefix + "\U0010ffff",)))
+
+
 @dataclass
 class Inventory:
-    items: List[Item] = field(default_factory=list)
+    """
+    The player's items, stacked: identical items share one entry with a count, so memory
+    and listing cost depend on the number of distinct items rather than the quantity.
+    """
+    stacks: Dict[tuple, InventoryEntry] = field(default_factory=dict)  # Item.stack_key() -> entry
     equipped_weapon: Optional[Item] = None
     equipped_armor: Optional[Item] = None
+    # Bumped whenever the equipment changes, so cached player stats know to recompute
+    revision: int = field(default=0, repr=False, compare=False)
+    type_counts: Dict[str, int] = field(default_factory=dict, repr=False, compare=False)  # Item type -> total held
+    # True while stacks and type_counts may be shared with a fork; the first change copies them
+    _shared: bool = field(default=False, init=False, repr=False, compare=False)
+    # Slot -> item name -> BestItemHeap of the equipment held; built on first use, then kept up to date
+    _best: Optional[Dict[str, Dict[str, BestItemHeap]]] = field(default=None, init=False, repr=False, compare=False)
+    # (item type, rarity, sort) -> InventoryView of the stacks held; each is built on first use, then kept up to date
+    _views: Optional[Dict[tuple, InventoryView]] = field(default=None, init=False, repr=False, compare=False)
+    # Stack key -> when the stack was added, for "acquired" order and view ties; kept while there are views
+    _seqs: Optional[Dict[tuple, int]] = field(default=None, init=False, repr=False, compare=False)
+    _next_seq: int = field(default=0, init=False, repr=False, compare=False)
+
+    def fork(self):
+        """
+        Return a copy that shares the stack tables with this inventory until either one
+        changes them (copy-on-write), so forking costs the same however many items are held.
+        Items themselves are never changed in place and stay shared.
+        """
+        self._shared = True
+        return copy.copy(self)
+
+    def _own(self):
+        if self._shared:
+            self.stacks = {key: InventoryEntry(entry.item, entry.count) for key, entry in self.stacks.items()}
+            self.type_counts = dict(self.type_counts)
+            if self._best is not None:
+                self._best = {slot: {name: heap.copy() for name, heap in names.items()}
+                              for slot, names in self._best.items()}
+            if self._views is not None:
+                self._views = {spec: view.copy() for spec, view in self._views.items()}
+                self._seqs = dict(self._seqs)
+            self._shared = False
+
+    @property
+    def items(self):
+        """The distinct items held, one per stack."""
+        return [entry.item for entry in self.stacks.values()]
+
+    @property
+    def entries(self):
+        return list(self.stacks.values())
+
+    def count(self, item: Item):
+        entry = self.stacks.get(item.stack_key())
+        return entry.count if entry else 0
+
+    def count_type(self, item_type: str):
+        return self.type_counts.get(item_type, 0)
+
+    def add_item(self, item: Item, count: int = 1):
+        self._own()
+        key = item.stack_key()
+        entry = self.stacks.get(key)
+        if entry is None:
+            entry = self.stacks[key] = InventoryEntry(item, 0)
+            if self._best is not None and item.type in EQUIPMENT_SLOTS:
+                self._index_best(item, key)
+            if self._views is not None:
+                self._index_views(item, key)
+        entry.count += count
+        self.type_counts[item.type] = self.type_counts.get(item.type, 0) + count
+        print(f"\n📦 {item.emoji()} {item.name}{_quantity(count)} added to inventory.")
+        return entry
+
+    def remove_item(self, item: Item, count: int = 1):
+        """Remove up to count of an item; returns how many were removed."""
+        key = item.stack_key()
+        if key not in self.stacks:
+            return 0
+        self._own()
+        entry = self.stacks[key]
+        removed = min(count, entry.count)
+        entry.count -= removed
+        self.type_counts[item.type] -= removed
+        if entry.count == 0:
+            del self.stacks[key]
+            if self._best is not None and item.type in EQUIPMENT_SLOTS:
+                self._best[item.type][item.name].live -= 1  # Its heap entry goes stale
+            if self._views is not None:
+                seq = self._seqs.pop(key)
+                for view in self._views.values():
+                    if view.matches(item):
+                        view.remove(item, seq)
+            # An item that leaves the inventory can no longer be worn
+            for slot in ("weapon", "armor"):
+                worn = getattr(self, f"equipped_{slot}")
+                if worn is not None and worn.stack_key() == key:
+                    self.unequip(slot)
+        print(f"\n📦 {item.emoji()} {item.name}{_quantity(removed)} removed from inventory.")
+        return removed
+
+    def _index_best(self, item, key):
+        heap = self._best[item.type].get(item.name)
+        if heap is None:
+            heap = self._best[item.type][item.name] = BestItemHeap()
+        heap.push(getattr(item, EQUIPMENT_SLOTS[item.type]), key)
+
+    def best_of_each(self, slot: str):
+        """
+        For a slot ("weapon" or "armor"), the held item with the highest slot bonus of
+        every item name. Items of one name differ only in their bonuses, so any score that
+        grows with the bonus finds its best item among these; finding them costs one heap
+        top per name, not a pass over the inventory.
+        """
+        if self._best is None:
+            self._own()
+            self._best = {slot_type: {} for slot_type in EQUIPMENT_SLOTS}
+            for key, entry in self.stacks.items():
+                if entry.item.type in EQUIPMENT_SLOTS:
+                    self._index_best(entry.item, key)
+        elif self._shared:
+            self._own()  # Dropping stale entries must not touch a fork's heaps
+        best = []
+        for name, heap in list(self._best[slot].items()):
+            key = heap.top(self.stacks)
+            if key is None:
+                del self._best[slot][name]
+            else:
+                best.append(self.stacks[key].item)
+        return best
+
+    def _index_views(self, item, key):
+        seq = self._seqs[key] = self._next_seq
+        self._next_seq += 1
+        for view in self._views.values():
+            if view.matches(item):
+                view.add(item, seq, key)
+
+    def _view(self, item_type, rarity, sort):
+        spec = (item_type, rarity, sort)
+        view = self._views.get(spec) if self._views is not None else None
+        if view is None:
+            self._own()  # The new view must not appear in a fork's table
+            if self._views is None:
+                self._views = {}
+                self._seqs = {}
+                for key, entry in self.stacks.items():  # In the order the stacks were added
+                    self._seqs[key] = self._next_seq
+                    self._next_seq += 1
+            view = self._views[spec] = InventoryView(item_type, rarity, sort)
+            view.entries = sorted(_sort_key(entry.item, self._seqs[key], sort) + (key,)
+                                  for key, entry in self.stacks.items() if view.matches(entry.item))
+        return view
+
+    def page(self, number: int, size: int, item_type: Optional[str] = None, rarity: Optional[str] = None,
+             prefix: str = "", sort: str = INVENTORY_SORTS[0]):
+        """
+        One page of the stacks held, filtered and sorted.
+
+        Every combination of filters and sort used is kept as an InventoryView that add_item
+        and remove_item update, so a page costs a binary search and the page itself, however
+        many items are held. A name prefix search lists its matches by name.
+
+        Args:
+            number (int): The page, counting from 0.
+            size (int): Stacks per page.
+            item_type (str): Only stacks of this item type, or None for any.
+            rarity (str): Only stacks of this rarity, or None for any.
+            prefix (str): Only stacks whose name starts with this (ignoring case).
+            sort (str): One of INVENTORY_SORTS.
+
+        Returns:
+            tuple: (list of InventoryEntry on the page, number of stacks that match).
+        """
+        view = self._view(item_type, rarity.lower() if rarity else None, "name" if prefix else sort)
+        start, stop = view.span(prefix)
+        first = start + number * size
+        keys = [entry[-1] for entry in view.entries[first:min(first + size, stop)]]
+        return [self.stacks[key] for key in keys], stop - start
+
+    def equip(self, item: Item):
+        """Wear an item in the slot matching its type; returns the item it replaced, if any."""
+        slot = f"equipped_{item.type}"
+        previous = getattr(self, slot)
+        setattr(self, slot, item)
+        self.revision += 1
+        return previous
+
+    def unequip(self, slot: str):
+        """Empty the "weapon" or "armor" slot; returns the item that was worn, if any."""
+        previous = getattr(self, f"equipped_{slot}")
+        setattr(self, f"equipped_{slot}", None)
+        self.revision += 1
+        return previous
+
+
+# Unique effects that change stats while the item is worn
+EQUIPMENT_STAT_EFFECTS = {
+    "Amulet of Vitality": {"max_hp": 30},
+}
+
+HASTE_ARMOR = ("Boots of Swiftness", "Boots of the Swift")
+HASTE_MULTIPLIER = 2
+FROST_SLOW_MULTIPLIER = 0.9
+
+
+def combat_speeds(armor):
+    """Return (player speed, enemy speed) for a fight with this armor worn (None for none)."""
+    player_speed = enemy_speed = BASE_SPEED
+    # Boots hasten the player: more actions per enemy action, not more damage per hit
+    if armor and armor.name in HASTE_ARMOR:
+        player_speed = BASE_SPEED * HASTE_MULTIPLIER
+    # Frost Armor unique effect: slows enemies by 10%
+    if armor and armor.name == "Frost Armor":
+        enemy_speed = round(BASE_SPEED * FROST_SLOW_MULTIPLIER)
+    return player_speed, enemy_speed
+
+
+Stats = namedtuple("Stats", ["attack", "defense", "max_hp", "revision"])
+
+# XP needed for the next level grows by half each level up to XP_CURVE_CAP_LEVEL, then stays
+# flat: endless runs reach levels where the uncapped curve would be a number with hundreds of digits
+XP_BASE = 100
+XP_GROWTH = 1.5
+XP_CURVE_CAP_LEVEL = 20
+LEVEL_ACHIEVEMENT_PREFIX = "Leveled Up to Level "
+# Stat gains per level
+LEVEL_HP = 20
+LEVEL_ATTACK = 5
+LEVEL_DEFENSE = 2
 
-    def add_item(self, item: Item):
-        self.items.append(item)
-        print(f"\n📦 {item.emoji()} {item.name} added to inventory.")
 
-    def remove_item(self, item: Item):
-        if item in self.items:
-            self.items.remove(item)
-            print(f"\n📦 {item.emoji()} {item.name} removed from inventory.")
+def _xp_curve():
+    costs = [XP_BASE]
+    while len(costs) < XP_CURVE_CAP_LEVEL:
+        costs.append(int(costs[-1] * XP_GROWTH))
+    return tuple(costs)
+
+
+XP_CURVE = _xp_curve()  # XP_CURVE[level - 1]: XP to go from level to level + 1
+
+
+def xp_to_next_level(level):
+    """XP needed to go from level to the next one."""
+    return XP_CURVE[min(level, XP_CURVE_CAP_LEVEL) - 1]
 
 
 @dataclass
@@ -78,42 +460,136 @@ class Player:
     xp: int = 0
     xp_to_next_level: int = 100
     hp: int = 288  # Increased starting HP
-    max_hp: int = 288
-    attack: int = 12
-    defense: int = 6
+    # Stats before equipment and modifiers; read attack, defense and max_hp for the effective values
+    base_max_hp: int = 288
+    base_attack: int = 12
+    base_defense: int = 6
     gold: int = 50
-    keys: int = 0  # Number of dungeon keys
     pages: int = 0  # Number of pages from bosses
     special_ability_ready: bool = True
     inventory: Inventory = field(default_factory=Inventory)
     achievements: List[Achievement] = field(default_factory=list)
+    # Temporary stat changes by source (e.g. a status effect): {source: {stat: amount}}
+    modifiers: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    _stats: Optional[Stats] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def keys(self):
+        """Number of dungeon keys held, counted from the key items in the inventory."""
+        return self.inventory.count_type("key")
+
+    @property
+    def attack(self):
+        return self._current_stats().attack
+
+    @property
+    def defense(self):
+        return self._current_stats().defense
+
+    @property
+    def max_hp(self):
+        return self._current_stats().max_hp
+
+    def _current_stats(self):
+        stats = self._stats
+        if stats is None or stats.revision != self.inventory.revision:
+            stats = self._compute_stats()
+        return stats
+
+    def _compute_stats(self):
+        totals = self.stats_with(self.inventory.equipped_weapon, self.inventory.equipped_armor)
+        self._stats = Stats(totals["attack"], totals["defense"], totals["max_hp"], self.inventory.revision)
+        # Losing max HP (e.g. taking off the Amulet of Vitality) takes the extra HP with it
+        self.hp = min(self.hp, totals["max_hp"])
+        return self._stats
+
+    def stats_with(self, weapon, armor):
+        """Effective attack, defense and max_hp, as a dict, if this weapon and armor were worn."""
+        totals = {"attack": self.base_attack, "defense": self.base_defense, "max_hp": self.base_max_hp}
+        if weapon:
+            totals["attack"] += weapon.attack_bonus
+        if armor:
+            totals["defense"] += armor.defense_bonus
+        for item in (weapon, armor):
+            if item:
+                for stat, amount in EQUIPMENT_STAT_EFFECTS.get(item.name, {}).items():
+                    totals[stat] += amount
+        for changes in self.modifiers.values():
+            for stat, amount in changes.items():
+                totals[stat] += amount
+        return totals
+
+    def invalidate_stats(self):
+        """Drop the cached effective stats; call after changing base stats or modifiers directly."""
+        self._stats = None
+
+    # Modifiers and achievements are replaced rather than changed in place, so forks can share them
+
+    def set_modifier(self, source, stat, amount):
+        self.modifiers = {**self.modifiers, source: {**self.modifiers.get(source, {}), stat: amount}}
+        self._stats = None
+
+    def remove_modifier(self, source):
+        if source in self.modifiers:
+            self.modifiers = {name: changes for name, changes in self.modifiers.items() if name != source}
+            self._stats = None
+
+    def fork(self):
+        """Return a copy to change freely; it shares everything with this player until changed."""
+        clone = copy.copy(self)
+        clone.inventory = self.inventory.fork()
+        return clone
+
+    def equip(self, item):
+        """Equip an item; returns the item it replaced, if any."""
+        return self.inventory.equip(item)
+
+    def unequip(self, slot):
+        return self.inventory.unequip(slot)
 
     def gain_xp(self, amount):
         self.xp += amount
         print(f"\n{self.name} gains {amount} XP.")
-        while self.xp >= self.xp_to_next_level:
-            self.level_up()
-
-    def level_up(self):
-        self.level += 1
-        self.xp -= self.xp_to_next_level
-        self.xp_to_next_level = int(self.xp_to_next_level * 1.5)
-        self.max_hp += 20
+        levels = 0
+        # Below the cap each level costs more than the last, so step through those (at most
+        # XP_CURVE_CAP_LEVEL of them); past it every level costs the same, so the rest is one division
+        while self.xp >= self.xp_to_next_level and self.level + levels < XP_CURVE_CAP_LEVEL:
+            self.xp -= self.xp_to_next_level
+            levels += 1
+            self.xp_to_next_level = xp_to_next_level(self.level + levels)
+        if self.xp >= self.xp_to_next_level:
+            extra, self.xp = divmod(self.xp, self.xp_to_next_level)
+            levels += extra
+        if levels:
+            self.level_up(levels)
+
+    def level_up(self, levels=1):
+        """Apply any number of level-ups at once; the XP for them must already be spent."""
+        previous = self.level
+        self.level += levels
+        self.xp_to_next_level = xp_to_next_level(self.level)
+        self.base_max_hp += LEVEL_HP * levels
+        self.base_attack += LEVEL_ATTACK * levels
+        self.base_defense += LEVEL_DEFENSE * levels
+        self.invalidate_stats()
         self.hp = self.max_hp
-        self.attack += 5
-        self.defense += 2
         self.special_ability_ready = True
-        print(f"\n*** {self.name} leveled up to Level {self.level}! ***")
+        if levels == 1:
+            print(f"\n*** {self.name} leveled up to Level {self.level}! ***")
+        else:
+            print(f"\n*** {self.name} leveled up {levels} times to Level {self.level}! ***")
         print(f"Stats increased: HP={self.max_hp}, Attack={self.attack}, Defense={self.defense}\n")
-        self.unlock_achievement(f"Leveled Up to Level {self.level}")
+        for level in level_achievement_levels(previous, self.level):
+            self.unlock_achievement(f"{LEVEL_ACHIEVEMENT_PREFIX}{level}")
 
     def use_special_ability(self):
+        """Spend the special ability; returns True if it was ready. The attack boost itself is a status effect."""
         if self.special_ability_ready:
-            self.attack *= 2
             self.special_ability_ready = False
             print(f"\n🔥 {self.name} uses their Special Ability! Attack damage doubled for this turn! 🔥")
-        else:
-            print("\n⚠️ Special Ability not ready yet. Gain more XP to level up! ⚠️")
+            return True
+        print("\n⚠️ Special Ability not ready yet. Gain more XP to level up! ⚠️")
+        return False
 
     def reset_special_ability(self):
         if not self.special_ability_ready and self.xp >= self.xp_to_next_level / 2:
@@ -126,9 +602,9 @@ class Player:
     def unlock_achievement(self, achievement_name):
         if achievement_name not in [ach.name for ach in self.achievements]:
             # Find the achievement from ALL_ACHIEVEMENTS
-            achievement = next((ach for ach in ALL_ACHIEVEMENTS if ach.name == achievement_name), None)
+            achievement = find_achievement(achievement_name)
             if achievement:
-                self.achievements.append(achievement)
+                self.achievements = self.achievements + [achievement]
                 print(f"\n🏆 Achievement Unlocked: {achievement.name} 🏆\n")
 
 
@@ -144,39 +620,38 @@ class Enemy:
     special_attack_chance: float = 0.2  # 20% chance
 
     @staticmethod
-    def generate(player_level, dungeon_type):
+    def generate(player_level, dungeon_type, name=None, rng=random):
+        """Create an enemy for a level; pass a name to skip drawing one (and the random number it costs) from rng."""
         if dungeon_type == "Final":
-            name = "Final Guardian"
+            name = name or "Final Guardian"
             hp = 33 + (player_level * 30)
             attack = 15 + (player_level * 4)  # Reduced attack
             defense = 8 + player_level
             xp_reward = 1000 + (player_level * 100)
         else:
-            names = {
-                "Fire": ["Flame Imp", "Lava Golem", "Ember Drake"],
-                "Ice": ["Frost Wraith", "Ice Elemental", "Glacial Yeti"],
-                "Earth": ["Stone Giant", "Mud Monster", "Terrakhan"],
-                "Lightning": ["Thunder Drake", "Electric Serpent", "Volt Phoenix"],
-                "Normal": ["Goblin", "Skeleton", "Orc", "Troll", "Bandit", "Dark Knight"]
-            }
-            name = random.choice(names.get(dungeon_type, names["Normal"]))
+            name = name or rng.choice(enemy_names(dungeon_type))
             hp = 38 + (player_level * 10)
             attack = 6 + (player_level * 2)
             defense = 3 + player_level
             xp_reward = 50 + (player_level * 10)
         return Enemy(name, player_level, hp, attack, defense, xp_reward)
 
-    def perform_attack(self):
-        if random.random() < self.special_attack_chance:
+    def perform_attack(self, bonus=0, rng=random):
+        if rng.random() < self.special_attack_chance:
             damage = self.attack * 2  # Reduced multiplier for special attacks
             attack_type = "a mighty blow"
         else:
             damage = self.attack
             attack_type = "an attack"
         # Cap damage to prevent excessive hits
-        damage = min(damage, 100)
+        damage = min(damage, 100) + bonus
         return damage, attack_type
 
+    def apply_area_damage(self, amount):
+        """Apply damage that hits every enemy; returns how many were hit."""
+        self.hp -= amount
+        return 1
+
     def is_alive(self):
         return self.hp > 0
 
@@ -201,18 +676,184 @@ class Boss(Enemy):
             xp_reward = 400 + (player_level * 20)
         return Boss(name, player_level + 2, hp, attack, defense, xp_reward, is_boss=True, special_attack_chance=0.3)
 
-    def perform_attack(self):
-        if random.random() < self.special_attack_chance:
+    def perform_attack(self, bonus=0, rng=random):
+        if rng.random() < self.special_attack_chance:
             damage = self.attack * 2  # Further reduced multiplier for bosses
             attack_type = "a devastating strike"
         else:
             damage = self.attack
             attack_type = "an attack"
         # Cap damage to ensure it doesn't exceed a reasonable limit
-        damage = min(damage, 100)
+        damage = min(damage, 100) + bonus
         return damage, attack_type
 
 
+@dataclass
+class EnemyGroup:
+    """
+    Several enemies fought in one encounter.
+
+    Member stats live in parallel arrays (one slot per member) rather than one Enemy
+    object each, so area damage and the group's turn are a single pass over the arrays.
+    The group stands in for an Enemy in combat: single-target attacks hit the first
+    living member. Its index and the number of living members are kept up to date as
+    damage lands, so reading the target's stats does not search the group.
+    """
+    names: List[str]
+    levels: array
+    hps: array
+    attacks: array
+    defenses: array
+    xp_rewards: array
+    is_boss: bool = False
+    special_attack_chance: float = 0.2
+    _target: int = field(default=0, init=False, repr=False, compare=False)  # First living member; len() if none
+    _alive: int = field(default=0, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._alive = sum(1 for hp in self.hps if hp > 0)
+        self._target = 0
+        self._advance_target()
+
+    def _advance_target(self):
+        """Move the target past members that have fallen; members never come back, so it only moves forward."""
+        hps = self.hps
+        target = self._target
+        while target < len(hps) and hps[target] <= 0:
+            target += 1
+        self._target = target
+
+    @staticmethod
+    def generate(player_level, dungeon_type, size, rng=random):
+        members = [Enemy.generate(player_level, dungeon_type, rng=rng) for _ in range(size)]
+        return EnemyGroup(
+            names=[m.name for m in members],
+            levels=array("q", (m.level for m in members)),
+            hps=array("q", (m.hp for m in members)),
+            attacks=array("q", (m.attack for m in members)),
+            defenses=array("q", (m.defense for m in members)),
+            xp_rewards=array("q", (m.xp_reward for m in members)),
+        )
+
+    @staticmethod
+    def of(enemy, size):
+        """A pack of size copies of enemy; unlike generate, it draws no random numbers."""
+        return EnemyGroup(
+            names=[enemy.name] * size,
+            levels=array("q", [enemy.level] * size),
+            hps=array("q", [enemy.hp] * size),
+            attacks=array("q", [enemy.attack] * size),
+            defenses=array("q", [enemy.defense] * size),
+            xp_rewards=array("q", [enemy.xp_reward] * size),
+        )
+
+    def __len__(self):
+        return len(self.hps)
+
+    def target_index(self):
+        """Index of the member single-target attacks hit, or None if all are dead."""
+        return self._target if self._target < len(self.hps) else None
+
+    def alive_count(self):
+        return self._alive
+
+    @property
+    def label(self):
+        if len(set(self.names)) == 1:
+            return f"pack of {len(self)} {self.names[0]}s"
+        return f"group of {len(self)} enemies"
+
+    @property
+    def name(self):
+        idx = self.target_index()
+        return self.label if idx is None else self.names[idx]
+
+    @property
+    def level(self):
+        return max(self.levels)
+
+    @property
+    def hp(self):
+        idx = self.target_index()
+        return 0 if idx is None else self.hps[idx]
+
+    @hp.setter
+    def hp(self, value):
+        idx = self.target_index()
+        if idx is not None:
+            self.hps[idx] = value
+            if value <= 0:
+                self._alive -= 1
+                self._advance_target()
+
+    @property
+    def attack(self):
+        idx = self.target_index()
+        return 0 if idx is None else self.attacks[idx]
+
+    @property
+    def defense(self):
+        idx = self.target_index()
+        return 0 if idx is None else self.defenses[idx]
+
+    @property
+    def xp_reward(self):
+        return sum(self.xp_rewards)
+
+    def total_hp(self):
+        return sum(hp for hp in self.hps if hp > 0)
+
+    def total_attack(self):
+        return sum(atk for atk, hp in zip(self.attacks, self.hps) if hp > 0)
+
+    def apply_area_damage(self, amount):
+        """Damage every living member in place, in one pass; returns how many were hit."""
+        hit = self._alive
+        hps = self.hps
+        for idx in range(self._target, len(hps)):
+            hp = hps[idx]
+            if hp > 0:
+                hps[idx] = hp - amount
+                if hp <= amount:
+                    self._alive -= 1
+        self._advance_target()
+        return hit
+
+    def perform_attack(self, bonus=0, rng=random):
+        """Every living member attacks at once; returns the combined damage and a description."""
+        total = 0
+        hits = 0
+        mighty = 0
+        chance = self.special_attack_chance
+        for atk, hp in zip(self.attacks, self.hps):
+            if hp <= 0:
+                continue
+            hits += 1
+            if rng.random() < chance:
+                mighty += 1
+                atk *= 2
+            total += min(atk, 100) + bonus
+        attack_type = f"{hits} attack(s)" if not mighty else f"{hits} attack(s) ({mighty} mighty blow(s))"
+        return total, attack_type
+
+    def summary_lines(self, limit=5):
+        """Status lines for the living members, truncated so huge groups stay cheap to render."""
+        lines = []
+        alive = 0
+        for name, hp in zip(self.names, self.hps):
+            if hp <= 0:
+                continue
+            alive += 1
+            if alive <= limit:
+                lines.append(f"Enemy: {name} | HP: {hp}")
+        if alive > limit:
+            lines.append(f"...and {alive - limit} more")
+        return lines
+
+    def is_alive(self):
+        return self._alive > 0
+
+
 @dataclass
 class Shop:
     items_for_sale: List[Item] = field(default_factory=lambda: [
@@ -234,7 +875,7 @@ class Shop:
         Item(name="Silver Axe", description="Increases attack by 7.", rarity="uncommon", price=120, attack_bonus=7, type="weapon"),
         Item(name="Golden Shield", description="Increases defense by 5.", rarity="rare", price=200, defense_bonus=5, type="armor"),
         Item(name="Amulet of Vitality", description="Increases max HP by 30.", rarity="epic", price=350, unique_effect="Increases max HP by 30.", type="armor"),
-        Item(name="Boots of the Swift", description="Allows double attack per turn.", rarity="epic", price=400, unique_effect="Allows double attack per turn.", type="armor"),
+        Item(name="Boots of the Swift", description="Lets you act twice as often in combat.", rarity="epic", price=400, unique_effect="Haste: you act twice for every enemy action.", type="armor"),
         Item(name="Shadow Cloak", description="Grants invisibility for one turn.", rarity="legendary", price=500, defense_bonus=5, unique_effect="Grants invisibility for one turn.", type="armor"),
         # Additional Consumables
         Item(name="Mana Potion", description="Restores 30 MP (not implemented).", rarity="common", price=25, type="consumable"),
@@ -273,6 +914,8 @@ ALL_ACHIEVEMENTS = [
     Achievement(name="Used Poison Dagger", description="Use the Poison Dagger 5 times."),
     # Add more as needed
 ]
+# Names built at runtime (e.g. "Found 37 gold in Overworld") only count if listed above
+ACHIEVEMENTS_BY_NAME = {ach.name: ach for ach in ALL_ACHIEVEMENTS}
 
 # Global Loot Table
 LOOT_TABLE = [
@@ -281,9 +924,9 @@ LOOT_TABLE = [
     Item(name="Silver Dagger", description="Increases attack by 3.", rarity="uncommon", price=150, attack_bonus=3, type="weapon"),
     Item(name="Amulet of Strength", description="Increases attack by 7.", rarity="rare", price=300, attack_bonus=7, type="weapon", unique_effect="Grants a chance to deal double damage."),
     Item(name="Guardian Shield", description="Increases defense by 5.", rarity="rare", price=300, defense_bonus=5, type="armor", unique_effect="Reduces incoming damage by 10%."),
-    Item(name="Boots of Swiftness", description="Allows the player to attack twice per turn.", rarity="epic", price=500, type="armor", unique_effect="Allows the player to attack twice per turn."),
+    Item(name="Boots of Swiftness", description="Lets the player act twice as often in combat.", rarity="epic", price=500, type="armor", unique_effect="Haste: you act twice for every enemy action."),
     Item(name="Flame Sword", description="Deals additional fire damage.", rarity="epic", price=400, attack_bonus=12, type="weapon", unique_effect="Adds 10 fire damage on each attack."),
-    Item(name="Frost Armor", description="Increases defense by 8 and slows enemies.", rarity="epic", price=400, defense_bonus=8, type="armor", unique_effect="Slows enemies by 10%."),
+    Item(name="Frost Armor", description="Increases defense by 8 and slows enemies.", rarity="epic", price=400, defense_bonus=8, type="armor", unique_effect="Slows enemies by 10%, so they act less often."),
     Item(name="Shadow Blade", description="Deals shadow damage and has a chance to blind enemies.", rarity="legendary", price=600, attack_bonus=15, type="weapon", unique_effect="Chance to blind enemies on hit."),
     Item(name="Dragon Scale Mail", description="Increases defense by 12 and grants fire resistance.", rarity="legendary", price=700, defense_bonus=12, type="armor", unique_effect="Grants fire resistance."),
     Item(name="Golden Axe", description="Increases attack by 10.", rarity="epic", price=500, attack_bonus=10, type="weapon"),
@@ -362,3 +1005,65 @@ BOSS_LOOT = {
     )
     # Add more boss-specific loot if there are multiple boss types
 }
+
+_plugin_achievements_loaded = False
+_loot_table = None
+_level_achievements = None  # Sorted levels with a "Leveled Up to Level N" achievement
+
+
+def all_achievements():
+    """ALL_ACHIEVEMENTS, extended (on first call) with those added by content packs."""
+    global _plugin_achievements_loaded
+    if not _plugin_achievements_loaded:
+        _plugin_achievements_loaded = True
+        for pack in registry.load_all(ACHIEVEMENTS):
+            for achievement in pack:
+                if achievement.name not in ACHIEVEMENTS_BY_NAME:
+                    ALL_ACHIEVEMENTS.append(achievement)
+                    ACHIEVEMENTS_BY_NAME[achievement.name] = achievement
+    return ALL_ACHIEVEMENTS
+
+
+def find_achievement(name):
+    """Look up an achievement by name; content packs are only loaded for names not built in."""
+    achievement = ACHIEVEMENTS_BY_NAME.get(name)
+    if achievement is None and not _plugin_achievements_loaded:
+        all_achievements()
+        achievement = ACHIEVEMENTS_BY_NAME.get(name)
+    return achievement
+
+
+def level_achievement_levels(after, upto):
+    """Levels in (after, upto] that have a "Leveled Up to Level N" achievement, in order."""
+    global _level_achievements
+    if _level_achievements is None:
+        _level_achievements = sorted(
+            int(achievement.name[len(LEVEL_ACHIEVEMENT_PREFIX):]) for achievement in all_achievements()
+            if achievement.name.startswith(LEVEL_ACHIEVEMENT_PREFIX)
+            and achievement.name[len(LEVEL_ACHIEVEMENT_PREFIX):].isdecimal()
+        )
+    levels = _level_achievements
+    return levels[bisect.bisect_right(levels, after):bisect.bisect_right(levels, upto)]
+
+
+def loot_table():
+    """LOOT_TABLE plus the items and dungeon keys added by content packs, loaded on first use."""
+    global _loot_table
+    if _loot_table is None:
+        table = list(LOOT_TABLE)
+        for pack in registry.load_all(ITEMS):
+            table.extend(pack)
+        for dungeon in registry.load_all(DUNGEONS):
+            if dungeon.key is not None:
+                table.append(dungeon.key)
+        _loot_table = table
+    return _loot_table
+
+
+def boss_loot(boss_name, dungeon_type):
+    """The unique item a boss drops, including the bosses of dungeon types added by content packs."""
+    item = BOSS_LOOT.get(boss_name)
+    if item is None:
+        dungeon = plugin_dungeon_type(dungeon_type)
+        item = dungeon.boss_loot if dungeon else None
+    return item
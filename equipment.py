@@ -0,0 +1,122 @@
+# equipment.py
+
+from collections import namedtuple
+
+from advisor import CombatParams, enemy_attack_outcomes, enemy_totals, player_attack_outcomes, turn_cycle
+from effects import BLIND_CHANCE, BLIND_MISS_CHANCE, BLIND_TICKS
+from entities import EQUIPMENT_SLOTS, Enemy, combat_speeds
+from scheduler import TurnScheduler
+
+Loadout = namedtuple("Loadout", ["weapon", "armor", "score"])
+
+
+def _expected(outcomes):
+    return sum(p * amount for p, amount in outcomes)
+
+
+def damage_race_score(params, enemy_hp):
+    """
+    Score a loadout by how fast it wins the damage race against an enemy.
+
+    Expected damage dealt per initiative cycle as a share of the enemy's HP, minus
+    expected damage taken as a share of the player's max HP, so haste, slowing the enemy
+    and extra max HP count along with attack. Unique effects count through the advisor's
+    combat model, plus the Shadow Blade's blinding, which it does not model.
+    """
+    player_turns = sum(params.turn_order)
+    enemy_turns = len(params.turn_order) - player_turns
+    dealt = _expected(player_attack_outcomes(params)) * player_turns
+    taken = _expected(enemy_attack_outcomes(params)) * enemy_turns
+    if params.weapon == "Shadow Blade":
+        # Share of enemy attacks made while blinded, if the player attacks about once per tick
+        blinded = min(1.0, BLIND_CHANCE * BLIND_TICKS * player_turns / max(enemy_turns, 1))
+        taken *= 1 - blinded * BLIND_MISS_CHANCE
+    return dealt / max(enemy_hp, 1) - taken / max(params.player_max_hp, 1)
+
+
+def reference_enemy(level):
+    """A typical enemy of a level, to score gear outside a fight; draws no random numbers."""
+    return Enemy.generate(level, "Normal", name="Typical Enemy")
+
+
+class LoadoutScorer:
+    """
+    Score weapon and armor combinations for one player against one enemy.
+
+    The fight is described the way the advisor sees it (CombatParams), built from the
+    player's base stats and the candidate gear rather than from the inventory, so scoring
+    neither copies nor scans what the player holds.
+    """
+
+    def __init__(self, game, enemy, policy=damage_race_score):
+        self.game = game
+        self.enemy_hp, self.enemy_attack = enemy_totals(enemy)
+        self.enemy = enemy
+        self.policy = policy
+        self._turn_orders = {}  # (player speed, enemy speed) -> turn cycle
+
+    def _turn_order(self, armor):
+        speeds = combat_speeds(armor)
+        order = self._turn_orders.get(speeds)
+        if order is None:
+            scheduler = TurnScheduler()
+            scheduler.add("player", speeds[0])
+            scheduler.add("enemy", speeds[1])
+            order = self._turn_orders[speeds] = turn_cycle(scheduler)
+        return order
+
+    def score(self, weapon, armor):
+        stats = self.game.player.stats_with(weapon, armor)
+        params = CombatParams(
+            player_attack=stats["attack"],
+            player_max_hp=stats["max_hp"],
+            pages=self.game.player.pages,
+            enemy_attack=self.enemy_attack,
+            enemy_defense=self.enemy.defense,
+            special_attack_chance=self.enemy.special_attack_chance,
+            dungeon_level=self.game.current_dungeon_level,
+            weapon=weapon.name if weapon else None,
+            armor=armor.name if armor else None,
+            turn_order=self._turn_order(armor),
+        )
+        return self.policy(params, self.enemy_hp)
+
+
+def best_loadout(game, enemy, policy=damage_race_score):
+    """
+    Find the weapon and armor in the inventory that score best against an enemy.
+
+    Only the best item of each name is scored (see Inventory.best_of_each), so the cost
+    depends on how many different kinds of gear the player holds, not how many items.
+    The weapon is chosen with the current armor worn, then the armor with that weapon.
+
+    Args:
+        game (Game): The running game; it is not changed.
+        enemy (Enemy): The enemy to score against.
+        policy (callable): (CombatParams, enemy HP) -> score, higher is better.
+
+    Returns:
+        Loadout: The best weapon and armor (None for a slot with nothing to wear) and their score.
+    """
+    scorer = LoadoutScorer(game, enemy, policy)
+    inventory = game.player.inventory
+    weapon, armor = inventory.equipped_weapon, inventory.equipped_armor
+    weapons = inventory.best_of_each("weapon")
+    if weapons:
+        weapon = max(weapons, key=lambda item: scorer.score(item, armor))
+    armors = inventory.best_of_each("armor")
+    if armors:
+        armor = max(armors, key=lambda item: scorer.score(weapon, item))
+    return Loadout(weapon, armor, scorer.score(weapon, armor))
+
+
+def upgrade_gain(game, item, enemy, policy=damage_race_score):
+    """How much wearing an item instead of the current gear in its slot would improve the score."""
+    if item.type not in EQUIPMENT_SLOTS:
+        return 0
+    scorer = LoadoutScorer(game, enemy, policy)
+    weapon, armor = game.player.inventory.equipped_weapon, game.player.inventory.equipped_armor
+    current = scorer.score(weapon, armor)
+    if item.type == "weapon":
+        return scorer.score(item, armor) - current
+    return scorer.score(weapon, item) - current
@@ -0,0 +1,309 @@
+# fuzz.py
+
+import argparse
+import hashlib
+import multiprocessing
+import os
+import random
+import signal
+import sys
+import time
+import traceback
+from collections import namedtuple
+
+from replay import encode_replay
+from utils import Console, use_console
+
+DEFAULT_MAX_INPUTS = 200
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_OUTPUT_DIR = "fuzz_crashes"
+SESSION_TIMEOUT = 2.0  # Seconds before a session counts as hung
+ADVISOR_BUDGET = 0.001  # The in-combat hint would otherwise search for 50 ms per request
+MAX_CORPUS = 256
+MUTATION_RATE = 0.7  # Share of sessions that mutate a corpus entry instead of starting fresh
+
+# What a player might type: mostly menu numbers, plus answers, blanks and hostile input
+# (out-of-range numbers, negative numbers, non-ASCII digits that pass str.isdigit())
+MENU_INPUTS = [str(n) for n in range(1, 10)]
+OTHER_INPUTS = ["0", "", "y", "yes", "n", "no", "10", "99", "-1", "1000000", " 1", "abc", "١", "²"]
+
+FuzzResult = namedtuple("FuzzResult", ["outcome", "consumed", "sites", "error"])
+Crash = namedtuple("Crash", ["signature", "seed", "inputs", "details"])
+BatchResult = namedtuple("BatchResult", ["sessions", "crashes", "new_sites", "interesting"])
+
+COVERAGE_DEPTH = 3  # Calling functions that identify where input was asked for
+
+
+class SessionHung(Exception):
+    """Raised inside a session that ran past SESSION_TIMEOUT."""
+
+
+def _on_timeout(signum, frame):
+    raise SessionHung(f"Session ran longer than {SESSION_TIMEOUT} seconds.")
+
+
+def _site_name(codes):
+    return "<-".join(code.co_name for code in codes)
+
+
+def default_game_factory(seed):
+    from game import Game
+    game = Game(seed=seed)
+    game.advisor.time_budget = ADVISOR_BUDGET
+    return game
+
+
+def crash_signature(exc):
+    """Identify a crash by exception type and the innermost frame it was raised in."""
+    if isinstance(exc, SessionHung):
+        return "SessionHung"  # Where the timer happened to fire says nothing
+    frames = traceback.extract_tb(exc.__traceback__)
+    if not frames:
+        return type(exc).__name__
+    last = frames[-1]
+    return f"{type(exc).__name__} at {os.path.basename(last.filename)}:{last.lineno} in {last.name}"
+
+
+def run_session(seed, inputs, game_factory=default_game_factory, timeout=SESSION_TIMEOUT):
+    """
+    Run one headless game on a fixed list of inputs.
+
+    Args:
+        seed (int): The game seed.
+        inputs (list): Lines of input, fed in order; the session ends when they run out.
+        game_factory (callable): Builds a Game from a seed.
+        timeout (float): Seconds before the session is stopped as hung (Unix only).
+
+    Returns:
+        FuzzResult: How the session ended, how many inputs it read, the input sites it
+        reached (as a cheap coverage measure), and (signature, traceback text) if it crashed.
+    """
+    position = 0
+    sites = set()
+
+    def next_input(prompt=""):
+        nonlocal position
+        # The functions that asked for input, starting with read_input()'s caller
+        frame = sys._getframe(2)
+        codes = []
+        while frame is not None and len(codes) < COVERAGE_DEPTH:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        sites.add(tuple(codes))
+        if position >= len(inputs):
+            raise EOFError("Fuzz input exhausted.")
+        line = inputs[position]
+        position += 1
+        return line
+
+    use_alarm = timeout and hasattr(signal, "setitimer")
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    error = None
+    try:
+        with open(os.devnull, "w", encoding="utf-8") as devnull, \
+                use_console(Console(next_input, devnull, headless=True)):
+            game = game_factory(seed)
+            try:
+                game.start()
+            finally:
+                game.overworld.close()
+        outcome = "finished"
+    except SystemExit:
+        outcome = "exit"
+    except EOFError:
+        outcome = "end of input"
+    except Exception as exc:  # Anything else is what we are looking for
+        outcome = "crash"
+        error = (crash_signature(exc), traceback.format_exc())
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    return FuzzResult(outcome, position, {_site_name(codes) for codes in sites}, error)
+
+
+def random_inputs(rng, length):
+    return [rng.choice(MENU_INPUTS) if rng.random() < 0.85 else rng.choice(OTHER_INPUTS) for _ in range(length)]
+
+
+def mutate_inputs(rng, inputs, max_inputs):
+    """Apply a few random edits (replace, insert, delete, splice in fresh input) to a stream."""
+    mutated = list(inputs)
+    for _ in range(rng.randint(1, 4)):
+        pos = rng.randrange(len(mutated) + 1)
+        roll = rng.random()
+        if roll < 0.4 and mutated:
+            mutated[min(pos, len(mutated) - 1)] = random_inputs(rng, 1)[0]
+        elif roll < 0.6:
+            mutated.insert(pos, random_inputs(rng, 1)[0])
+        elif roll < 0.8 and mutated:
+            del mutated[min(pos, len(mutated) - 1)]
+        else:
+            mutated[pos:] = random_inputs(rng, rng.randint(1, max(1, max_inputs - pos)))
+    return mutated[:max_inputs]
+
+
+def _fuzz_batch(task):
+    """Worker: run one batch of sessions. Only crashes and new coverage are sent back."""
+    batch_seed, batch_size, max_inputs, corpus, known_sites = task
+    rng = random.Random(batch_seed)
+    known = set(known_sites)
+    crashes = []
+    interesting = []
+    new_sites = set()
+    for _ in range(batch_size):
+        seed = rng.randrange(2 ** 32)
+        if corpus and rng.random() < MUTATION_RATE:
+            base_seed, base_inputs = rng.choice(corpus)
+            # Keep the seed most of the time, so the mutation lands in the same world
+            if rng.random() < 0.8:
+                seed = base_seed
+            inputs = mutate_inputs(rng, base_inputs, max_inputs)
+        else:
+            inputs = random_inputs(rng, rng.randint(1, max_inputs))
+        result = run_session(seed, inputs)
+        if result.error is not None:
+            crashes.append(Crash(result.error[0], seed, inputs[:result.consumed], result.error[1]))
+        unseen = result.sites - known
+        if unseen:
+            # Asked for input somewhere no earlier session had reached
+            known |= unseen
+            new_sites |= unseen
+            interesting.append((seed, inputs[:result.consumed]))
+    return BatchResult(batch_size, crashes, new_sites, interesting)
+
+
+def minimize(seed, inputs, signature, game_factory=default_game_factory):
+    """
+    Shrink a crashing input list while it still crashes with the same signature.
+
+    Delta debugging: try dropping chunks of decreasing size, then try replacing each
+    remaining input with the simplest one ("1").
+    """
+    def still_crashes(candidate):
+        result = run_session(seed, candidate, game_factory)
+        return result.error is not None and result.error[0] == signature
+
+    chunk = max(1, len(inputs) // 2)
+    while chunk >= 1:
+        start = 0
+        while start < len(inputs):
+            candidate = inputs[:start] + inputs[start + chunk:]
+            if candidate != inputs and still_crashes(candidate):
+                inputs = candidate
+            else:
+                start += chunk
+        chunk //= 2
+    for idx, line in enumerate(inputs):
+        if line != "1":
+            candidate = inputs[:idx] + ["1"] + inputs[idx + 1:]
+            if still_crashes(candidate):
+                inputs = candidate
+    return inputs
+
+
+def save_crash(directory, crash):
+    """
+    Write a crash as a replay file (re-run it with main.py --replay) plus its traceback.
+
+    Returns:
+        str: Path of the replay file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = "crash-" + hashlib.blake2b(crash.signature.encode(), digest_size=6).hexdigest()
+    replay_path = os.path.join(directory, name + ".rsr")
+    with open(replay_path, "wb") as f:
+        f.write(encode_replay(crash.seed, [("input", line) for line in crash.inputs]))
+    with open(os.path.join(directory, name + ".txt"), "w", encoding="utf-8") as f:
+        f.write(f"{crash.signature}\nseed: {crash.seed}\ninputs ({len(crash.inputs)}): {crash.inputs!r}\n\n{crash.details}")
+    return replay_path
+
+
+class Fuzzer:
+    """
+    Run random and mutated input streams against headless games on a process pool.
+
+    Workers run whole batches and only report back crashes and sessions that asked for
+    input from a call path never reached before; those sessions join the corpus that
+    later batches mutate.
+    Each new crash signature is minimized and saved once.
+    """
+
+    def __init__(self, workers=None, max_inputs=DEFAULT_MAX_INPUTS, batch_size=DEFAULT_BATCH_SIZE,
+                 output_dir=DEFAULT_OUTPUT_DIR, seed=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_inputs = max_inputs
+        self.batch_size = batch_size
+        self.output_dir = output_dir
+        self.rng = random.Random(seed)
+        self.corpus = []  # (seed, inputs)
+        self.sites = set()
+        self.crashes = {}  # signature -> (minimized Crash, replay path)
+        self.sessions = 0
+
+    def _task(self):
+        corpus = self.rng.sample(self.corpus, min(len(self.corpus), 32))
+        return (self.rng.randrange(2 ** 63), self.batch_size, self.max_inputs, corpus, frozenset(self.sites))
+
+    def run(self, total_sessions, report=print):
+        """
+        Fuzz until total_sessions sessions have run.
+
+        Returns:
+            dict: The crashes found, by signature, as (Crash, replay path).
+        """
+        start = time.perf_counter()
+        batches = -(-total_sessions // self.batch_size)
+        with multiprocessing.Pool(self.workers) as pool:
+            pending = [pool.apply_async(_fuzz_batch, (self._task(),)) for _ in range(min(batches, self.workers * 2))]
+            submitted = len(pending)
+            while pending:
+                result = pending.pop(0).get()
+                self._absorb(result, report)
+                if submitted < batches:
+                    pending.append(pool.apply_async(_fuzz_batch, (self._task(),)))
+                    submitted += 1
+        elapsed = time.perf_counter() - start
+        report(f"{self.sessions} sessions in {elapsed:.1f}s ({self.sessions / elapsed:.0f}/s), "
+               f"{len(self.sites)} input sites reached, {len(self.crashes)} distinct crash(es).")
+        return self.crashes
+
+    def _absorb(self, result, report):
+        self.sessions += result.sessions
+        self.sites |= result.new_sites
+        self.corpus.extend(result.interesting)
+        if len(self.corpus) > MAX_CORPUS:
+            self.corpus = self.rng.sample(self.corpus, MAX_CORPUS)
+        for crash in result.crashes:
+            if crash.signature in self.crashes:
+                continue
+            inputs = minimize(crash.seed, crash.inputs, crash.signature)
+            rerun = run_session(crash.seed, inputs)
+            minimized = crash._replace(inputs=inputs, details=rerun.error[1] if rerun.error else crash.details)
+            path = save_crash(self.output_dir, minimized)
+            self.crashes[crash.signature] = (minimized, path)
+            report(f"New crash: {crash.signature} ({len(crash.inputs)} -> {len(inputs)} inputs) saved to {path}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fuzz Rogue Slayer with random input.")
+    parser.add_argument("--sessions", type=int, default=10000, help="Number of sessions to run.")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU).")
+    parser.add_argument("--max-inputs", type=int, default=DEFAULT_MAX_INPUTS, help="Longest input stream per session.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Sessions per worker task.")
+    parser.add_argument("--out", default=DEFAULT_OUTPUT_DIR, help="Directory for minimized crash replays.")
+    parser.add_argument("--seed", type=int, help="Seed for a reproducible fuzzing run.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    fuzzer = Fuzzer(args.workers, args.max_inputs, args.batch_size, args.out, args.seed)
+    crashes = fuzzer.run(args.sessions)
+    sys.exit(1 if crashes else 0)
+
+
+if __name__ == "__main__":
+    main()
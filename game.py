@@ -1,29 +1,122 @@
 # game.py
 
+import copy
+import os
 import random
-from entities import Player, Enemy, Boss, Item, Shop, LOOT_TABLE, BOSS_LOOT, ALL_ACHIEVEMENTS
+import uuid
+from advisor import CombatAdvisor, describe_action, fight_odds, room_fight_odds
+from history import run_record_from_game
+from scheduler import TurnScheduler, ACTION_TIME
+from effects import (
+    EffectEngine, TICK, POISON, FORTITUDE, EMPOWERED, BLIND, POISON_DAMAGE, POISON_TICKS,
+    FORTITUDE_DEFENSE, BLIND_CHANCE, BLIND_TICKS, BLIND_MISS_CHANCE
+)
+from overworld import Overworld, KEY_TYPES, POI_GOLD, POI_KEY, POI_NAMES, describe_direction
+from tracing import traced
+from entities import Player, Enemy, Boss, EnemyGroup, Item, Shop, loot_table, boss_loot, combat_speeds
+from plugins import unique_effect
+from realtime import FLED, run_fight, terminal_supported
+from market import BUY, SELL, market_catalog
+from equipment import best_loadout, reference_enemy, upgrade_gain
 from utils import (
-    clear_screen, display_hud, get_player_choice, press_enter_to_continue, 
-    display_message, display_inventory, display_achievements
+    clear_screen, display_hud, get_player_choice, press_enter_to_continue, get_quantity,
+    display_message, display_inventory, display_achievements, display_leaderboard, read_input,
+    clear_type_ahead
 )
 from colorama import Fore, Style  # Ensure both Fore and Style are imported
 
+try:
+    from dungeon_map import DungeonMap, PLAYER as MAP_PLAYER, ENEMY as MAP_ENEMY
+except ImportError:  # NumPy is optional; rooms fall back to plain menus without it
+    DungeonMap = None
+
+ROOM_MAP_WIDTH = 30
+ROOM_MAP_HEIGHT = 12
+
+
+KEY_SELL_PRICE = 10
+MAX_MARKET_PRICE = 100000
+KEY_HOARDER_COUNT = 100
+PACK_SIZE_WEIGHTS = {1: 60, 2: 25, 3: 15}  # How often a monster room's mob comes alone or in a pack
+
 
 class Game:
-    def __init__(self):
+    def __init__(self, seed=None, history=None, world_dir=None, realtime=False, endless=False):
+        # Every run is driven by one seed so it can be recorded and replayed
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)  # This game's own stream, so games hosted together do not interfere
         self.player = Player()
         self.shop = Shop()
         self.current_dungeon_level = 1
         self.final_boss_defeated = False
         self.overworld_explorations = 0  # To track overworld explorations for achievements
+        # Changed overworld chunks are kept on disk under world_dir (in memory if None), in a
+        # store of this run's own: a new run on the same seed, or a second session of it,
+        # starts from an untouched world
+        self.world_dir = world_dir
+        self.run_id = uuid.uuid4().hex  # Does not draw from the seeded random state
+        store_path = os.path.join(world_dir, f"world_{self.seed}_{self.run_id}") if world_dir else None
+        self.overworld = Overworld(self.seed, store_path)
+        self.dungeons_cleared = 0
+        self.last_damage_source = None  # What last hurt the player, recorded as the cause of death
+        self.effects = EffectEngine()  # Timed buffs, debuffs and damage over time
+        self.advisor = CombatAdvisor()  # Powers the in-combat hint
+        self.history = history  # Optional RunHistory that receives the end of every run
+        self.realtime = realtime  # Fight on a clock instead of in turns, where the terminal allows it
+        self.endless = endless  # Defeating the Dark Overlord does not end the run; dungeons keep going deeper
+        self.market = None  # Shared Market of a hosted deployment; replaces the shop when attached
+        self.market_id = None  # This session's id in the market
+        self.market_sequence = 0  # Last market change this game's saved player includes; see Market.restore_player()
+
+    # Helpers that are rebuilt rather than saved when a game is pickled (e.g. hibernated)
+    TRANSIENT_ATTRIBUTES = ("shop", "advisor", "history", "market")
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self.TRANSIENT_ATTRIBUTES:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.shop = Shop()
+        self.advisor = CombatAdvisor()
+        self.history = None  # Reattached by whoever owns the history, e.g. SessionManager
+        self.market = None  # Likewise
+
+    def fork(self):
+        """
+        Return a what-if copy of the game, e.g. to search ahead, undo or preview a purchase.
+
+        Player, inventory, achievements and overworld chunks are shared with this game and
+        copied only when one side changes them, so a fork costs about the same however
+        much the player owns. The fork continues from a copy of this game's random stream,
+        so playing it leaves this game's draws as they were. Forks are taken between screens
+        and never write to the run history.
+
+        Returns:
+            Game: The copy.
+        """
+        clone = copy.copy(self)
+        clone.player = self.player.fork()
+        clone.overworld = self.overworld.fork()
+        clone.effects = self.effects.copy({id(self.player): clone.player})
+        clone.history = None
+        clone.rng = copy.copy(self.rng)
+        return clone
 
     def start(self):
-        clear_screen()
-        display_hud(self.player)
-        display_message("Welcome to Rogue Slayer! 🗡️", Fore.CYAN)
-        press_enter_to_continue()
-        self.introduction()
-        self.main_loop()
+        # One pass per run: dying starts over in this loop, so long sessions do not grow the stack
+        while True:
+            clear_screen()
+            display_hud(self.player)
+            display_message("Welcome to Rogue Slayer! 🗡️", Fore.CYAN)
+            press_enter_to_continue()
+            self.introduction()
+            self.main_loop()
+            if self.final_boss_defeated:
+                return
+            self.restart_game()
 
     def introduction(self):
         clear_screen()
@@ -36,11 +129,16 @@ class Game:
         press_enter_to_continue()
 
     def restart_game(self):
-        """Reset the game state and restart."""
+        """Reset the game state for a new run; start() carries on with it."""
         display_message("\nRestarting the game...", Fore.CYAN)
         press_enter_to_continue()
-        self.__init__()  # Re-initialize the game object to reset the state
-        self.start()  # Start the game again
+        self.overworld.discard()  # That run's world is over
+        market, market_id, market_sequence = self.market, self.market_id, self.market_sequence
+        # Re-initialize the game object to reset the state; the new run's seed comes from this one's stream
+        self.__init__(seed=self.rng.randrange(2 ** 32), history=self.history, world_dir=self.world_dir,
+                      realtime=self.realtime, endless=self.endless)
+        # The session stays in its deployment's market; what it is owed goes to the new run
+        self.market, self.market_id, self.market_sequence = market, market_id, market_sequence
 
     def main_loop(self):
         while self.player.is_alive() and not self.final_boss_defeated:
@@ -48,9 +146,16 @@ class Game:
         if self.final_boss_defeated:
             self.final_narrative()
         else:
+            self.record_run("death")
             display_message("\n💀 Game Over! You have been slain. 😔", Fore.RED)
             press_enter_to_continue()
-            self.restart_game()  # Restart the game after the player dies
+
+    def record_run(self, outcome):
+        """Send the end of this run to the run history, if one is attached."""
+        if self.history is None:
+            return
+        death_cause = self.last_damage_source if outcome == "death" else None
+        self.history.record(run_record_from_game(self, outcome, death_cause))
 
     def post_dungeon_menu(self):
         while True:
@@ -64,6 +169,7 @@ class Game:
                 "Visit Shop 🛒",
                 "View Inventory 📦",
                 "View Achievements 🏆",
+                "View Leaderboard 🥇",
                 "Exit Game ❌"
             ]
             choice = get_player_choice(options)
@@ -78,76 +184,44 @@ class Game:
             elif choice == 4:
                 self.visit_shop()
             elif choice == 5:
-                display_inventory(self.player)
+                display_inventory(self.player, self.effects, self.equip_best_gear)
             elif choice == 6:
                 display_achievements(self.player)
             elif choice == 7:
+                display_leaderboard(self.history)
+            elif choice == 8:
+                self.record_run("quit")
                 display_message("\nThank you for playing Rogue Slayer! 👋", Fore.CYAN)
                 exit()
             else:
                 display_message(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}", Fore.RED)
+                clear_type_ahead()
                 press_enter_to_continue()
 
+    @traced("screen")
     def explore_dungeon(self):
-        if self.player.keys < 1:
-            display_message("\n🔑 You need at least 1 Dungeon Key to explore the dungeon.", Fore.RED)
-            press_enter_to_continue()
-            return
-        # Select dungeon type based on available keys
-        key_types = list(set(item.key_type for item in self.player.inventory.items if item.type == "key"))
-        if not key_types:
-            display_message("\n🔑 You have no keys to explore any dungeon.", Fore.RED)
-            press_enter_to_continue()
-            return
-        display_message("\nAvailable Dungeon Types:", Fore.CYAN)
-        options = [f"{kt} Dungeon 🔑" for kt in key_types]
-        # Only show Final Dungeon option if player has at least 5 pages and has Final Key
-        if self.player.pages >= 5 and any(item.key_type == "Final" for item in self.player.inventory.items if item.type == "key"):
-            options.append("Final Dungeon 🌟")
-        options.append("Cancel")
-        choice = get_player_choice(options)
-
-        if choice == len(options):
-            display_message("Canceled exploring the dungeon.", Fore.YELLOW)
-            press_enter_to_continue()
-            return
-        elif 1 <= choice <= len(key_types):
-            selected_dungeon = key_types[choice-1]
-        elif self.player.pages >= 5 and choice == len(options)-1:
-            selected_dungeon = "Final"
-        else:
-            display_message(f"{Fore.RED}Invalid choice. Returning to main menu.{Style.RESET_ALL}", Fore.RED)
-            press_enter_to_continue()
-            return
-
-        # Check if player has the required key
-        required_key = None
-        if selected_dungeon == "Final":
-            required_key = next((item for item in self.player.inventory.items if item.type == "key" and item.key_type == "Final"), None)
-        else:
-            required_key = next((item for item in self.player.inventory.items if item.type == "key" and item.key_type == selected_dungeon), None)
-
-        if not required_key:
-            display_message(f"\n🔑 You don't have the {selected_dungeon} Key to explore this dungeon.", Fore.RED)
-            press_enter_to_continue()
+        selection = self.select_dungeon()
+        if selection is None:
             return
+        selected_dungeon, required_key = selection
 
         # Show dungeon details
-        num_mobs = random.randint(3, 6)
+        num_mobs = self.rng.randint(3, 6)
         boss_name = f"{selected_dungeon} Lord" if selected_dungeon != "Final" else "Dark Overlord"
-        boss_info = self.get_boss_info(boss_name)
+        scaled_level = self.current_dungeon_level + self.player.level
+        boss = Boss.generate(scaled_level, selected_dungeon)
         display_message(f"\n📜 Dungeon Details:", Fore.CYAN)
         display_message(f"• Number of Enemies: {num_mobs}", Fore.YELLOW)
-        display_message(f"• Boss: {boss_info['name']} | HP: {boss_info['hp']} | Attack: {boss_info['attack']} 🐉", Fore.MAGENTA)
+        display_message(f"• Boss: {boss.name} | HP: {boss.hp} | Attack: {boss.attack} 🐉", Fore.MAGENTA)
+        self.show_difficulty_estimate(Enemy.generate(scaled_level, selected_dungeon, rng=self.rng), boss, num_mobs)
         print("\n0. Cancel")
-        choice_confirm = input("Do you want to proceed and consume the key? (yes/no): ").lower()
+        choice_confirm = read_input("Do you want to proceed and consume the key? (yes/no): ").lower()
         if choice_confirm not in ['yes', 'y']:
             display_message("Canceled exploring the dungeon.", Fore.YELLOW)
             press_enter_to_continue()
             return
 
         # Consume the key
-        self.player.keys -= 1
         self.player.inventory.remove_item(required_key)
         display_message(f"\n🔑 {required_key.name} consumed. Remaining Keys: {self.player.keys}", Fore.MAGENTA)
         press_enter_to_continue()
@@ -162,8 +236,7 @@ class Game:
         display_message(narrative)
         press_enter_to_continue()
 
-        # Scale dungeon difficulty based on player level and dungeon tier
-        scaled_level = self.current_dungeon_level + self.player.level
+        # Dungeon difficulty is scaled on player level and dungeon tier (see scaled_level above)
         display_message(f"\n🕳️ Entering Dungeon Level {self.current_dungeon_level} (Scaled Level: {scaled_level})...\n", Fore.YELLOW)
         press_enter_to_continue()
 
@@ -183,84 +256,290 @@ class Game:
                         press_enter_to_continue()
                         return
         if self.player.is_alive() and not self.final_boss_defeated:
-            display_message(f"\n*** 🎉 Dungeon Level {self.current_dungeon_level} Cleared! ***", Fore.GREEN)
-            # After clearing dungeon, player gains XP and may level up
-            xp_gain = num_mobs * 20 + 100  # Example XP calculation
-            self.player.gain_xp(xp_gain)
-            # Achievement for clearing a dungeon
-            self.player.unlock_achievement(f"Cleared Dungeon Level {self.current_dungeon_level}")
-            # Increment dungeon level
-            self.current_dungeon_level += 1  # Increment dungeon level
+            self.clear_dungeon(num_mobs)
             press_enter_to_continue()
 
-    def get_boss_info(self, boss_name):
-        # Retrieve boss info from BOSS_LOOT
-        boss_item = BOSS_LOOT.get(boss_name, None)
-        if boss_item:
-            boss_info = {
-                "name": boss_name,
-                "hp": 100,  # Placeholder, can be adjusted
-                "attack": 15  # Placeholder, can be adjusted
-            }
-            # Customize boss info based on name or other attributes
-            if boss_name == "Fire Lord":
-                boss_info["hp"] = 64
-                boss_info["attack"] = 16
-            elif boss_name == "Ice Lord":
-                boss_info["hp"] = 72
-                boss_info["attack"] = 14
-            elif boss_name == "Earth Lord":
-                boss_info["hp"] = 80
-                boss_info["attack"] = 12
-            elif boss_name == "Lightning Lord":
-                boss_info["hp"] = 55
-                boss_info["attack"] = 18
-            elif boss_name == "Dark Overlord":
-                boss_info["hp"] = 100
-                boss_info["attack"] = 22
-            return boss_info
+    def select_dungeon(self):
+        """
+        Let the player pick a dungeon to explore from the keys they hold.
+
+        Returns:
+            tuple: (dungeon type, the key it needs), or None if there is nothing to explore
+            or the player canceled.
+        """
+        if self.player.keys < 1:
+            display_message("\n🔑 You need at least 1 Dungeon Key to explore the dungeon.", Fore.RED)
+            press_enter_to_continue()
+            return None
+        # Select dungeon type based on available keys
+        # Sorted so the menu order does not depend on string hashing (replays run in a new process)
+        key_types = sorted(set(item.key_type for item in self.player.inventory.items if item.type == "key"))
+        if not key_types:
+            display_message("\n🔑 You have no keys to explore any dungeon.", Fore.RED)
+            press_enter_to_continue()
+            return None
+        display_message("\nAvailable Dungeon Types:", Fore.CYAN)
+        options = [f"{kt} Dungeon 🔑" for kt in key_types]
+        # Only show Final Dungeon option if player has at least 5 pages and has Final Key
+        if self.player.pages >= 5 and any(item.key_type == "Final" for item in self.player.inventory.items if item.type == "key"):
+            options.append("Final Dungeon 🌟")
+        options.append("Cancel")
+        choice = get_player_choice(options)
+
+        if choice == len(options):
+            display_message("Canceled exploring the dungeon.", Fore.YELLOW)
+            press_enter_to_continue()
+            return None
+        elif 1 <= choice <= len(key_types):
+            selected_dungeon = key_types[choice-1]
+        elif self.player.pages >= 5 and choice == len(options)-1:
+            selected_dungeon = "Final"
         else:
-            return {"name": "Unknown Boss", "hp": 200, "attack": 25}
+            display_message(f"{Fore.RED}Invalid choice. Returning to main menu.{Style.RESET_ALL}", Fore.RED)
+            clear_type_ahead()
+            press_enter_to_continue()
+            return None
+
+        # Check if player has the required key
+        required_key = None
+        if selected_dungeon == "Final":
+            required_key = next((item for item in self.player.inventory.items if item.type == "key" and item.key_type == "Final"), None)
+        else:
+            required_key = next((item for item in self.player.inventory.items if item.type == "key" and item.key_type == selected_dungeon), None)
+
+        if not required_key:
+            display_message(f"\n🔑 You don't have the {selected_dungeon} Key to explore this dungeon.", Fore.RED)
+            press_enter_to_continue()
+            return None
+        return selected_dungeon, required_key
+
+    def clear_dungeon(self, num_mobs):
+        """Reward clearing the current dungeon level and move on to the next one."""
+        display_message(f"\n*** 🎉 Dungeon Level {self.current_dungeon_level} Cleared! ***", Fore.GREEN)
+        # After clearing dungeon, player gains XP and may level up
+        xp_gain = num_mobs * 20 + 100  # Example XP calculation
+        if self.endless:
+            # Deeper dungeons pay more, so leveling keeps up with the depth
+            xp_gain *= self.current_dungeon_level
+        self.player.gain_xp(xp_gain)
+        # Achievement for clearing a dungeon
+        self.player.unlock_achievement(f"Cleared Dungeon Level {self.current_dungeon_level}")
+        # Increment dungeon level
+        self.current_dungeon_level += 1  # Increment dungeon level
+        self.dungeons_cleared += 1
+
+    def show_difficulty_estimate(self, mob, boss, num_mobs):
+        """Show exact fight odds against the dungeon's monster rooms and its boss."""
+        mob_odds = room_fight_odds(self, mob, PACK_SIZE_WEIGHTS)
+        boss_odds = fight_odds(self, boss)
+        display_message(
+            f"• Per room of {mob.name}s (alone or in packs): {mob_odds.win_probability:.0%} win chance, "
+            f"~{mob_odds.expected_turns:.1f} turns, ~{mob_odds.expected_hp_left:.0f} HP left",
+            Fore.YELLOW
+        )
+        display_message(
+            f"• Versus {boss.name}: {boss_odds.win_probability:.0%} win chance, "
+            f"~{boss_odds.expected_turns:.1f} turns, ~{boss_odds.expected_hp_left:.0f} HP left",
+            Fore.MAGENTA
+        )
+        # Fights are not independent (HP carries over), so this is an optimistic bound
+        clear_chance = mob_odds.win_probability ** num_mobs * boss_odds.win_probability
+        if clear_chance >= 0.9:
+            rating, color = "Easy", Fore.GREEN
+        elif clear_chance >= 0.6:
+            rating, color = "Fair", Fore.YELLOW
+        elif clear_chance >= 0.25:
+            rating, color = "Hard", Fore.RED
+        else:
+            rating, color = "Deadly", Fore.RED
+        display_message(f"• Difficulty: {rating} (at most {clear_chance:.0%} chance to clear without resting)", color)
 
     def generate_rooms(self, scaled_level, dungeon_type, num_mobs, boss_name):
         return [{"type": "monster", "dungeon_type": dungeon_type} for _ in range(num_mobs)] + \
                [{"type": "boss", "dungeon_type": dungeon_type, "boss_name": boss_name}]
 
+    @traced("screen")
     def enter_room(self, room, scaled_level, dungeon_type, mobs_remaining):
         clear_screen()
         display_hud(self.player)
         if room["type"] == "monster":
             display_message("You enter a room... 🏚️", Fore.YELLOW)
-            enemy = Enemy.generate(scaled_level, dungeon_type)
-            display_message(f"You encounter a {enemy.name} (Level {enemy.level})! 👾\n", Fore.RED)
+            enemy = self.spawn_enemy(room, scaled_level, dungeon_type)
+            self.announce_enemy(enemy)
             press_enter_to_continue()
+            self.walk_to_enemy("You search the room... 🏚️")
             self.combat(enemy)
             if not enemy.is_alive():
                 self.drop_loot(enemy, dungeon_type)
         elif room["type"] == "boss":
             display_message("You enter the Boss Chamber... 🏰", Fore.YELLOW)
-            boss_name = room.get("boss_name", "Unknown Boss")
-            boss = Boss.generate(scaled_level, dungeon_type)
-            display_message(f"A formidable {boss.name} appears! (Level {boss.level}) 🐉\n", Fore.RED)
+            boss = self.spawn_enemy(room, scaled_level, dungeon_type)
+            self.announce_enemy(boss)
             press_enter_to_continue()
+            self.walk_to_enemy("You close in on the Boss... 🏰")
             self.combat(boss, is_boss=True)
             if not boss.is_alive():
                 self.drop_loot(boss, dungeon_type)
                 if dungeon_type == "Final":
-                    self.final_boss_defeated = True
+                    if self.endless:
+                        display_message("\nThe Dark Overlord falls, but the dungeons only grow deeper... 🕳️", Fore.MAGENTA)
+                        press_enter_to_continue()
+                    else:
+                        self.final_boss_defeated = True
+
+    def spawn_enemy(self, room, scaled_level, dungeon_type):
+        """Create the boss of a boss room, or the mob (alone or in a pack) of a monster room."""
+        if room["type"] == "boss":
+            return Boss.generate(scaled_level, dungeon_type)
+        group_size = self.rng.choices(list(PACK_SIZE_WEIGHTS), weights=list(PACK_SIZE_WEIGHTS.values()))[0]
+        if group_size == 1:
+            return Enemy.generate(scaled_level, dungeon_type, rng=self.rng)
+        return EnemyGroup.generate(scaled_level, dungeon_type, group_size, rng=self.rng)
+
+    def announce_enemy(self, enemy):
+        if enemy.is_boss:
+            display_message(f"A formidable {enemy.name} appears! (Level {enemy.level}) 🐉\n", Fore.RED)
+        elif isinstance(enemy, EnemyGroup):
+            display_message(f"You encounter a {enemy.label} (Level {enemy.level})! 👾\n", Fore.RED)
+        else:
+            display_message(f"You encounter a {enemy.name} (Level {enemy.level})! 👾\n", Fore.RED)
+
+    def walk_to_enemy(self, header):
+        """
+        Make the player cross the room's tile map to reach the enemy before the fight.
+
+        Skipped when NumPy (needed for tile maps) is not installed.
+        """
+        if DungeonMap is None:
+            return
+        room_map = DungeonMap.generate(ROOM_MAP_WIDTH, ROOM_MAP_HEIGHT, rng=self.rng)
+        start = room_map.random_floor(rng=self.rng)
+        room_map.place(MAP_PLAYER, *start)
+        goal = room_map.random_floor(far_from=start, min_distance=ROOM_MAP_WIDTH // 2, rng=self.rng)
+        room_map.place(MAP_ENEMY, *goal)
+        if room_map.find_path(start, goal) is None:
+            return  # Pillars walled the enemy off; just fight
+        directions = {1: (0, -1), 2: (0, 1), 3: (1, 0), 4: (-1, 0)}
+        enemy_seen = False
+        while True:
+            x, y = room_map.find(MAP_PLAYER)
+            room_map.compute_fov(x, y)
+            enemy_seen = enemy_seen or bool(room_map.visible[goal[1], goal[0]])
+            if abs(x - goal[0]) + abs(y - goal[1]) == 1:
+                return
+            clear_screen()
+            display_hud(self.player)
+            display_message(header, Fore.YELLOW)
+            print(room_map.render())
+            print()
+            options = ["Move North ⬆️", "Move South ⬇️", "Move East ➡️", "Move West ⬅️"]
+            if enemy_seen:
+                options.append("Charge the Enemy ⚔️")
+            choice = get_player_choice(options)
+            if choice in directions:
+                if not room_map.move(MAP_PLAYER, *directions[choice]):
+                    display_message("Something blocks your way. 🧱", Fore.YELLOW)
+                    press_enter_to_continue()
+            else:
+                # Walk the shortest path up to the tile next to the enemy
+                for step_x, step_y in room_map.find_path((x, y), goal)[:-1]:
+                    px, py = room_map.find(MAP_PLAYER)
+                    room_map.move(MAP_PLAYER, step_x - px, step_y - py)
 
+    @traced("screen")
     def combat(self, enemy, is_boss=False):
+        try:
+            if self.realtime and terminal_supported():
+                fled = run_fight(self, enemy, is_boss) == FLED
+            else:
+                fled = self.turn_based_combat(enemy, is_boss)
+        finally:
+            # Every effect ends with the fight
+            self.report_effects(self.effects.clear())
+        if fled:
+            return
+
+        if not enemy.is_alive():
+            if is_boss:
+                display_message(f"\n*** You have defeated the Boss {enemy.name}! *** 🎉", Fore.GREEN)
+            else:
+                display_message(f"\nYou have defeated the {enemy.name}! 🎊", Fore.GREEN)
+
+        self.recharge_special_ability()
+        press_enter_to_continue()
+
+    def recharge_special_ability(self):
+        """After a fight, the special ability recharges once the player is halfway to the next level."""
+        if not self.player.special_ability_ready and self.player.xp >= self.player.xp_to_next_level / 2:
+            self.player.reset_special_ability()
+
+    def turn_based_combat(self, enemy, is_boss):
+        """Fight until one side falls or the player flees. Returns True if the player fled."""
+        # Turn order comes from speed, so haste and slow change how often each side acts
+        scheduler = self.new_turn_scheduler()
+        start_tick = self.effects.tick
         while enemy.is_alive() and self.player.is_alive():
+            actor = scheduler.next()
+            # Effects tick once per base action time, so haste does not speed them up
+            self.report_effects(self.effects.advance(start_tick + int(scheduler.now // ACTION_TIME)))
+            if not (enemy.is_alive() and self.player.is_alive()):
+                break
+            if actor == "enemy":
+                self.enemy_turn(enemy)
+            elif self.player_turn(enemy, is_boss, scheduler):
+                return True
+        return False
+
+    def report_effects(self, events):
+        for event, effect, amount in events:
+            on_player = effect.owner == "player"
+            name = "you" if on_player else effect.target.name
+            if event == TICK:
+                if on_player:
+                    self.last_damage_source = effect.kind.name
+                display_message(f"\n{effect.kind.emoji} {effect.kind.name} deals {amount} damage to {name}.", Fore.MAGENTA)
+            else:
+                display_message(f"\n{effect.kind.emoji} {effect.kind.name} wears off {name}.", Fore.YELLOW)
+
+    def new_turn_scheduler(self):
+        """Create the initiative order for a fight between the player and one enemy."""
+        scheduler = TurnScheduler()
+        scheduler.add("player", self.player_speed())
+        scheduler.add("enemy", self.enemy_speed())
+        return scheduler
+
+    def player_speed(self):
+        return combat_speeds(self.player.inventory.equipped_armor)[0]
+
+    def enemy_speed(self):
+        return combat_speeds(self.player.inventory.equipped_armor)[1]
+
+    def player_turn(self, enemy, is_boss, scheduler):
+        """Show the combat screen and carry out one player action. Returns True if the player fled."""
+        while True:
             clear_screen()
             display_hud(self.player)
-            display_message(f"Enemy: {enemy.name} | HP: {enemy.hp}", Fore.RED)
+            if isinstance(enemy, EnemyGroup):
+                for line in enemy.summary_lines():
+                    display_message(line, Fore.RED)
+            else:
+                display_message(f"Enemy: {enemy.name} | HP: {enemy.hp}", Fore.RED)
             print()
 
+            for owner, label in (("player", "You"), ("enemy", enemy.name)):
+                active = self.effects.active(owner)
+                if active:
+                    statuses = ", ".join(
+                        f"{effect.kind.emoji} {effect.kind.name}" + (f" x{effect.stacks}" if effect.stacks > 1 else "")
+                        for effect in active
+                    )
+                    display_message(f"{label}: {statuses}", Fore.MAGENTA)
+
             if is_boss:
                 print(f"{Fore.MAGENTA}✨ Boss Ability: {int(enemy.special_attack_chance * 100)}% chance to perform special attacks.{Style.RESET_ALL}\n")
 
             # Check if player has consumable items
-            has_consumables = any(item.type == "consumable" for item in self.player.inventory.items)
+            has_consumables = self.player.inventory.count_type("consumable") > 0
             display_message("Choose your action:", Fore.CYAN)
             action_options = []
             if self.player.special_ability_ready and has_consumables:
@@ -287,8 +566,12 @@ class Game:
                     "Attack ⚔️",
                     "Flee 🏃‍♂️"
                 ]
+            action_options.append("Ask for a Hint 💡")
 
             choice = get_player_choice(action_options)
+            if choice == len(action_options):
+                self.show_combat_hint(enemy, scheduler)
+                continue  # Asking for a hint does not use up the turn
 
             # Handle player actions
             if self.player.special_ability_ready and has_consumables:
@@ -299,53 +582,46 @@ class Game:
                 elif choice == 3:
                     self.player_use_special_ability(enemy)
                 elif choice == 4:
-                    if self.attempt_flee():
-                        return
+                    return self.attempt_flee()
             elif self.player.special_ability_ready:
                 if choice == 1:
                     self.player_attack(enemy)
                 elif choice == 2:
                     self.player_use_special_ability(enemy)
                 elif choice == 3:
-                    if self.attempt_flee():
-                        return
+                    return self.attempt_flee()
             elif has_consumables:
                 if choice == 1:
                     self.player_attack(enemy)
                 elif choice == 2:
                     self.use_consumable_in_combat(enemy)
                 elif choice == 3:
-                    if self.attempt_flee():
-                        return
+                    return self.attempt_flee()
             else:
                 if choice == 1:
                     self.player_attack(enemy)
                 elif choice == 2:
-                    if self.attempt_flee():
-                        return
-
-            # Enemy's turn
-            if enemy.is_alive():
-                self.enemy_turn(enemy)
-            else:
-                if is_boss:
-                    display_message(f"\n*** You have defeated the Boss {enemy.name}! *** 🎉", Fore.GREEN)
-                else:
-                    display_message(f"\nYou have defeated the {enemy.name}! 🎊", Fore.GREEN)
-
-        # Reset special ability if it was used
-        if not self.player.special_ability_ready and self.player.xp >= self.player.xp_to_next_level / 2:
-            self.player.reset_special_ability()
+                    return self.attempt_flee()
+            return False
 
+    @traced("turn")
+    def show_combat_hint(self, enemy, scheduler=None):
+        advice = self.advisor.advise_for_game(self, enemy, scheduler=scheduler)
+        display_message(
+            f"\n💡 Hint: {describe_action(advice.action)} looks best "
+            f"(searched {advice.depth} turn(s) ahead).",
+            Fore.CYAN
+        )
         press_enter_to_continue()
 
+    @traced("turn")
     def player_attack(self, enemy):
         damage = max(0, self.player.attack - enemy.defense)
         damage += self.player.pages * 2
 
         # Amulet of Strength unique effect: chance to deal double damage
         if self.player.inventory.equipped_weapon and self.player.inventory.equipped_weapon.name == "Amulet of Strength":
-            if random.random() < 0.25:  # 25% chance for double damage
+            if self.rng.random() < 0.25:  # 25% chance for double damage
                 damage *= 2
                 display_message(f"\nThe Amulet of Strength glows! You deal double damage to {enemy.name} for {damage} damage! 💥", Fore.YELLOW)
 
@@ -355,55 +631,85 @@ class Game:
             damage += fire_damage
             display_message(f"\nYour Flame Sword burns {enemy.name} for an additional {fire_damage} fire damage! 🔥", Fore.RED)
 
-        # Boots of Swiftness unique effect: double attack
-        if self.player.inventory.equipped_armor and self.player.inventory.equipped_armor.name == "Boots of Swiftness":
-            total_damage = damage * 2
-            display_message(f"\nYou swiftly attack {enemy.name} twice for a total of {total_damage} damage! ⚔️", Fore.MAGENTA)
-        else:
-            total_damage = damage
-            display_message(f"\nYou attack {enemy.name} for {total_damage} damage. 🗡️", Fore.GREEN)
+        # Unique effects added by content packs
+        for item in (self.player.inventory.equipped_weapon, self.player.inventory.equipped_armor):
+            effect = unique_effect(item)
+            if effect is not None and effect.on_attack is not None:
+                damage = effect.on_attack(self, enemy, damage)
 
-        enemy.hp -= total_damage
+        display_message(f"\nYou attack {enemy.name} for {damage} damage. 🗡️", Fore.GREEN)
+        enemy.hp -= damage
+
+        # Shadow Blade unique effect: chance to blind the enemy
+        if self.player.inventory.equipped_weapon and self.player.inventory.equipped_weapon.name == "Shadow Blade":
+            if self.rng.random() < BLIND_CHANCE:
+                self.effects.apply("enemy", enemy, BLIND, duration=BLIND_TICKS)
+                display_message(f"\nYour Shadow Blade blinds {enemy.name}! 🌑", Fore.MAGENTA)
         self.player.unlock_achievement("First Blood")
 
+    @traced("turn")
     def use_consumable_in_combat(self, enemy):
-        consumables = [item for item in self.player.inventory.items if item.type == "consumable"]
+        consumables = [entry for entry in self.player.inventory.entries if entry.item.type == "consumable"]
         if not consumables:
             display_message("\nNo consumable items available to use. ❌", Fore.RED)
             press_enter_to_continue()
             return
         display_message("\n--- Use Consumable Item --- 🔥", Fore.CYAN)
-        options = [f"{item.name} - {item.description}" for item in consumables] + ["Cancel"]
+        options = [
+            f"{entry.item.name}{f' x{entry.count}' if entry.count > 1 else ''} - {entry.item.description}"
+            for entry in consumables
+        ] + ["Cancel"]
         choice = get_player_choice(options)
         if choice == len(options):
             return
-        selected_item = consumables[choice-1]
+        selected_item = consumables[choice-1].item
         # Apply the consumable's effect
         if selected_item.name == "Bomb":
             display_message(f"\n🧨 You used {selected_item.name}! It deals 20 damage to the enemy. 💣", Fore.MAGENTA)
             enemy.hp -= 20
             display_message(f"{enemy.name} takes 20 additional damage from the bomb! 🔥", Fore.MAGENTA)
+            self.player.inventory.remove_item(selected_item)
         elif selected_item.name == "Scroll of Fireball":
             display_message(f"\n🔥 You used {selected_item.name}! It deals 30 damage to all enemies. 🔥", Fore.MAGENTA)
-            enemy.hp -= 30
-            display_message(f"{enemy.name} takes 30 additional damage from the fireball! 🔥", Fore.MAGENTA)
+            hit = enemy.apply_area_damage(30)
+            display_message(f"The fireball engulfs {hit} enem{'y' if hit == 1 else 'ies'} for 30 damage each! 🔥", Fore.MAGENTA)
+            self.player.inventory.remove_item(selected_item)
+        elif selected_item.name == "Lightning Scroll":
+            display_message(f"\n⚡ You used {selected_item.name}! It deals 40 lightning damage to all enemies. ⚡", Fore.MAGENTA)
+            hit = enemy.apply_area_damage(40)
+            display_message(f"Lightning strikes {hit} enem{'y' if hit == 1 else 'ies'} for 40 damage each! ⚡", Fore.MAGENTA)
+            self.player.inventory.remove_item(selected_item)
+        elif selected_item.name == "Poison Dagger":
+            # The damage is dealt a share per tick rather than all at once
+            per_tick = (POISON_DAMAGE + self.player.pages) // POISON_TICKS
+            poison = self.effects.apply("enemy", enemy, POISON, per_tick, POISON_TICKS)
+            display_message(
+                f"\n☠️ You used {selected_item.name}! {enemy.name} is poisoned for {poison.magnitude} damage "
+                f"per turn for {POISON_TICKS} turns. 🩸",
+                Fore.MAGENTA
+            )
+            self.player.inventory.remove_item(selected_item)
         else:
             self.apply_consumable_effect(selected_item)
-        # No need to remove the item here, it's already handled in apply_consumable_effect
+        # Non-damage items are removed in apply_consumable_effect
 
         # Achievement for using consumables
         self.player.unlock_achievement(f"Used {selected_item.name}")
 
+    @traced("turn")
     def player_use_special_ability(self, enemy):
-        self.player.use_special_ability()
+        if self.player.use_special_ability():
+            # Double attack until the next tick
+            self.effects.apply("player", self.player, EMPOWERED, self.player.attack, duration=1)
         damage = max(0, self.player.attack - enemy.defense)
         # Scale damage based on player pages
         damage += self.player.pages * 3
         enemy.hp -= damage
         display_message(f"\nYour special attack deals {damage} damage to {enemy.name}! 💥", Fore.MAGENTA)
 
+    @traced("turn")
     def attempt_flee(self):
-        flee_success = random.random() < 0.5
+        flee_success = self.rng.random() < 0.5
         if flee_success:
             display_message("\nYou successfully fled the battle. 🏃‍♂️", Fore.GREEN)
             self.player.reset_special_ability()
@@ -414,31 +720,37 @@ class Game:
             press_enter_to_continue()
             return False
 
+    @traced("turn")
     def enemy_turn(self, enemy):
-        damage, attack_type = enemy.perform_attack()
-        # Scale enemy damage based on dungeon level
-        damage += self.current_dungeon_level
+        if self.effects.has("enemy", BLIND) and self.rng.random() < BLIND_MISS_CHANCE:
+            display_message(f"\n{enemy.name} is blinded and misses you! 🌑", Fore.MAGENTA)
+            return
+        # Scale enemy damage based on dungeon level (added to every hit)
+        damage, attack_type = enemy.perform_attack(bonus=self.current_dungeon_level, rng=self.rng)
     # Guardian Shield unique effect: reduce incoming damage by 10%
         if self.player.inventory.equipped_armor and self.player.inventory.equipped_armor.name == "Guardian Shield":
             damage = int(damage * 0.9)
             display_message(f"\nYour Guardian Shield reduces the damage by 10%! You take {damage} damage.", Fore.CYAN)
 
-        # Frost Armor unique effect: slow enemies, reducing attack by 10%
-        if self.player.inventory.equipped_armor and self.player.inventory.equipped_armor.name == "Frost Armor":
-            enemy.attack = int(enemy.attack * 0.9)
-            display_message(f"\nYour Frost Armor slows {enemy.name}, reducing its attack power by 10%. ❄️", Fore.CYAN)
-
         # Shadow Cloak unique effect: 25% chance to avoid attack
         if self.player.inventory.equipped_armor and self.player.inventory.equipped_armor.name == "Shadow Cloak":
-            if random.random() < 0.25:
+            if self.rng.random() < 0.25:
                 display_message(f"\nYou become invisible and avoid {enemy.name}'s attack! 🖤", Fore.MAGENTA)
                 return  # Skip the enemy's attack
-            
+
+        for item in (self.player.inventory.equipped_weapon, self.player.inventory.equipped_armor):
+            effect = unique_effect(item)
+            if effect is not None and effect.on_hit is not None:
+                damage = effect.on_hit(self, enemy, damage)
+
         self.player.hp -= damage
+        self.last_damage_source = enemy.name
         if attack_type == "Fire Breath":
             display_message(f"\n{enemy.name} uses {attack_type} and deals {damage} damage! 🔥", Fore.RED)
         elif attack_type == "a powerful strike":
             display_message(f"\n{enemy.name} uses {attack_type} and deals {damage} damage! ⚔️", Fore.RED)
+        elif isinstance(enemy, EnemyGroup):
+            display_message(f"\nThe {enemy.label} land {attack_type} on you for {damage} damage. 🩸", Fore.RED)
         else:
             display_message(f"\n{enemy.name} {attack_type} you for {damage} damage. 🩸", Fore.RED)
 
@@ -451,13 +763,8 @@ class Game:
             self.player.hp = min(self.player.hp + heal_amount, self.player.max_hp)
             display_message(f"\nYou used {item.name} and healed {heal_amount} HP. 🩸", Fore.GREEN)
         elif item.name == "Elixir of Fortitude":
-            self.player.defense += 5
+            self.effects.apply("player", self.player, FORTITUDE, FORTITUDE_DEFENSE)
             display_message(f"\nYou used {item.name}! Defense increased by 5 for the next combat. 🛡️", Fore.MAGENTA)
-        elif item.name == "Poison Dagger":
-            # Implement poison effect
-            poison_damage = 15 + self.player.pages * 1
-            self.player.hp -= poison_damage
-            display_message(f"\n☠️ You used {item.name}! It deals {poison_damage} poison damage over time. 🩸", Fore.MAGENTA)
         elif item.name == "Revive Potion":
             # Implement revive effect
             if self.player.hp <= 0:
@@ -465,10 +772,6 @@ class Game:
                 display_message(f"\n🛡️ You used {item.name}! You have been revived with {self.player.hp} HP. 🩸", Fore.GREEN)
             else:
                 display_message(f"\n🔮 {item.name} has no effect right now.", Fore.YELLOW)
-        elif item.name == "Lightning Scroll":
-            display_message(f"\n⚡ You used {item.name}! It deals 40 lightning damage to all enemies. ⚡", Fore.MAGENTA)
-            enemy = Enemy(name="Dummy", level=self.player.level, hp=40, attack=0, defense=0, xp_reward=0)
-            enemy.hp -= 40  # Simulate damage to all enemies
         else:
             display_message(f"\nYou used {item.name}, but nothing happened. ❓", Fore.YELLOW)
         # Remove the item after use
@@ -476,10 +779,11 @@ class Game:
         # Achievement for using consumables
         self.player.unlock_achievement(f"Used {item.name}")
 
+    @traced("screen")
     def drop_loot(self, enemy, dungeon_type):
         if enemy.is_boss:
             # Bosses drop a unique item and a page
-            loot_item = BOSS_LOOT.get(enemy.name, None)
+            loot_item = boss_loot(enemy.name, dungeon_type)
             if loot_item:
                 # Scale loot based on player pages
                 scaled_attack = loot_item.attack_bonus + self.player.pages
@@ -497,6 +801,7 @@ class Game:
                 )
                 self.player.inventory.add_item(scaled_loot)
                 display_message(f"\n🛍️ {enemy.name} dropped {scaled_loot.name}! {scaled_loot.description}", Fore.GREEN)
+                self.suggest_equipment(scaled_loot, enemy)
                 # Achievement for obtaining a unique item
                 self.player.unlock_achievement(f"Obtained {scaled_loot.name}")
             # Drop a guaranteed page
@@ -507,11 +812,10 @@ class Game:
             if dungeon_type != "Final":
                 # Chance to drop a key based on dungeon type
                 key_drop_chance = 0.3
-                if random.random() < key_drop_chance:
+                if self.rng.random() < key_drop_chance:
                     key_name = f"{dungeon_type} Key"
-                    key_item = next((item for item in LOOT_TABLE if item.name == key_name and item.type == "key"), None)
+                    key_item = next((item for item in loot_table() if item.name == key_name and item.type == "key"), None)
                     if key_item:
-                        self.player.keys += 1
                         # Scale key stats based on pages
                         scaled_key = Item(
                             name=key_item.name,
@@ -524,15 +828,15 @@ class Game:
                             type=key_item.type,
                             key_type=key_item.key_type
                         )
-                        self.player.inventory.add_item(scaled_key)
+                        self.add_keys(scaled_key)
                         display_message(f"\n🔑 {enemy.name} dropped a {scaled_key.name}! {scaled_key.description}", Fore.GREEN)
                         # Achievement for obtaining a key
                         self.player.unlock_achievement(f"Obtained {scaled_key.name}")
         else:
             # Regular mobs drop items based on loot table
             drop_chance = 0.5  # 50% chance to drop loot
-            if random.random() < drop_chance:
-                loot_item = random.choice(LOOT_TABLE)
+            if self.rng.random() < drop_chance:
+                loot_item = self.rng.choice(loot_table())
                 # Scale loot based on player pages
                 scaled_attack = loot_item.attack_bonus + self.player.pages
                 scaled_defense = loot_item.defense_bonus + self.player.pages
@@ -549,13 +853,14 @@ class Game:
                 )
                 self.player.inventory.add_item(scaled_loot)
                 display_message(f"\n🛍️ {enemy.name} dropped {scaled_loot.name}! {scaled_loot.description}", Fore.GREEN)
+                self.suggest_equipment(scaled_loot, enemy)
                 # Achievement for obtaining an item for the first time
                 self.player.unlock_achievement(f"Obtained {scaled_loot.name}")
             # Chance to drop additional equippable gear
-            if not enemy.is_boss and random.random() < 0.2:  # 20% chance
-                equippable_items = [item for item in LOOT_TABLE if item.type == "equippable"]
+            if not enemy.is_boss and self.rng.random() < 0.2:  # 20% chance
+                equippable_items = [item for item in loot_table() if item.type == "equippable"]
                 if equippable_items:
-                    additional_loot = random.choice(equippable_items)
+                    additional_loot = self.rng.choice(equippable_items)
                     scaled_attack = additional_loot.attack_bonus + self.player.pages
                     scaled_defense = additional_loot.defense_bonus + self.player.pages
                     scaled_additional_loot = Item(
@@ -571,10 +876,39 @@ class Game:
                     )
                     self.player.inventory.add_item(scaled_additional_loot)
                     display_message(f"\n✨ {enemy.name} also dropped {scaled_additional_loot.name}! {scaled_additional_loot.description}", Fore.BLUE)
+                    self.suggest_equipment(scaled_additional_loot, enemy)
                     # Achievement for obtaining additional equippable gear
                     self.player.unlock_achievement(f"Obtained {scaled_additional_loot.name}")
         press_enter_to_continue()
 
+    def suggest_equipment(self, item, enemy):
+        """Point out a newly found weapon or armor that would beat the current gear against enemies like this one."""
+        if upgrade_gain(self, item, reference_enemy(enemy.level)) > 0:
+            worn = getattr(self.player.inventory, f"equipped_{item.type}")
+            display_message(
+                f"💡 {item.name} would serve you better than {worn.name if worn else f'an empty {item.type} slot'}. "
+                f"Equip it from the inventory (B: Equip best gear).",
+                Fore.CYAN
+            )
+
+    def equip_best_gear(self):
+        """Wear the weapon and armor that score best against a typical enemy of the next dungeon."""
+        enemy = reference_enemy(self.current_dungeon_level + self.player.level)
+        loadout = best_loadout(self, enemy)
+        changed = False
+        for slot, item in (("weapon", loadout.weapon), ("armor", loadout.armor)):
+            if item is None or item is getattr(self.player.inventory, f"equipped_{slot}"):
+                continue
+            previous = self.player.equip(item)
+            changed = True
+            # Amulet of Vitality raises max HP while worn; the new HP comes with it
+            if item.name == "Amulet of Vitality" and (previous is None or previous.name != item.name):
+                self.player.hp = min(self.player.hp + 30, self.player.max_hp)
+            display_message(f"Equipped {item.emoji()} {item.name} as {slot.capitalize()}.", Fore.GREEN)
+            self.player.unlock_achievement(f"Equipped {item.name} as {slot.capitalize()}")
+        if not changed:
+            display_message("You are already wearing your best gear.", Fore.YELLOW)
+
     def rest(self):
         clear_screen()
         display_hud(self.player)
@@ -587,7 +921,11 @@ class Game:
         # Achievement for resting
         self.player.unlock_achievement("Rested and Recovered HP")
 
+    @traced("screen")
     def visit_shop(self):
+        if self.market is not None:
+            self.visit_market()
+            return
         while True:
             clear_screen()
             display_hud(self.player)
@@ -607,6 +945,7 @@ class Game:
                 break
             else:
                 display_message(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}", Fore.RED)
+                clear_type_ahead()
                 press_enter_to_continue()
 
     def buy_items(self):
@@ -635,8 +974,15 @@ class Game:
             if choice == len(options):
                 return
             selected_item = available_items[choice-1]
-            if self.player.gold >= selected_item.price:
-                self.player.gold -= selected_item.price
+            affordable = self.player.gold // selected_item.price
+            if affordable < 1:
+                display_message("Not enough gold to purchase this item.", Fore.RED)
+                press_enter_to_continue()
+                continue
+            quantity = get_quantity(affordable, "Buy how many")
+            if quantity:
+                total_price = selected_item.price * quantity
+                self.player.gold -= total_price
                 # Scale item stats based on player pages
                 scaled_attack = selected_item.attack_bonus + self.player.pages
                 scaled_defense = selected_item.defense_bonus + self.player.pages
@@ -651,12 +997,14 @@ class Game:
                     type=selected_item.type,
                     key_type=selected_item.key_type
                 )
-                self.player.inventory.add_item(scaled_item)
-                display_message(f"Purchased {scaled_item.emoji()} {scaled_item.name} for {scaled_item.price} gold.", Fore.GREEN)
+                if scaled_item.type == "key":
+                    self.add_keys(scaled_item, quantity)
+                else:
+                    self.player.inventory.add_item(scaled_item, quantity)
+                count = f" x{quantity}" if quantity > 1 else ""
+                display_message(f"Purchased {scaled_item.emoji()} {scaled_item.name}{count} for {total_price} gold.", Fore.GREEN)
                 # Achievement
                 self.player.unlock_achievement(f"Purchased {scaled_item.name}")
-            else:
-                display_message("Not enough gold to purchase this item.", Fore.RED)
             press_enter_to_continue()
 
     def sell_keys(self):
@@ -665,46 +1013,192 @@ class Game:
             display_hud(self.player)
             display_message("--- Shop: Sell Dungeon Keys --- 🏷️", Fore.CYAN)
             print(f"You have {self.player.keys} Dungeon Key(s).")
-            print("Each key sells for 10 gold.")
-            print("\n0. Return to Shop")
-            choice = input("Enter number of keys to sell or return: ")
-            if choice == '0':
+            print(f"Each key sells for {KEY_SELL_PRICE} gold.\n")
+            key_entries = [entry for entry in self.player.inventory.entries if entry.item.type == "key"]
+            options = [f"{entry.item.emoji()} {entry.item.name} x{entry.count}" for entry in key_entries]
+            options.append("Return to Shop")
+            choice = get_player_choice(options)
+            if choice == len(options):
                 return
-            elif choice.isdigit() and 1 <= int(choice) <= self.player.keys:
-                quantity = int(choice)
-                sell_price_per_key = 10
-                total_gold = sell_price_per_key * quantity
-                self.player.keys -= quantity
+            entry = key_entries[choice-1]
+            quantity = get_quantity(entry.count, "Sell how many")
+            if quantity:
+                sold = self.player.inventory.remove_item(entry.item, quantity)
+                total_gold = KEY_SELL_PRICE * sold
                 self.player.gold += total_gold
-                display_message(f"Sold {quantity} Dungeon Key(s) for {total_gold} gold.", Fore.GREEN)
+                display_message(f"Sold {sold} Dungeon Key(s) for {total_gold} gold.", Fore.GREEN)
                 # Achievement for selling keys
-                self.player.unlock_achievement(f"Sold {quantity} Dungeon Key(s)")
+                self.player.unlock_achievement(f"Sold {sold} Dungeon Key(s)")
+            press_enter_to_continue()
+
+    @traced("screen")
+    def visit_market(self):
+        while True:
+            delivered = self.market.settle(self.market_id, self.player)
+            clear_screen()
+            display_hud(self.player)
+            display_message("--- Player Market --- 🤝", Fore.CYAN)
+            if delivered:
+                items = sum(entry.count for entry in delivered.items.values())
+                display_message(f"Your orders brought in {delivered.gold} gold and {items} item(s) since your last visit.\n", Fore.GREEN)
+            options = [
+                "Post Buy Order 🛍️",
+                "Post Sell Order 🏷️",
+                "My Orders 📋",
+                "Return to Main Menu ↩️"
+            ]
+            choice = get_player_choice(options)
+
+            if choice == 1:
+                self.post_buy_order()
+            elif choice == 2:
+                self.post_sell_order()
+            elif choice == 3:
+                self.manage_market_orders()
+            elif choice == 4:
+                break
             else:
                 display_message(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}", Fore.RED)
+                clear_type_ahead()
+                press_enter_to_continue()
+
+    def describe_market_price(self, item):
+        bid = self.market.best_price(item, BUY)
+        ask = self.market.best_price(item, SELL)
+        return f"Bid: {bid if bid is not None else '-'} | Ask: {ask if ask is not None else '-'}"
+
+    def post_buy_order(self):
+        clear_screen()
+        display_hud(self.player)
+        display_message("--- Market: Post Buy Order --- 🛍️", Fore.CYAN)
+        catalog = market_catalog(item for item, _, _ in self.market.listings())
+        options = [f"{item.emoji()} {item.name} - {item.description} | {self.describe_market_price(item)}" for item in catalog]
+        options.append("Return to Market")
+        choice = get_player_choice(options)
+        if choice == len(options):
+            return
+        item = catalog[choice-1]
+        if self.player.gold < 1:
+            display_message("You have no gold to offer.", Fore.RED)
             press_enter_to_continue()
+            return
+        price = get_quantity(self.player.gold, "Highest price per item")
+        quantity = get_quantity(self.player.gold // price, "Buy how many") if price else 0
+        if quantity and self.confirm_market_order(
+                f"Buy {quantity} x {item.name} at up to {price} gold each ({price * quantity} gold held until it fills)?"):
+            order, fills = self.market.place(self.market_id, self.player, BUY, item, price, quantity)
+            self.report_market_order(order, fills, "Bought")
+        press_enter_to_continue()
 
-    def explore_overworld(self):
+    def post_sell_order(self):
         clear_screen()
         display_hud(self.player)
-        display_message("--- Exploring Overworld --- 🏞️", Fore.GREEN)
-        # Random event: chance to get a key or gold or encounter a scaled mob
-        event_chance = random.random()
+        display_message("--- Market: Post Sell Order --- 🏷️", Fore.CYAN)
+        entries = self.player.inventory.entries
+        options = [f"{entry.item.emoji()} {entry.item.name} x{entry.count} | {self.describe_market_price(entry.item)}" for entry in entries]
+        options.append("Return to Market")
+        choice = get_player_choice(options)
+        if choice == len(options):
+            return
+        entry = entries[choice-1]
+        price = get_quantity(MAX_MARKET_PRICE, "Lowest price per item")
+        quantity = get_quantity(entry.count, "Sell how many") if price else 0
+        if quantity and self.confirm_market_order(
+                f"Sell {quantity} x {entry.item.name} at no less than {price} gold each (items held until it fills)?"):
+            order, fills = self.market.place(self.market_id, self.player, SELL, entry.item, price, quantity)
+            self.report_market_order(order, fills, "Sold")
+        press_enter_to_continue()
+
+    def confirm_market_order(self, question):
+        """Ask before an order takes its escrow; the prompts before it may have answered themselves."""
+        if read_input(f"{question} (yes/no): ").lower() in ['yes', 'y']:
+            return True
+        display_message("Order canceled.", Fore.YELLOW)
+        return False
+
+    def report_market_order(self, order, fills, verb):
+        for fill in fills:
+            count = f" x{fill.quantity}" if fill.quantity > 1 else ""
+            display_message(f"{verb} {fill.item.emoji()} {fill.item.name}{count} at {fill.price} gold each.", Fore.GREEN)
+        if order.active:
+            display_message(f"Order #{order.order_id} for {order.remaining} more waits in the market.", Fore.YELLOW)
+
+    def manage_market_orders(self):
+        while True:
+            clear_screen()
+            display_hud(self.player)
+            display_message("--- Market: My Orders --- 📋", Fore.CYAN)
+            orders = self.market.open_orders(self.market_id)
+            options = [
+                f"Cancel #{order.order_id}: {order.side} {order.item.name} x{order.remaining} at {order.price} gold"
+                for order in orders
+            ]
+            options.append("Return to Market")
+            choice = get_player_choice(options)
+            if choice == len(options):
+                return
+            if self.market.cancel(self.market_id, orders[choice-1].order_id):
+                display_message("Order canceled; its gold or items are returned on your next market visit.", Fore.YELLOW)
+            else:
+                display_message("That order has already been filled.", Fore.RED)
+            press_enter_to_continue()
+
+    def add_keys(self, key, count=1):
+        """Add dungeon keys to the inventory and check the key-collecting achievement."""
+        self.player.inventory.add_item(key, count)
+        if self.player.keys >= KEY_HOARDER_COUNT:
+            self.player.unlock_achievement("Key Hoarder")
+
+    @traced("screen")
+    def explore_overworld(self):
+        directions = {1: (0, -1), 2: (0, 1), 3: (1, 0), 4: (-1, 0)}
+        while self.player.is_alive():
+            clear_screen()
+            display_hud(self.player)
+            display_message("--- Exploring Overworld --- 🏞️", Fore.GREEN)
+            x, y = self.overworld.position
+            display_message(f"📍 Position ({x}, {y}) - {self.overworld.biome_at(x, y)}", Fore.GREEN)
+            nearest = self.overworld.nearest_poi()
+            if nearest:
+                px, py, kind, _ = nearest
+                display_message(
+                    f"🧭 Nearest point of interest: {POI_NAMES[kind]}, {describe_direction(px - x, py - y)}",
+                    Fore.CYAN
+                )
+            else:
+                display_message("🧭 Nothing of interest nearby. Try wandering further.", Fore.YELLOW)
+            options = ["Walk North ⬆️", "Walk South ⬇️", "Walk East ➡️", "Walk West ⬅️"]
+            if nearest:
+                options.append("Travel to Nearest Point of Interest 🧭")
+            options.append("Return to Main Menu")
+            choice = get_player_choice(options)
+
+            if choice == len(options):
+                return
+            if choice in directions:
+                x, y = self.overworld.move(*directions[choice])
+            else:
+                x, y = nearest[0], nearest[1]
+                self.overworld.position = (x, y)
+            poi = self.overworld.take_poi(x, y)
+            if poi:
+                self.visit_overworld_poi(*poi)
+
+    def visit_overworld_poi(self, kind, value):
+        """Resolve a point of interest the player has reached in the overworld."""
         self.overworld_explorations += 1
-        if event_chance < 0.4:
-            # 40% chance to find gold
-            gold_found = random.randint(10, 100)
+        if kind == POI_GOLD:
+            gold_found = value
             # Scale gold based on player pages
             gold_found += self.player.pages * 2
             self.player.gold += gold_found
-            display_message(f"You explore the overworld and find {gold_found} gold! 💰", Fore.GREEN)
+            display_message(f"\nYou explore the overworld and find {gold_found} gold! 💰", Fore.GREEN)
             self.player.unlock_achievement(f"Found {gold_found} gold in Overworld")
             # Achievement for obtaining gold
             if self.player.gold >= 50 and "Treasure Hunter" not in [ach.name for ach in self.player.achievements]:
                 self.player.unlock_achievement("Treasure Hunter")
-        elif event_chance < 0.7:
-            # 30% chance to find a dungeon key
-            key_types = ["Fire", "Ice", "Earth", "Lightning"]
-            key_found = random.choice(key_types)
+        elif kind == POI_KEY:
+            key_found = KEY_TYPES[value]
             # Create a key item
             key_item = Item(
                 name=f"{key_found} Key",
@@ -714,7 +1208,6 @@ class Game:
                 type="key",
                 key_type=key_found
             )
-            self.player.keys += 1
             # Scale key stats based on pages
             scaled_key = Item(
                 name=key_item.name,
@@ -727,33 +1220,25 @@ class Game:
                 type=key_item.type,
                 key_type=key_item.key_type
             )
-            self.player.inventory.add_item(scaled_key)
+            self.add_keys(scaled_key)
             display_message(f"You explore the overworld and find a {scaled_key.emoji()} {scaled_key.name}! 🔑", Fore.GREEN)
             # Achievement for finding a key
             self.player.unlock_achievement(f"Found a {scaled_key.name} in Overworld")
             # Achievement for collecting all key types
-            all_key_types = ["Fire", "Ice", "Earth", "Lightning"]
             collected_keys = set(item.key_type for item in self.player.inventory.items if item.type == "key")
-            if set(all_key_types).issubset(collected_keys):
+            if set(KEY_TYPES).issubset(collected_keys):
                 self.player.unlock_achievement("Master of Keys")
         else:
-            # 30% chance to encounter a random scaled mob
             display_message("\n🌲 You venture deeper into the wilderness...", Fore.GREEN)
             press_enter_to_continue()
-            scaled_level = self.player.level + random.randint(1, 3)
-            enemy = Enemy.generate(scaled_level, "Normal")
+            scaled_level = self.player.level + self.rng.randint(1, 3)
+            enemy = Enemy.generate(scaled_level, "Normal", rng=self.rng)
             display_message(f"You encounter a wild {enemy.name} (Level {enemy.level})! 🐾\n", Fore.RED)
             press_enter_to_continue()
             self.combat(enemy)
             if not enemy.is_alive():
                 self.drop_loot(enemy, "Normal")
-                # Option to continue or leave
-                options = ["Continue Exploring", "Return to Main Menu"]
-                choice = get_player_choice(options)
-                if choice == 2:
-                    display_message("You decide to return to the main path.", Fore.YELLOW)
-                    press_enter_to_continue()
-                    return
+            return
         press_enter_to_continue()
 
     def final_narrative(self):
@@ -766,5 +1251,6 @@ class Game:
         display_message(narrative)
         press_enter_to_continue()
         display_message("\n🌟 Congratulations! You have completed Rogue Slayer and restored peace to the land. 🌟", Fore.GREEN)
+        self.record_run("victory")
         press_enter_to_continue()
         exit()
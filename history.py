@@ -0,0 +1,193 @@
+# history.py
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_HISTORY_PATH = "run_history.db"
+
+RunRecord = namedtuple("RunRecord", [
+    "player", "seed", "outcome", "level", "pages", "dungeons_cleared",
+    "death_cause", "gold", "achievements", "ended_at",
+])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    seed INTEGER,
+    outcome TEXT NOT NULL,
+    victory INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    pages INTEGER NOT NULL,
+    dungeons_cleared INTEGER NOT NULL,
+    death_cause TEXT,
+    gold INTEGER NOT NULL,
+    achievements TEXT NOT NULL,
+    ended_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_leaderboard
+    ON runs (victory DESC, pages DESC, level DESC, dungeons_cleared DESC, gold DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_player
+    ON runs (player, ended_at DESC);
+"""
+
+# Leaderboard order; matches idx_runs_leaderboard so top-N is an index scan
+LEADERBOARD_ORDER = "victory DESC, pages DESC, level DESC, dungeons_cleared DESC, gold DESC"
+
+COLUMNS = "player, seed, outcome, level, pages, dungeons_cleared, death_cause, gold, achievements, ended_at"
+
+INSERT_SQL = f"INSERT INTO runs ({COLUMNS}, victory) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+def run_record_from_game(game, outcome, death_cause=None):
+    """
+    Summarize a finished run.
+
+    Args:
+        game (Game): The game whose run ended.
+        outcome (str): "victory", "death" or "quit".
+        death_cause (str): What killed the player, if they died.
+
+    Returns:
+        RunRecord: The record to store.
+    """
+    player = game.player
+    return RunRecord(
+        player=player.name,
+        seed=game.seed,
+        outcome=outcome,
+        level=player.level,
+        pages=player.pages,
+        dungeons_cleared=game.dungeons_cleared,
+        death_cause=death_cause,
+        gold=player.gold,
+        achievements=[ach.name for ach in player.achievements],
+        ended_at=time.time(),
+    )
+
+
+class RunHistory:
+    """
+    Local SQLite store of finished runs, with a leaderboard and per-player queries.
+
+    Writes never block the caller: records go on a queue and a writer thread commits
+    them in batches, in WAL mode so reads are not blocked by the writer either. A record
+    that cannot be written (e.g. the database is locked) is logged, counted in dropped
+    and skipped; the writer carries on with the rest.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, batch_size=500, flush_interval=0.25):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self.dropped = 0  # Records that failed to write
+        self._read_lock = threading.Lock()
+        self._reader = None
+        # Create the schema up front so readers never see a missing table
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._writer = threading.Thread(target=self._write_loop, name="run-history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record(self, run):
+        """Queue a RunRecord for writing; returns immediately."""
+        self._queue.put(run)
+
+    def flush(self):
+        """Block until every record queued so far is committed."""
+        self._queue.join()
+
+    def close(self):
+        """Write out pending records and stop the writer thread."""
+        if not self._writer.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
+        with self._read_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def _write_loop(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                batch.append(self._queue.get())
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+                if _STOP in batch:
+                    stopping = True
+                    batch = [run for run in batch if run is not _STOP]
+                if batch:
+                    self._write_batch(conn, batch)
+            finally:
+                for _ in range(len(batch) + (1 if stopping else 0)):
+                    self._queue.task_done()
+        conn.close()
+
+    def _write_batch(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany(INSERT_SQL, [self._row(run) for run in batch])
+            return
+        except Exception:
+            logger.exception("Writing %d run(s) to %s failed; retrying them one at a time", len(batch), self.path)
+        # Find the records at fault, so one bad record does not cost the others
+        for run in batch:
+            try:
+                with conn:
+                    conn.execute(INSERT_SQL, self._row(run))
+            except Exception:
+                self.dropped += 1
+                logger.exception("Dropped run record %r", run)
+
+    @staticmethod
+    def _row(run):
+        return (
+            run.player, run.seed, run.outcome, run.level, run.pages, run.dungeons_cleared,
+            run.death_cause, run.gold, json.dumps(run.achievements), run.ended_at,
+            1 if run.outcome == "victory" else 0,
+        )
+
+    def _query(self, sql, params):
+        with self._read_lock:
+            if self._reader is None:
+                self._reader = self._connect()
+            rows = self._reader.execute(sql, params).fetchall()
+        return [RunRecord(*row[:8], json.loads(row[8]), row[9]) for row in rows]
+
+    def top_runs(self, limit=10):
+        """Return the best runs, best first."""
+        return self._query(f"SELECT {COLUMNS} FROM runs ORDER BY {LEADERBOARD_ORDER} LIMIT ?", (limit,))
+
+    def runs_for_player(self, player, limit=10):
+        """Return a player's most recent runs, newest first."""
+        return self._query(
+            f"SELECT {COLUMNS} FROM runs WHERE player = ? ORDER BY ended_at DESC LIMIT ?", (player, limit)
+        )
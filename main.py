@@ -1,11 +1,88 @@
 # main.py
 
+import argparse
+
 from game import Game
+from history import DEFAULT_HISTORY_PATH, RunHistory
+from plugins import discover_plugins
+
+DEFAULT_WORLD_DIR = "worlds"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rogue Slayer")
+    parser.add_argument("--seed", type=int, help="Seed for a reproducible run.")
+    parser.add_argument("--record", metavar="PATH", help="Record this session to a replay file.")
+    parser.add_argument("--replay", metavar="PATH", help="Re-run a recorded session headless and verify it.")
+    parser.add_argument("--history", metavar="PATH", default=DEFAULT_HISTORY_PATH,
+                        help="SQLite file that stores finished runs and the leaderboard.")
+    parser.add_argument("--no-history", action="store_true", help="Do not record finished runs.")
+    parser.add_argument("--world-dir", metavar="DIR", default=DEFAULT_WORLD_DIR,
+                        help="Directory where explored overworld chunks are saved.")
+    parser.add_argument("--trace", metavar="PATH", help="Write a Chrome trace (chrome://tracing, Perfetto) of the session.")
+    parser.add_argument("--broadcast", metavar="PORT", type=int,
+                        help="Let spectators watch this session (python broadcast.py HOST --port PORT).")
+    parser.add_argument("--realtime", action="store_true",
+                        help="Fight in real time on a Unix terminal; enemies do not wait for you.")
+    parser.add_argument("--endless", action="store_true",
+                        help="Keep going after the Dark Overlord: dungeons get deeper for as long as you survive.")
+    return parser.parse_args()
+
 
 def main():
-    game = Game()
-    game.start()
+    args = parse_args()
+    discover_plugins()  # Reads package metadata only; packs are imported when their content is needed
+    if args.replay:
+        from replay import replay_file
+        result = replay_file(args.replay)
+        print(f"Replayed {result.inputs} inputs, {result.checkpoints} checkpoints verified ({result.outcome}).")
+        return
+    if args.record and args.realtime:
+        # Real-time commands are read straight from the terminal, between ticks, so a replay could not reproduce them
+        print("Real-time fights cannot be recorded; --realtime is off for this session.")
+        args.realtime = False
+    history = None if args.no_history else RunHistory(args.history)
+    tracer = None
+    if args.trace:
+        from tracing import Tracer
+        tracer = Tracer()
+        tracer.start()
+    broadcaster = server = None
+    if args.broadcast:
+        from broadcast import Broadcaster, serve
+        broadcaster = Broadcaster()
+        server = serve(broadcaster, port=args.broadcast)
+    game = Game(seed=args.seed, history=history, world_dir=args.world_dir, realtime=args.realtime,
+                endless=args.endless)
+    if broadcaster is not None:
+        broadcaster.start()
+    try:
+        play(game, args.record)
+    finally:
+        game.overworld.discard()  # Sessions are not resumed, so neither is their world
+        if broadcaster is not None:
+            broadcaster.stop()
+            server.close()
+        if tracer is not None:
+            tracer.stop()
+            tracer.save(args.trace)
+        if history is not None:
+            history.close()
+
+
+def play(game, record_path=None):
+    if not record_path:
+        game.start()
+        return
+    from replay import ReplayRecorder
+    recorder = ReplayRecorder(game)
+    recorder.start()
+    try:
+        game.start()
+    finally:
+        recorder.stop()
+        recorder.save(record_path)
+
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
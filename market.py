@@ -0,0 +1,433 @@
+# market.py
+
+import heapq
+import os
+import pickle
+import threading
+import zlib
+from collections import namedtuple
+from dataclasses import dataclass, field
+from typing import Dict
+
+from entities import InventoryEntry, Item
+
+BUY = "buy"
+SELL = "sell"
+DEFAULT_SNAPSHOT_EVERY = 100  # Journaled changes between snapshots
+
+Fill = namedtuple("Fill", ["item", "price", "quantity", "buyer", "seller"])
+
+
+@dataclass
+class Order:
+    order_id: int  # Increasing, so it also gives time priority at equal prices
+    owner: str  # Session id of the player who posted it
+    side: str  # BUY or SELL
+    item: Item
+    price: int  # Gold per item
+    quantity: int
+    remaining: int
+
+    @property
+    def active(self):
+        return self.remaining > 0
+
+
+@dataclass
+class Account:
+    """What fills and cancellations owe a player until it is delivered to their Player."""
+    gold: int = 0
+    items: Dict[tuple, InventoryEntry] = field(default_factory=dict)  # Item.stack_key() -> entry
+
+    def add_item(self, item, count):
+        entry = self.items.get(item.stack_key())
+        if entry is None:
+            entry = self.items[item.stack_key()] = InventoryEntry(item, 0)
+        entry.count += count
+
+    def __bool__(self):
+        return bool(self.gold or self.items)
+
+
+class OrderBook:
+    """
+    Bids and asks for one item, each in a heap: best price first, then oldest first.
+
+    Orders that are filled or cancelled stay in the heap until they reach the top and are
+    dropped there, so placing, matching and cancelling are all O(log n).
+    """
+
+    def __init__(self, item):
+        self.item = item
+        self.bids = []  # (-price, order_id, order)
+        self.asks = []  # (price, order_id, order)
+        self.ask_volume = 0  # Items on offer in active asks
+
+    def push(self, order):
+        if order.side == BUY:
+            heapq.heappush(self.bids, (-order.price, order.order_id, order))
+        else:
+            heapq.heappush(self.asks, (order.price, order.order_id, order))
+            self.ask_volume += order.remaining
+
+    def best(self, side):
+        """The best active order on one side, or None."""
+        heap = self.bids if side == BUY else self.asks
+        while heap and not heap[0][2].active:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+
+class Market:
+    """
+    A marketplace shared by every session of a hosted deployment.
+
+    Players post buy and sell orders for items and dungeon keys, and each item's
+    OrderBook matches them by price, then time: an incoming order trades with the best
+    resting orders at their price for as long as prices cross, and the rest of it rests
+    in the book. Gold for a buy order and items for a sell order are taken from the
+    player into escrow when the order is posted, so a fill can never fail half way: under
+    one lock it moves the goods and the gold into both players' accounts. An account is
+    delivered to its player's Inventory and gold by settle(), which the game calls
+    whenever the player visits the market (the other side of a trade may be in a
+    hibernated session).
+
+    Every change (an order posted, canceled or settled) is appended to a journal next to
+    the snapshot file before the call returns, and load() replays the journal on top of
+    the last snapshot. Every snapshot_every changes the whole market, escrow included, is
+    written to the snapshot and the journal starts over; close() does the same on shutdown.
+
+    Escrow and deliveries also change the Player, which is saved with its session, not
+    here, and not at the same moment. So the market keeps each owner's player-side
+    changes, numbered like the journal, until a save of the session includes them
+    (player_saved()); a session loaded from an older save has the later ones redone by
+    restore_player(). SessionManager does both, so after a crash neither escrowed gold nor
+    a delivery exists twice or not at all.
+    """
+
+    def __init__(self, snapshot_path=None, snapshot_every=DEFAULT_SNAPSHOT_EVERY):
+        self.snapshot_path = snapshot_path
+        self.snapshot_every = snapshot_every
+        self.books = {}  # Item.stack_key() -> OrderBook
+        self.orders = {}  # order_id -> active Order
+        self.orders_by_owner = {}  # owner -> {order_id: active Order}
+        self.accounts = {}  # owner -> Account
+        self.player_changes = {}  # owner -> [(sequence, gold, [(Item, count)])] not yet saved with the session
+        self._next_id = 1
+        self._sequence = 0  # Number of the last change; the journal skips changes the snapshot has
+        self._changes = 0  # Since the last snapshot
+        self._journal = None  # Open journal file
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        del state["_journal"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._journal = None
+        self._lock = threading.RLock()
+
+    @property
+    def journal_path(self):
+        return None if self.snapshot_path is None else self.snapshot_path + ".journal"
+
+    @classmethod
+    def load(cls, snapshot_path, snapshot_every=DEFAULT_SNAPSHOT_EVERY):
+        """
+        Restore the market from its snapshot and journal, or start an empty one if there is none yet.
+        """
+        try:
+            with open(snapshot_path, "rb") as f:
+                market = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            market = cls()
+        market.snapshot_path = snapshot_path
+        market.snapshot_every = snapshot_every
+        market._replay_journal()
+        return market
+
+    def _replay_journal(self):
+        try:
+            f = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            end = 0
+            while True:
+                try:
+                    sequence, change, args = pickle.load(f)
+                except (EOFError, pickle.UnpicklingError):
+                    break  # The end, or a change cut short by a crash before its call returned
+                end = f.tell()
+                if sequence <= self._sequence:
+                    continue  # Already in the snapshot
+                self._sequence = sequence
+                self._apply(change, args)
+                self._changes += 1
+        # New changes go after the last whole one
+        os.truncate(self.journal_path, end)
+
+    def _apply(self, change, args):
+        """Make a change to the market, live or replayed from the journal."""
+        if change == "place":
+            owner, side, item, price, quantity = args
+            if side == BUY:
+                self._player_changed(owner, -price * quantity, [])
+            else:
+                self._player_changed(owner, 0, [(item, -quantity)])
+            return self._post(*args)
+        if change == "cancel":
+            return self._withdraw(*args)
+        owner, = args  # "settle"
+        account = self.accounts.pop(owner)
+        self._player_changed(owner, account.gold, [(entry.item, entry.count) for entry in account.items.values()])
+        return account
+
+    def _player_changed(self, owner, gold, items):
+        self.player_changes.setdefault(owner, []).append((self._sequence, gold, items))
+
+    @property
+    def sequence(self):
+        """Number of the last change; a session saved now includes every player-side change up to it."""
+        return self._sequence
+
+    def player_saved(self, owner, sequence):
+        """Forget the owner's player-side changes up to sequence, now that their session is saved with them."""
+        with self._lock:
+            changes = [change for change in self.player_changes.get(owner, ()) if change[0] > sequence]
+            if changes:
+                self.player_changes[owner] = changes
+            else:
+                self.player_changes.pop(owner, None)
+
+    def restore_player(self, owner, player, sequence):
+        """
+        Redo the player-side changes made after sequence on a player loaded from a save that lacks them.
+
+        Changes the save predates are redone only as far as the player can bear them: gold
+        does not go below zero and items the older save does not have are not removed.
+
+        Args:
+            owner (str): The player's session id.
+            player (Player): The player, as loaded.
+            sequence (int): The market sequence the save included.
+        """
+        with self._lock:
+            for change_sequence, gold, items in self.player_changes.pop(owner, ()):
+                if change_sequence <= sequence:
+                    continue
+                player.gold = max(0, player.gold + gold)
+                for item, count in items:
+                    if count > 0:
+                        player.inventory.add_item(item, count)
+                    else:
+                        count = min(-count, player.inventory.count(item))
+                        if count:
+                            player.inventory.remove_item(item, count)
+
+    def snapshot(self):
+        """Write the market to snapshot_path (atomically replacing the previous snapshot) and start a new journal."""
+        if self.snapshot_path is None:
+            return
+        with self._lock:
+            self._changes = 0
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(zlib.compress(pickle.dumps(self, pickle.HIGHEST_PROTOCOL)))
+            os.replace(tmp_path, self.snapshot_path)
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """Write a final snapshot and close the journal; call on shutdown."""
+        with self._lock:
+            self.snapshot()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _commit(self, change, *args):
+        """Make a change and journal it, so that it survives a restart, before the call making it returns."""
+        self._sequence += 1
+        result = self._apply(change, args)
+        if self.snapshot_path is None:
+            return result
+        if self._journal is None:
+            self._journal = open(self.journal_path, "ab")
+        pickle.dump((self._sequence, change, args), self._journal, pickle.HIGHEST_PROTOCOL)
+        self._journal.flush()
+        self._changes += 1
+        if self._changes >= self.snapshot_every:
+            self.snapshot()
+        return result
+
+    def _book(self, item):
+        key = item.stack_key()
+        book = self.books.get(key)
+        if book is None:
+            book = self.books[key] = OrderBook(item)
+        return book
+
+    def _account(self, owner):
+        account = self.accounts.get(owner)
+        if account is None:
+            account = self.accounts[owner] = Account()
+        return account
+
+    def place(self, owner, player, side, item, price, quantity):
+        """
+        Post an order, match it and deliver the poster's side of any fills.
+
+        Args:
+            owner (str): The poster's session id.
+            player (Player): The poster, who pays the escrow.
+            side (str): BUY or SELL.
+            item (Item): What to trade; only identical items (same stack) trade with each other.
+            price (int): Highest price to pay, or lowest to accept, per item.
+            quantity (int): How many.
+
+        Returns:
+            tuple: (Order, list of Fill). The order is still in the book if it has items remaining.
+
+        Raises:
+            ValueError: If price or quantity is not positive, or the player cannot cover the escrow.
+        """
+        if price < 1 or quantity < 1:
+            raise ValueError("Price and quantity must be positive.")
+        with self._lock:
+            if side == BUY:
+                if player.gold < price * quantity:
+                    raise ValueError("Not enough gold to cover the order.")
+                player.gold -= price * quantity
+            else:
+                if player.inventory.count(item) < quantity:
+                    raise ValueError("Not enough items to cover the order.")
+                player.inventory.remove_item(item, quantity)
+            order, fills = self._commit("place", owner, side, item, price, quantity)
+            self.settle(owner, player)
+            return order, fills
+
+    def _post(self, owner, side, item, price, quantity):
+        """The market's side of place(), once the escrow is taken."""
+        order = Order(self._next_id, owner, side, item, price, quantity, quantity)
+        self._next_id += 1
+        book = self._book(item)
+        fills = self._match(book, order)
+        if order.active:
+            book.push(order)
+            self.orders[order.order_id] = order
+            self.orders_by_owner.setdefault(owner, {})[order.order_id] = order
+        return order, fills
+
+    def _match(self, book, order):
+        fills = []
+        other_side = SELL if order.side == BUY else BUY
+        while order.active:
+            resting = book.best(other_side)
+            if resting is None or (resting.price > order.price if order.side == BUY else resting.price < order.price):
+                break
+            quantity = min(order.remaining, resting.remaining)
+            buy, sell = (order, resting) if order.side == BUY else (resting, order)
+            # Trades happen at the resting order's price
+            fills.append(self._fill(buy, sell, resting.price, quantity))
+            if resting.side == SELL:
+                book.ask_volume -= quantity
+            if not resting.active:
+                self._forget(resting)
+        return fills
+
+    def _fill(self, buy, sell, price, quantity):
+        buy.remaining -= quantity
+        sell.remaining -= quantity
+        buyer = self._account(buy.owner)
+        buyer.add_item(sell.item, quantity)
+        buyer.gold += (buy.price - price) * quantity  # Escrowed at the buyer's limit
+        self._account(sell.owner).gold += price * quantity
+        return Fill(sell.item, price, quantity, buy.owner, sell.owner)
+
+    def cancel(self, owner, order_id):
+        """
+        Withdraw an order; its escrow is returned to the owner's account.
+
+        Returns:
+            bool: False if there is no such active order of this owner.
+        """
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None or order.owner != owner:
+                return False
+            self._commit("cancel", owner, order_id)
+            return True
+
+    def _withdraw(self, owner, order_id):
+        order = self.orders[order_id]
+        self._forget(order)
+        account = self._account(owner)
+        if order.side == BUY:
+            account.gold += order.price * order.remaining
+        else:
+            account.add_item(order.item, order.remaining)
+            self.books[order.item.stack_key()].ask_volume -= order.remaining
+        order.remaining = 0  # Dropped from the heap when it reaches the top
+
+    def _forget(self, order):
+        del self.orders[order.order_id]
+        owned = self.orders_by_owner[order.owner]
+        del owned[order.order_id]
+        if not owned:
+            del self.orders_by_owner[order.owner]
+
+    def settle(self, owner, player):
+        """
+        Deliver what fills and cancellations owe a player.
+
+        Returns:
+            Account: What was delivered (empty if nothing was owed).
+        """
+        with self._lock:
+            if not self.accounts.get(owner):
+                return Account()
+            account = self._commit("settle", owner)
+            player.gold += account.gold
+            for entry in account.items.values():
+                player.inventory.add_item(entry.item, entry.count)
+            return account
+
+    def open_orders(self, owner):
+        """The owner's active orders, oldest first."""
+        with self._lock:
+            return list(self.orders_by_owner.get(owner, {}).values())  # Inserted in id order
+
+    def best_price(self, item, side):
+        """The best active bid (BUY) or ask (SELL) price for an item, or None."""
+        with self._lock:
+            book = self.books.get(item.stack_key())
+            order = book.best(side) if book else None
+            return order.price if order else None
+
+    def listings(self):
+        """Items with asks in the book, as (item, items on offer, best ask)."""
+        with self._lock:
+            return [(book.item, book.ask_volume, book.best(SELL).price)
+                    for book in self.books.values() if book.ask_volume > 0]
+
+
+def market_catalog(listed=()):
+    """
+    Items a buy order can be posted for: the shop's catalog and every dungeon key, plus
+    any other items currently on offer (e.g. looted gear with scaled bonuses).
+    """
+    from entities import Shop, loot_table
+    catalog = {}
+    for item in Shop().items_for_sale + [item for item in loot_table() if item.type == "key"] + list(listed):
+        catalog.setdefault(item.stack_key(), item)
+    return list(catalog.values())
+
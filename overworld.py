@@ -0,0 +1,301 @@
+# overworld.py
+
+import dbm
+import glob
+import os
+import random
+import struct
+import weakref
+from collections import OrderedDict
+
+CHUNK_SIZE = 16  # Tiles per chunk side
+DEFAULT_MAX_LOADED_CHUNKS = 64
+MAX_SEARCH_RADIUS = 3  # In chunks, for nearest point of interest queries
+
+BIOMES = ["Meadow", "Forest", "Hills", "Marsh", "Tundra", "Badlands"]
+KEY_TYPES = ["Fire", "Ice", "Earth", "Lightning"]
+
+# Point of interest kinds
+POI_GOLD = 0
+POI_KEY = 1
+POI_MOB = 2
+POI_NAMES = {POI_GOLD: "Gold Cache 💰", POI_KEY: "Lost Key 🔑", POI_MOB: "Wandering Monster 🐾"}
+
+# Compact chunk form: biome byte, POI count, then (x, y, kind, value) per POI
+_CHUNK_HEADER = struct.Struct("<BB")
+_POI_RECORD = struct.Struct("<BBBH")
+
+
+class Chunk:
+    """A CHUNK_SIZE x CHUNK_SIZE piece of the overworld and its points of interest."""
+
+    __slots__ = ("cx", "cy", "biome", "pois", "dirty")
+
+    def __init__(self, cx, cy, biome, pois):
+        self.cx = cx
+        self.cy = cy
+        self.biome = biome
+        self.pois = pois  # [local_x, local_y, kind, value]
+        self.dirty = False  # True once it differs from what the seed would generate
+
+    @staticmethod
+    def generate(world_seed, cx, cy):
+        # A private RNG per chunk, so chunks come out the same in any visiting order
+        rng = random.Random(f"{world_seed}:{cx}:{cy}")
+        biome = rng.randrange(len(BIOMES))
+        pois = []
+        for _ in range(rng.randint(0, 3)):
+            roll = rng.random()
+            # Same 40/30/30 split as the old single-roll overworld event
+            if roll < 0.4:
+                kind, value = POI_GOLD, rng.randint(10, 100)
+            elif roll < 0.7:
+                kind, value = POI_KEY, rng.randrange(len(KEY_TYPES))
+            else:
+                kind, value = POI_MOB, 0
+            pois.append([rng.randrange(CHUNK_SIZE), rng.randrange(CHUNK_SIZE), kind, value])
+        return Chunk(cx, cy, biome, pois)
+
+    def pack(self):
+        parts = [_CHUNK_HEADER.pack(self.biome, len(self.pois))]
+        parts.extend(_POI_RECORD.pack(*poi) for poi in self.pois)
+        return b"".join(parts)
+
+    @staticmethod
+    def unpack(cx, cy, data):
+        biome, count = _CHUNK_HEADER.unpack_from(data)
+        pois = [list(_POI_RECORD.unpack_from(data, _CHUNK_HEADER.size + i * _POI_RECORD.size))
+                for i in range(count)]
+        chunk = Chunk(cx, cy, biome, pois)
+        chunk.dirty = True
+        return chunk
+
+
+def chunk_coords(x, y):
+    return x // CHUNK_SIZE, y // CHUNK_SIZE
+
+
+class Overworld:
+    """
+    An effectively unbounded overworld, generated lazily from the seed one chunk at a time.
+
+    At most max_loaded_chunks stay in memory (LRU). Evicted chunks are only kept if the
+    player changed them (e.g. looted a point of interest), in a compact packed form in a
+    dbm file, or in memory when no path is given; untouched chunks are simply generated
+    again on the next visit. Points of interest are indexed by chunk, so nearest-POI
+    queries only look at the chunks around the player.
+
+    A fork keeps only its own changes and reads everything else through its parent; the
+    parent hands a fork the old version of any chunk it overwrites later, so the fork
+    goes on seeing the world as it was when forked.
+    """
+
+    def __init__(self, seed, store_path=None, max_loaded_chunks=DEFAULT_MAX_LOADED_CHUNKS):
+        self.seed = seed
+        self.store_path = store_path
+        self.max_loaded_chunks = max_loaded_chunks
+        self.position = (0, 0)
+        self._chunks = OrderedDict()  # (cx, cy) -> Chunk, least recently used first
+        self._store = None
+        self._parent = None  # World this one was forked from; read where _store has no entry
+        self._forks = weakref.WeakSet()  # Live forks that read through this world
+
+    def _open_store(self):
+        if self._store is None:
+            if self.store_path is None:
+                self._store = {}
+            else:
+                os.makedirs(os.path.dirname(self.store_path) or ".", exist_ok=True)
+                self._store = dbm.open(self.store_path, "c")
+        return self._store
+
+    def __getstate__(self):
+        # Write changed chunks out and keep only what is needed to find them again
+        self.flush()
+        state = self.__dict__.copy()
+        state["_chunks"] = OrderedDict()
+        del state["_forks"]
+        if self.store_path is not None:
+            self.close()
+            state["_store"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._forks = weakref.WeakSet()
+
+    def fork(self):
+        """
+        Return an in-memory copy of the world that can be changed without touching this one.
+
+        Loaded chunks are shared, which is safe because a changed chunk is always replaced
+        rather than edited (see take_poi()). Changed chunks that were evicted are not copied:
+        the fork reads them through this world, so forking costs the same however many
+        there are.
+        """
+        clone = Overworld(self.seed, max_loaded_chunks=self.max_loaded_chunks)
+        clone.position = self.position
+        clone._chunks = OrderedDict(self._chunks)
+        clone._store = {}  # The fork's own changes; None marks a chunk that is as generated
+        clone._parent = self
+        self._forks.add(clone)
+        return clone
+
+    def _load(self, key):
+        """The packed form of a changed chunk, or None if it is as the seed generates it."""
+        world = self
+        while world is not None:
+            store = world._open_store()
+            if key in store:
+                return store[key]
+            world = world._parent
+        return None
+
+    def _save(self, key, data):
+        forks = [fork for fork in self._forks if key not in fork._store]
+        if forks:
+            # Forks keep the version they have been reading
+            previous = self._load(key)
+            for fork in forks:
+                fork._store[key] = previous
+        self._open_store()[key] = data
+
+    def _detach_forks(self):
+        """Give every fork its own copy of what it reads through this world, which is going away."""
+        for fork in list(self._forks):
+            world = self
+            while world is not None:
+                store = world._open_store()
+                for key in store.keys():
+                    key = key.decode() if isinstance(key, bytes) else key  # dbm keys come back as bytes
+                    if key not in fork._store:
+                        fork._store[key] = store[key]
+                world = world._parent
+            fork._parent = None
+        self._forks = weakref.WeakSet()
+
+    def flush(self):
+        """Write every changed chunk to the store."""
+        for chunk in self._chunks.values():
+            if chunk.dirty:
+                self._save(f"{chunk.cx},{chunk.cy}", chunk.pack())
+
+    def close(self):
+        """Flush and close the on-disk store."""
+        self.flush()
+        if self._store is not None and self.store_path is not None:
+            self._store.close()
+            self._store = None
+
+    def discard(self):
+        """Close the on-disk store and delete it, once the run this world belongs to is over."""
+        self._detach_forks()
+        if self._store is not None and self.store_path is not None:
+            self._store.close()
+        self._store = None
+        self._chunks.clear()
+        if self.store_path is not None:
+            # Depending on the dbm backend the store is one or several files, with or without a suffix
+            for path in glob.glob(glob.escape(self.store_path) + "*"):
+                os.remove(path)
+
+    def chunk(self, cx, cy):
+        """Return a chunk, loading or generating it if needed."""
+        key = (cx, cy)
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self._chunks.move_to_end(key)
+            return chunk
+        data = self._load(f"{cx},{cy}")
+        chunk = Chunk.unpack(cx, cy, data) if data is not None else Chunk.generate(self.seed, cx, cy)
+        self._chunks[key] = chunk
+        while len(self._chunks) > self.max_loaded_chunks:
+            _, evicted = self._chunks.popitem(last=False)
+            if evicted.dirty:
+                self._save(f"{evicted.cx},{evicted.cy}", evicted.pack())
+        return chunk
+
+    @property
+    def loaded_chunk_count(self):
+        return len(self._chunks)
+
+    def biome_at(self, x, y):
+        return BIOMES[self.chunk(*chunk_coords(x, y)).biome]
+
+    def move(self, dx, dy):
+        x, y = self.position
+        self.position = (x + dx, y + dy)
+        return self.position
+
+    def poi_at(self, x, y):
+        """Return the point of interest on a tile as (kind, value), or None."""
+        chunk = self.chunk(*chunk_coords(x, y))
+        lx, ly = x - chunk.cx * CHUNK_SIZE, y - chunk.cy * CHUNK_SIZE
+        for poi in chunk.pois:
+            if poi[0] == lx and poi[1] == ly:
+                return poi[2], poi[3]
+        return None
+
+    def take_poi(self, x, y):
+        """Remove and return the point of interest on a tile as (kind, value), or None."""
+        chunk = self.chunk(*chunk_coords(x, y))
+        lx, ly = x - chunk.cx * CHUNK_SIZE, y - chunk.cy * CHUNK_SIZE
+        for idx, poi in enumerate(chunk.pois):
+            if poi[0] == lx and poi[1] == ly:
+                # A new chunk rather than an edit, since a fork may share the old one
+                changed = Chunk(chunk.cx, chunk.cy, chunk.biome, chunk.pois[:idx] + chunk.pois[idx + 1:])
+                changed.dirty = True
+                self._chunks[(chunk.cx, chunk.cy)] = changed
+                return poi[2], poi[3]
+        return None
+
+    def nearest_poi(self, x=None, y=None, max_radius=MAX_SEARCH_RADIUS):
+        """
+        Find the closest point of interest (by walking distance).
+
+        Searches rings of chunks outward from the starting chunk and stops as soon as no
+        unsearched ring can hold anything closer than the best match so far.
+
+        Returns:
+            tuple: (x, y, kind, value) of the closest point of interest, or None.
+        """
+        if x is None:
+            x, y = self.position
+        ccx, ccy = chunk_coords(x, y)
+        best = None
+        best_dist = None
+        for radius in range(max_radius + 1):
+            # Anything in this ring is at least this far away
+            ring_min = max(0, (radius - 1) * CHUNK_SIZE + 1)
+            if best is not None and ring_min > best_dist:
+                break
+            for cx, cy in _ring(ccx, ccy, radius):
+                chunk = self.chunk(cx, cy)
+                for lx, ly, kind, value in chunk.pois:
+                    px, py = cx * CHUNK_SIZE + lx, cy * CHUNK_SIZE + ly
+                    dist = abs(px - x) + abs(py - y)
+                    if best is None or dist < best_dist:
+                        best, best_dist = (px, py, kind, value), dist
+        return best
+
+
+def _ring(cx, cy, radius):
+    if radius == 0:
+        yield cx, cy
+        return
+    for dx in range(-radius, radius + 1):
+        yield cx + dx, cy - radius
+        yield cx + dx, cy + radius
+    for dy in range(-radius + 1, radius):
+        yield cx - radius, cy + dy
+        yield cx + radius, cy + dy
+
+
+def describe_direction(dx, dy):
+    """Describe an offset like '3 steps north, 2 steps east'."""
+    parts = []
+    if dy:
+        parts.append(f"{abs(dy)} step(s) {'south' if dy > 0 else 'north'}")
+    if dx:
+        parts.append(f"{abs(dx)} step(s) {'east' if dx > 0 else 'west'}")
+    return ", ".join(parts) if parts else "right here"
@@ -0,0 +1,327 @@
+# party.py
+
+import threading
+from array import array
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from colorama import Fore, Style
+from broadcast import Broadcaster, Viewer
+from entities import EnemyGroup
+from scheduler import ACTION_TIME, TurnScheduler
+from sessions import SessionNotFound
+from tracing import traced
+from utils import (
+    Console, clear_screen, display_message, set_input_source, get_player_choice, press_enter_to_continue,
+    read_input, use_console
+)
+
+MAX_PARTY_SIZE = 4
+ENEMY = -1  # The enemy's place in a party fight's turn order; members are numbered from 0
+
+
+@dataclass
+class PartyMember:
+    session_id: str
+    source: Callable[[str], str]  # Reads one line of this player's input; called like input()
+    viewer: Viewer  # The party's screens, to be sent to this player
+    game: Optional[Any] = None  # The player's Game while an expedition has the session checked out
+
+
+def scale_enemy_hp(enemy, factor):
+    """Multiply an enemy's HP (every member's, for a group) so it lasts as long against a party."""
+    if isinstance(enemy, EnemyGroup):
+        enemy.hps = array("q", (hp * factor for hp in enemy.hps))
+    else:
+        enemy.hp *= factor
+
+
+class Party:
+    """
+    Up to MAX_PARTY_SIZE players of one SessionManager who explore dungeons together.
+
+    An expedition runs in one place, on the thread that calls explore_dungeon(): the
+    members' sessions are checked out for it, and each fight is a single encounter loop
+    in which the members and the enemy take turns by speed. A member acts through their
+    own Game, so gear, consumables, effects and hints work as in solo play, and their
+    choices are read from their own input source. Every member sees the same screen,
+    published through one Broadcaster: a screen is compressed once, as a delta against
+    the previous one, and the same frame is queued for every member. A party therefore
+    costs about as much to run as one solo session. The expedition runs in the party's
+    own headless Console, so nothing it does reaches the terminal or other sessions.
+
+    Enemies get their HP multiplied by the number of members still standing. Loot is
+    split by a fixed rule: the drop of each defeated enemy goes to the next member in
+    join order (round robin) who is still standing, and drop_loot runs in that member's
+    game. The party leader (the first member to join who is still standing) opens the
+    dungeon with one of their keys and makes the party's other choices.
+    """
+
+    def __init__(self, manager, compress=True):
+        self.manager = manager
+        self.members = []  # PartyMember, in join order
+        self.broadcaster = Broadcaster(compress)
+        self.console = Console(stream=self.broadcaster, headless=True)
+        self.console.screen_listeners.append(self._on_clear)
+        self.loot_turn = 0  # Index in members of the next member owed loot
+        self._lock = threading.Lock()
+        self._on_screen = []  # Members shown in the party line while an expedition runs
+        self._acting = None  # Member whose input is being read
+
+    def join(self, session_id, source):
+        """
+        Add a player to the party; they take part from the next expedition.
+
+        Args:
+            session_id (str): The player's session in the party's SessionManager.
+            source (callable): Reads one line of the player's input, called like input().
+
+        Returns:
+            Viewer: The party's screens for this player, to send over their connection
+            (frames are encoded as for broadcast.serve()).
+
+        Raises:
+            ValueError: If the party is full or the player is already in it.
+            SessionNotFound: If the manager has no such session.
+        """
+        with self._lock:
+            if any(member.session_id == session_id for member in self.members):
+                raise ValueError(f"Session {session_id!r} is already in the party.")
+            if len(self.members) >= MAX_PARTY_SIZE:
+                raise ValueError(f"A party has at most {MAX_PARTY_SIZE} players.")
+            if session_id not in self.manager:
+                raise SessionNotFound(session_id)
+            member = PartyMember(session_id, source, self.broadcaster.subscribe())
+            self.members.append(member)
+            return member.viewer
+
+    def leave(self, session_id):
+        """Remove a player from the party (from the next expedition) and end their stream of screens."""
+        with self._lock:
+            for idx, member in enumerate(self.members):
+                if member.session_id == session_id:
+                    del self.members[idx]
+                    if idx < self.loot_turn:
+                        self.loot_turn -= 1
+                    break
+            else:
+                return
+        self.broadcaster.unsubscribe(member.viewer)
+        member.viewer.close()
+
+    def disband(self):
+        """Publish the last screen and end every member's stream."""
+        with self._lock:
+            self.members = []
+        self.broadcaster.close()
+
+    @traced("screen")
+    def explore_dungeon(self):
+        """Take the party through a dungeon, returning once it is cleared, left or every member has fallen."""
+        with self._lock:
+            members = list(self.members)
+        if not members:
+            raise ValueError("The party has no members.")
+        with ExitStack() as stack:
+            for member in members:
+                member.game = stack.enter_context(self.manager.session(member.session_id))
+            stack.callback(self._release, members)
+            stack.enter_context(self._shared_screen(members))
+            self._expedition(members)
+
+    def _release(self, members):
+        for member in members:
+            member.game = None
+
+    @contextmanager
+    def _shared_screen(self, members):
+        """Send all output to the party's screen and read each member's input through it."""
+        self._on_screen = members
+        try:
+            with use_console(self.console):
+                yield
+        finally:
+            self._on_screen = []
+            self._acting = None
+            self.broadcaster.publish()
+
+    def _on_clear(self):
+        # Members see what happened on the other members' turns before the screen moves on
+        self.broadcaster.publish()
+        # Every screen starts with the party line
+        self.broadcaster.clear()
+        parts = []
+        for member in self._on_screen:
+            player = member.game.player
+            status = f"❤️ {player.hp}/{player.max_hp}" if player.is_alive() else "💀"
+            marker = "▶ " if member is self._acting else ""
+            parts.append(f"{marker}{member.session_id} {status}")
+        self.broadcaster.write(f"{Fore.CYAN}🛡️ Party: {' | '.join(parts)}{Style.RESET_ALL}\n")
+
+    def _act_as(self, member):
+        """Read input from this member from now on."""
+        if member is self._acting:
+            return
+        self._acting = member
+        # Also drops choices the previous member typed ahead, which were not meant for this one
+        set_input_source(lambda prompt="": self.broadcaster.read(member.source, prompt))
+
+    @staticmethod
+    def _standing(members):
+        return [member for member in members if member.game.player.is_alive()]
+
+    def _lead(self, members):
+        """Let the first member still standing make the party's choices."""
+        self._act_as(self._standing(members)[0])
+        return self._acting
+
+    def _expedition(self, members):
+        leader = self._lead(members)
+        game = leader.game
+        clear_screen()
+        display_message(f"--- Party Expedition led by {leader.session_id} --- 🛡️", Fore.CYAN)
+        selection = game.select_dungeon()
+        if selection is None:
+            return
+        dungeon_type, required_key = selection
+        num_mobs = game.rng.randint(3, 6)
+        boss_name = f"{dungeon_type} Lord" if dungeon_type != "Final" else "Dark Overlord"
+        scaled_level = game.current_dungeon_level + max(member.game.player.level for member in members)
+        display_message(f"\n📜 Dungeon Details:", Fore.CYAN)
+        display_message(f"• Number of Enemies: {num_mobs}", Fore.YELLOW)
+        display_message(f"• Party: {len(members)} players; enemies are {len(members)}x as tough", Fore.YELLOW)
+        choice_confirm = read_input("Lead the party in and consume the key? (yes/no): ").lower()
+        if choice_confirm not in ['yes', 'y']:
+            display_message("Canceled exploring the dungeon.", Fore.YELLOW)
+            press_enter_to_continue()
+            return
+        game.player.inventory.remove_item(required_key)
+        display_message(f"\n🕳️ The party enters the {dungeon_type} Dungeon (Scaled Level: {scaled_level})...\n", Fore.YELLOW)
+        press_enter_to_continue()
+
+        rooms = game.generate_rooms(scaled_level, dungeon_type, num_mobs, boss_name)
+        mobs_remaining = num_mobs
+        for room in rooms:
+            standing = self._standing(members)
+            if not standing or any(member.game.final_boss_defeated for member in standing):
+                break
+            self._enter_room(members, room, scaled_level, dungeon_type)
+            if room["type"] == "monster":
+                mobs_remaining -= 1
+                if mobs_remaining > 0 and self._standing(members):
+                    self._lead(members)
+                    choice = get_player_choice(["Continue Fighting", "Leave and Return to Main Menu"])
+                    if choice == 2:
+                        display_message("The party decides to leave the dungeon for now.", Fore.YELLOW)
+                        press_enter_to_continue()
+                        return
+        standing = self._standing(members)
+        if not standing:
+            display_message("\n💀 The whole party has fallen.", Fore.RED)
+            return
+        if not any(member.game.final_boss_defeated for member in standing):
+            for member in standing:
+                member.game.clear_dungeon(num_mobs)
+            self._lead(members)
+            press_enter_to_continue()
+
+    def _enter_room(self, members, room, scaled_level, dungeon_type):
+        leader = self._lead(members)
+        clear_screen()
+        is_boss = room["type"] == "boss"
+        display_message("The party enters the Boss Chamber... 🏰" if is_boss else "The party enters a room... 🏚️",
+                        Fore.YELLOW)
+        enemy = leader.game.spawn_enemy(room, scaled_level, dungeon_type)
+        scale_enemy_hp(enemy, len(self._standing(members)))
+        leader.game.announce_enemy(enemy)
+        press_enter_to_continue()
+        self.fight(members, enemy, is_boss)
+        if enemy.is_alive() or not self._standing(members):
+            return
+        looter = self._next_looter(members)
+        self._act_as(looter)
+        display_message(f"\n🎁 The spoils go to {looter.session_id}.", Fore.CYAN)
+        looter.game.drop_loot(enemy, dungeon_type)
+        if is_boss and dungeon_type == "Final":
+            for member in self._standing(members):
+                if member.game.endless:
+                    display_message(f"\nThe Dark Overlord falls, but {member.session_id}'s dungeons only grow deeper... 🕳️",
+                                    Fore.MAGENTA)
+                else:
+                    member.game.final_boss_defeated = True
+            self._lead(members)
+            press_enter_to_continue()
+
+    def _next_looter(self, members):
+        """The next member in join order, from the one owed loot, who is still standing."""
+        count = len(members)
+        for offset in range(count):
+            idx = (self.loot_turn + offset) % count
+            if members[idx].game.player.is_alive():
+                self.loot_turn = (idx + 1) % count
+                return members[idx]
+        return None
+
+    @traced("screen")
+    def fight(self, members, enemy, is_boss=False):
+        """
+        Fight one enemy with every member still standing, until it falls or no member is left in the fight.
+
+        The members and the enemy act in one speed-based turn order. On its turn the enemy
+        attacks one member in the fight, chosen at random. A member who flees is out of this
+        fight only. Each member's status effects run in their own game, and all of them end
+        with the fight.
+        """
+        fighters = self._standing(members)
+        rng = fighters[0].game.rng  # Draws that belong to the party as a whole come from the leader's game
+        scheduler = TurnScheduler()
+        for idx, member in enumerate(fighters):
+            scheduler.add(idx, member.game.player_speed())
+        # Frost Armor on any member slows the enemy
+        scheduler.add(ENEMY, min(member.game.enemy_speed() for member in fighters))
+        start_ticks = [member.game.effects.tick for member in fighters]
+        active = dict(enumerate(fighters))  # Members still in the fight
+        try:
+            while enemy.is_alive() and active:
+                actor = scheduler.next()
+                # Effects tick once per base action time, as in a solo fight
+                for idx, member in list(active.items()):
+                    member.game.report_effects(member.game.effects.advance(start_ticks[idx] + int(scheduler.now // ACTION_TIME)))
+                    if not member.game.player.is_alive():
+                        self._fall(active, scheduler, idx)
+                if not (enemy.is_alive() and active):
+                    break
+                if actor == ENEMY:
+                    idx = rng.choice(list(active))
+                    target = active[idx]
+                    display_message(f"\n👾 {enemy.name} turns on {target.session_id}!", Fore.RED)
+                    target.game.enemy_turn(enemy)
+                    if not target.game.player.is_alive():
+                        self._fall(active, scheduler, idx)
+                else:
+                    member = active[actor]
+                    self._act_as(member)
+                    if member.game.player_turn(enemy, is_boss, None):
+                        del active[actor]
+                        scheduler.remove(actor)
+        finally:
+            for member in fighters:
+                member.game.report_effects(member.game.effects.clear())
+        if not self._standing(members):
+            return
+        if not enemy.is_alive():
+            if is_boss:
+                display_message(f"\n*** The party has defeated the Boss {enemy.name}! *** 🎉", Fore.GREEN)
+            else:
+                display_message(f"\nThe party has defeated the {enemy.name}! 🎊", Fore.GREEN)
+        for member in fighters:
+            if member.game.player.is_alive():
+                member.game.recharge_special_ability()
+        self._lead(members)
+        press_enter_to_continue()
+
+    def _fall(self, active, scheduler, idx):
+        display_message(f"\n💀 {active[idx].session_id} has fallen!", Fore.RED)
+        del active[idx]
+        scheduler.remove(idx)
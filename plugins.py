@@ -0,0 +1,136 @@
+# plugins.py
+
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+from colorama import Fore, Style
+
+# Entry point groups a content pack can register under. Entry point names say what the
+# content is for, so which packs matter is known from package metadata alone:
+#   rogue_slayer.dungeons      name: the dungeon type, e.g. "Poison"    object: DungeonType
+#   rogue_slayer.enemies       name: dungeon type they appear in        object: list of enemy names
+#   rogue_slayer.items         name: anything                           object: list of Items for the loot table
+#   rogue_slayer.effects       name: the item it belongs to             object: UniqueEffect
+#   rogue_slayer.achievements  name: anything                           object: list of Achievements
+# The object may also be a function that returns it.
+DUNGEONS = "dungeons"
+ENEMIES = "enemies"
+ITEMS = "items"
+EFFECTS = "effects"
+ACHIEVEMENTS = "achievements"
+KINDS = (DUNGEONS, ENEMIES, ITEMS, EFFECTS, ACHIEVEMENTS)
+GROUP_PREFIX = "rogue_slayer."
+
+
+@dataclass(frozen=True)
+class DungeonType:
+    name: str
+    enemy_names: Tuple[str, ...]
+    key_color: str = Fore.WHITE
+    key: Optional[Any] = None  # Item that opens the dungeon; it joins the loot table
+    boss_loot: Optional[Any] = None  # Item dropped by the "<name> Lord"
+
+
+@dataclass(frozen=True)
+class UniqueEffect:
+    """Combat hooks for an item's unique effect, called while the item is worn."""
+    on_attack: Optional[Callable] = None  # (game, enemy, damage) -> damage the player deals
+    on_hit: Optional[Callable] = None  # (game, enemy, damage) -> damage the player takes
+
+
+class ContentRegistry:
+    """
+    Content packs installed as other packages, found through entry points.
+
+    discover() only reads package metadata. A pack's module is imported the first time
+    its content is asked for (e.g. a pack for the "Poison" dungeon when a Poison Key is
+    drawn, an effect when the item it belongs to is worn in a fight), so installed packs
+    cost next to nothing at startup. A pack that fails to load is reported and skipped.
+    """
+
+    def __init__(self, group_prefix=GROUP_PREFIX):
+        self.group_prefix = group_prefix
+        self._available = None  # kind -> {name: [EntryPoint]}
+        self._loaded = {}  # (kind, name) -> list of content
+
+    def discover(self, entry_points=None):
+        """
+        Find installed packs from package metadata, without importing them.
+
+        Args:
+            entry_points (iterable): EntryPoint objects to use instead of the installed ones.
+        """
+        if entry_points is None:
+            entry_points = _installed_entry_points()
+        available = {}
+        for entry_point in entry_points:
+            if not entry_point.group.startswith(self.group_prefix):
+                continue
+            kind = entry_point.group[len(self.group_prefix):]
+            available.setdefault(kind, {}).setdefault(entry_point.name, []).append(entry_point)
+        self._available = available
+        self._loaded = {}
+
+    def names(self, kind):
+        """Names registered under a kind, e.g. the dungeon types packs add; imports nothing."""
+        if self._available is None:
+            self.discover()
+        return sorted(self._available.get(kind, {}))
+
+    def load(self, kind, name):
+        """Import (once) and return the content of every pack registered as name under kind."""
+        key = (kind, name)
+        content = self._loaded.get(key)
+        if content is None:
+            if self._available is None:
+                self.discover()
+            content = []
+            for entry_point in self._available.get(kind, {}).get(name, ()):
+                try:
+                    obj = entry_point.load()
+                    content.append(obj() if callable(obj) else obj)
+                except Exception as exc:  # A broken pack must not take the game down
+                    print(f"{Fore.YELLOW}Skipping content pack {entry_point.value}: {exc}{Style.RESET_ALL}")
+            self._loaded[key] = content
+        return content
+
+    def load_all(self, kind):
+        """Import every pack of a kind; returns their content in name order."""
+        return [obj for name in self.names(kind) for obj in self.load(kind, name)]
+
+    def first(self, kind, name):
+        """The first pack's content registered as name under kind, or None."""
+        if self._available is not None and name not in self._available.get(kind, {}):
+            return None  # The common case, answered without building a list
+        content = self.load(kind, name)
+        return content[0] if content else None
+
+
+def _installed_entry_points():
+    try:
+        from importlib import metadata
+    except ImportError:  # Python 3.7: no content packs
+        return []
+    groups = [GROUP_PREFIX + kind for kind in KINDS]
+    entry_points = metadata.entry_points()  # One scan of the installed packages
+    if hasattr(entry_points, "select"):
+        return [ep for group in groups for ep in entry_points.select(group=group)]
+    # Python 3.8 and 3.9 return a dict of group -> entry points
+    return [ep for group in groups for ep in entry_points.get(group, ())]
+
+
+registry = ContentRegistry()
+
+
+def discover_plugins():
+    """Find installed content packs; call once at startup."""
+    registry.discover()
+
+
+def dungeon_type(name):
+    """The DungeonType a pack registered for a dungeon type, or None."""
+    return registry.first(DUNGEONS, name)
+
+
+def unique_effect(item):
+    """The UniqueEffect a pack registered for an item, or None."""
+    return registry.first(EFFECTS, item.name) if item is not None else None
@@ -0,0 +1,334 @@
+# realtime.py
+
+import argparse
+import asyncio
+import gc
+import os
+import random
+import sys
+import time
+from collections import deque, namedtuple
+from contextlib import redirect_stdout
+
+from colorama import Fore
+from scheduler import ACTION_TIME, action_delay
+from utils import display_message, get_input_source, press_enter_to_continue
+
+DEFAULT_TICK_RATE = 20  # Ticks per second
+SECONDS_PER_ACTION = 1.0  # Time between two actions at BASE_SPEED
+FLEE_CHANCE = 0.5
+MAX_OVERRUN_LOG = 100  # Most recent overruns kept for reporting
+DEFAULT_MAX_OVERRUN_RATIO = 0.01  # Share of ticks the benchmark lets overrun before it fails
+
+# How a fight ended
+WON = "won"
+LOST = "lost"
+FLED = "fled"
+
+COMMANDS = {"1": "attack", "a": "attack", "2": "special", "s": "special", "3": "flee", "f": "flee"}
+COMMAND_HELP = "Commands: 1 Attack ⚔️ | 2 Special Ability 🌟 | 3 Flee 🏃 (type several, e.g. 1 1 2)"
+
+Overrun = namedtuple("Overrun", ["tick", "elapsed"])
+
+
+def _seconds(speed):
+    return action_delay(speed) / ACTION_TIME * SECONDS_PER_ACTION
+
+
+class RealtimeFight:
+    """
+    One fight in real time, advanced by a TickLoop.
+
+    Each side acts on its own timer, set by the same speeds as turn-based combat: the
+    enemy attacks whenever its timer comes round (rolling its special_attack_chance as
+    usual), and the player acts as soon as a command is queued once their own timer has.
+    Commands are queued with command() and never waited for. Status effects tick once
+    per SECONDS_PER_ACTION. Ending the fight's effects is left to the caller, as in
+    Game.combat().
+    """
+
+    def __init__(self, game, enemy, is_boss=False, render=True):
+        self.game = game
+        self.enemy = enemy
+        self.is_boss = is_boss
+        self.render = render
+        self.outcome = None
+        self.commands = deque()
+        self.player_delay = _seconds(game.player_speed())
+        self.enemy_delay = _seconds(game.enemy_speed())
+        self._start = None
+        self._start_tick = game.effects.tick
+        self._player_ready_at = None
+        self._enemy_next = None
+
+    def command(self, line):
+        """Queue the player's commands; a line may hold several, separated by spaces."""
+        self.commands.extend(line.split())
+
+    def step(self, now):
+        """
+        Run everything due by now (in seconds, on any monotonic clock).
+
+        Returns:
+            str: WON, LOST or FLED once the fight is over, otherwise None.
+        """
+        if self.outcome is not None:
+            return self.outcome
+        game, enemy = self.game, self.enemy
+        if self._start is None:
+            self._start = self._player_ready_at = now
+            self._enemy_next = now + self.enemy_delay
+        changed = False
+        events = game.effects.advance(self._start_tick + int((now - self._start) / SECONDS_PER_ACTION))
+        if events:
+            game.report_effects(events)
+            changed = True
+        if self._over():
+            return self.outcome
+        if self.commands and now >= self._player_ready_at:
+            changed = True
+            if self._player_action(self.commands.popleft()):
+                self._player_ready_at = now + self.player_delay
+            if self._over():
+                return self.outcome
+        while now >= self._enemy_next:
+            game.enemy_turn(enemy)
+            self._enemy_next += self.enemy_delay
+            changed = True
+            if self._over():
+                return self.outcome
+        if changed and self.render:
+            self._show_status(now)
+        return None
+
+    def _player_action(self, command):
+        """Carry out one command; returns True if it used up the player's action."""
+        game, enemy = self.game, self.enemy
+        action = COMMANDS.get(command.lower())
+        if action == "attack":
+            game.player_attack(enemy)
+        elif action == "special":
+            if not game.player.special_ability_ready:
+                display_message("\n⚠️ Special Ability not ready yet.", Fore.YELLOW)
+                return False
+            game.player_use_special_ability(enemy)
+        elif action == "flee":
+            if game.rng.random() < FLEE_CHANCE:
+                display_message("\nYou successfully fled the battle. 🏃‍♂️", Fore.GREEN)
+                game.player.reset_special_ability()
+                self.outcome = FLED
+            else:
+                display_message("\nFlee attempt failed! 😵", Fore.RED)
+        else:
+            display_message(f"\nUnknown command {command!r}. {COMMAND_HELP}", Fore.RED)
+            return False
+        return True
+
+    def _over(self):
+        if self.outcome is None:
+            if not self.enemy.is_alive():
+                self.outcome = WON
+            elif not self.game.player.is_alive():
+                self.outcome = LOST
+        return self.outcome is not None
+
+    def _show_status(self, now):
+        player = self.game.player
+        wait = max(0.0, self._player_ready_at - now)
+        ready = f"{Fore.GREEN}ready" if not wait else f"{Fore.YELLOW}ready in {wait:.1f}s"
+        print(f"{Fore.CYAN}❤️ {player.hp}/{player.max_hp} | {self.enemy.name} HP {self.enemy.hp} | {ready}{Fore.RESET}")
+
+
+class TickLoop:
+    """
+    Advance any number of fights at a fixed rate, all on one asyncio task.
+
+    Every tick has a budget of 1/rate seconds for stepping every fight. A tick that takes
+    longer is counted as an overrun, kept in recent_overruns and passed to on_overrun;
+    the loop then skips the ticks it missed instead of running them back to back, so a
+    slow tick cannot snowball. Fights are stepped with the time the tick started, so all
+    of them see the same clock.
+
+    With manage_gc, the garbage collector is kept out of the ticks: a full collection
+    over thousands of games takes several tick budgets. While fights are running, what
+    existed when the loop started is frozen out of collection, automatic collection is
+    off, and the young generations are collected after each tick, in its slack.
+    """
+
+    def __init__(self, rate=DEFAULT_TICK_RATE, on_overrun=None, manage_gc=True):
+        self.period = 1.0 / rate
+        self.on_overrun = on_overrun
+        self.manage_gc = manage_gc
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.busy = 0.0  # Seconds spent stepping fights
+        self.worst = 0.0  # Longest tick, in seconds
+        self.recent_overruns = deque(maxlen=MAX_OVERRUN_LOG)
+        self._fights = {}  # RealtimeFight -> Future for its outcome
+        self._task = None
+
+    def __len__(self):
+        return len(self._fights)
+
+    def add(self, fight):
+        """Start stepping a fight; returns a future that resolves to its outcome."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._fights[fight] = future
+        if self._task is None:
+            self._task = loop.create_task(self._run())
+        return future
+
+    def cancel(self):
+        """Stop stepping every fight; their futures are cancelled and the loop ends before its next tick."""
+        for future in self._fights.values():
+            future.cancel()
+        self._fights.clear()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        gc_was_enabled = gc.isenabled()
+        if self.manage_gc:
+            gc.freeze()
+            gc.disable()
+        try:
+            while self._fights:
+                start = loop.time()
+                for fight, future in list(self._fights.items()):
+                    try:
+                        outcome = fight.step(start)
+                    except Exception as exc:  # One broken fight must not stop the others
+                        del self._fights[fight]
+                        future.set_exception(exc)
+                        continue
+                    if outcome is not None:
+                        del self._fights[fight]
+                        future.set_result(outcome)
+                self.ticks += 1
+                elapsed = loop.time() - start
+                self.busy += elapsed
+                self.worst = max(self.worst, elapsed)
+                if elapsed > self.period:
+                    self.overruns += 1
+                    overrun = Overrun(self.ticks, elapsed)
+                    self.recent_overruns.append(overrun)
+                    if self.on_overrun is not None:
+                        self.on_overrun(overrun)
+                if self.manage_gc:
+                    gc.collect(1)
+                next_tick += self.period
+                now = loop.time()
+                if next_tick <= now:
+                    missed = int((now - next_tick) / self.period) + 1
+                    self.skipped += missed
+                    next_tick += missed * self.period
+                await asyncio.sleep(next_tick - now)
+        finally:
+            if self.manage_gc:
+                gc.unfreeze()
+                if gc_was_enabled:
+                    gc.enable()
+            self._task = None
+
+
+def terminal_supported():
+    """Real-time fights read the terminal without blocking: that needs input() reading a Unix terminal."""
+    return get_input_source() is input and os.name == "posix" and sys.stdin.isatty()
+
+
+def run_fight(game, enemy, is_boss=False, rate=DEFAULT_TICK_RATE):
+    """
+    Play one fight in real time on the terminal.
+
+    Returns:
+        str: WON, LOST or FLED.
+    """
+    outcome = asyncio.run(_terminal_fight(game, enemy, is_boss, rate))
+    if outcome == FLED:
+        press_enter_to_continue()  # As after a turn-based escape
+    return outcome
+
+
+async def _terminal_fight(game, enemy, is_boss, rate):
+    loop = asyncio.get_running_loop()
+    fight = RealtimeFight(game, enemy, is_boss)
+    fd = sys.stdin.fileno()
+
+    def on_input():
+        # Only called when a line is waiting, so this read does not block the tick loop
+        fight.command(os.read(fd, 4096).decode("utf-8", "replace"))
+
+    display_message(f"\n⏱️ Real-time fight against {enemy.name}! {COMMAND_HELP}", Fore.CYAN)
+    if is_boss:
+        display_message(f"✨ Boss Ability: {int(enemy.special_attack_chance * 100)}% chance to perform special attacks.", Fore.MAGENTA)
+    ticker = TickLoop(rate)
+    loop.add_reader(fd, on_input)
+    try:
+        return await ticker.add(fight)
+    finally:
+        loop.remove_reader(fd)
+
+
+async def _benchmark(fight_count, seconds, rate, seed, manage_gc=True):
+    from entities import Enemy
+    from game import Game
+    rng = random.Random(seed)
+    ticker = TickLoop(rate, manage_gc=manage_gc)
+    finished = 0
+
+    async def arena(game):
+        # One fight after another, with a bot typing a command every 0.1 to 0.6 seconds
+        nonlocal finished
+        while True:
+            game.player.hp = game.player.max_hp
+            fight = RealtimeFight(game, Enemy.generate(game.player.level, "Normal", rng=game.rng), render=False)
+            outcome = ticker.add(fight)
+            while not outcome.done():
+                await asyncio.sleep(rng.uniform(0.1, 0.6))
+                fight.command(rng.choice("1112233"))
+            game.effects.clear()
+            finished += 1
+
+    games = [Game(seed=rng.randrange(2 ** 32)) for _ in range(fight_count)]
+    arenas = [asyncio.ensure_future(arena(game)) for game in games]
+    await asyncio.sleep(seconds)
+    # Stop at the deadline rather than letting the fights in progress play out, so no tick after it is counted
+    ticker.cancel()
+    for task in arenas:
+        task.cancel()
+    await asyncio.gather(*arenas, return_exceptions=True)
+    return ticker, finished
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure the real-time tick loop with many concurrent bot fights.")
+    parser.add_argument("--fights", type=int, default=1000, help="Fights running at the same time.")
+    parser.add_argument("--seconds", type=float, default=10.0, help="How long to run.")
+    parser.add_argument("--rate", type=int, default=DEFAULT_TICK_RATE, help="Ticks per second.")
+    parser.add_argument("--max-overrun-ratio", type=float, default=DEFAULT_MAX_OVERRUN_RATIO,
+                        help="Share of ticks that may overrun their budget.")
+    parser.add_argument("--no-manage-gc", action="store_true", help="Leave garbage collection to run as usual.")
+    parser.add_argument("--seed", type=int, help="Seed for the bots and games.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # Combat messages are not needed, only the cost of producing them
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        ticker, finished = asyncio.run(_benchmark(args.fights, args.seconds, args.rate, args.seed,
+                                                  not args.no_manage_gc))
+    budget = ticker.period * 1000
+    print(f"{ticker.ticks} ticks at {args.rate}/s with {args.fights} concurrent fights, {finished} fights finished.")
+    print(f"Tick budget {budget:.1f} ms, mean {ticker.busy / max(ticker.ticks, 1) * 1000:.2f} ms, "
+          f"worst {ticker.worst * 1000:.2f} ms.")
+    print(f"{ticker.overruns} tick(s) overran the budget, {ticker.skipped} tick(s) skipped.")
+    for overrun in ticker.recent_overruns:
+        print(f"  tick {overrun.tick}: {overrun.elapsed * 1000:.2f} ms")
+    sys.exit(1 if ticker.overruns > ticker.ticks * args.max_overrun_ratio else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# replay.py
+
+import hashlib
+import os
+import zlib
+from collections import namedtuple
+
+from utils import Console, add_input_listener, remove_input_listener, use_console
+
+# Replay file layout (zlib-compressed):
+#   MAGIC, version byte, varint seed, flags byte (version 2 on), then a stream of tagged records:
+#   TAG_NUMBER  zigzag varint delta from the previous numeric input
+#   TAG_TEXT    varint length + UTF-8 bytes
+#   TAG_CHECK   varint inputs since the previous checkpoint + 8-byte state hash
+MAGIC = b"RSRP"
+VERSION = 2
+FLAG_ENDLESS = 1  # The game was started with endless=True
+TAG_NUMBER = 1
+TAG_TEXT = 2
+TAG_CHECK = 3
+HASH_SIZE = 8
+
+DEFAULT_CHECKPOINT_INTERVAL = 16
+
+ReplayResult = namedtuple("ReplayResult", ["inputs", "checkpoints", "outcome"])
+
+
+class ReplayDivergence(Exception):
+    """Raised when a replayed session no longer matches the recorded state."""
+
+
+def state_hash(game):
+    """
+    Hash the parts of the game state that a replay must reproduce, including the RNG.
+
+    Args:
+        game (Game): The game to hash.
+
+    Returns:
+        bytes: An 8-byte digest.
+    """
+    digest = hashlib.blake2b(digest_size=HASH_SIZE)
+    digest.update(repr((
+        game.player,
+        game.current_dungeon_level,
+        game.final_boss_defeated,
+        game.overworld_explorations,
+    )).encode())
+    digest.update(repr(game.rng.getstate()).encode())
+    return digest.digest()
+
+
+def _write_varint(out, value):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+def _is_plain_number(line):
+    # Only lines that survive a str(int(...)) round trip can be stored as numbers
+    return line.isascii() and line.isdigit() and str(int(line)) == line
+
+
+def encode_replay(seed, events, endless=False):
+    """
+    Encode a session as replay bytes.
+
+    Args:
+        seed (int): The game seed.
+        events (list): ("input", line) and ("check", state_hash) tuples in order.
+        endless (bool): Whether the game was started in endless mode.
+
+    Returns:
+        bytes: The compressed replay.
+    """
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    _write_varint(out, seed)
+    out.append(FLAG_ENDLESS if endless else 0)
+    previous_number = 0
+    since_check = 0
+    for kind, value in events:
+        if kind == "input":
+            since_check += 1
+            if _is_plain_number(value):
+                number = int(value)
+                out.append(TAG_NUMBER)
+                _write_varint(out, _zigzag(number - previous_number))
+                previous_number = number
+            else:
+                raw = value.encode("utf-8")
+                out.append(TAG_TEXT)
+                _write_varint(out, len(raw))
+                out += raw
+        else:
+            out.append(TAG_CHECK)
+            _write_varint(out, since_check)
+            out += value
+            since_check = 0
+    return zlib.compress(bytes(out), 9)
+
+
+def decode_replay(blob):
+    """
+    Decode replay bytes produced by encode_replay().
+
+    Returns:
+        tuple: (seed, inputs, checkpoints, endless) where checkpoints maps an input index
+        to the state hash expected before that input is read, and endless tells whether
+        the game was started in endless mode.
+    """
+    data = zlib.decompress(blob)
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a Rogue Slayer replay file.")
+    version = data[len(MAGIC)]
+    if version not in (1, VERSION):
+        raise ValueError(f"Unsupported replay version {version}.")
+    seed, pos = _read_varint(data, len(MAGIC) + 1)
+    flags = 0
+    if version >= 2:
+        flags = data[pos]
+        pos += 1
+    inputs = []
+    checkpoints = {}
+    previous_number = 0
+    check_index = 0
+    while pos < len(data):
+        tag = data[pos]
+        pos += 1
+        if tag == TAG_NUMBER:
+            delta, pos = _read_varint(data, pos)
+            previous_number += _unzigzag(delta)
+            inputs.append(str(previous_number))
+        elif tag == TAG_TEXT:
+            length, pos = _read_varint(data, pos)
+            inputs.append(data[pos:pos + length].decode("utf-8"))
+            pos += length
+        elif tag == TAG_CHECK:
+            count, pos = _read_varint(data, pos)
+            check_index += count
+            checkpoints[check_index] = bytes(data[pos:pos + HASH_SIZE])
+            pos += HASH_SIZE
+        else:
+            raise ValueError(f"Corrupt replay file: unknown record tag {tag}.")
+    return seed, inputs, checkpoints, bool(flags & FLAG_ENDLESS)
+
+
+class ReplayRecorder:
+    """
+    Record the seed and every line of input of a session, with periodic state hashes.
+
+    The hash is taken just before an input is consumed, so the replayer can check it
+    at the same point.
+    """
+
+    def __init__(self, game, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.game = game
+        self.seed = game.seed
+        self.endless = game.endless
+        self.checkpoint_interval = checkpoint_interval
+        self.events = []
+        self.input_count = 0
+
+    def start(self):
+        add_input_listener(self.on_input)
+
+    def stop(self):
+        remove_input_listener(self.on_input)
+
+    def on_input(self, line):
+        # Listeners run after the line is read but before the game acts on it
+        if self.input_count % self.checkpoint_interval == 0:
+            self.events.append(("check", state_hash(self.game)))
+        self.events.append(("input", line))
+        self.input_count += 1
+
+    def save(self, path):
+        """Write the recording to a replay file."""
+        with open(path, "wb") as f:
+            f.write(encode_replay(self.seed, self.events, self.endless))
+
+
+def replay_session(blob, game_factory=None):
+    """
+    Re-run a recorded session headless, as fast as possible, checking every checkpoint.
+
+    Args:
+        blob (bytes): The replay file contents.
+        game_factory (callable): Builds a Game from a seed and the recorded endless flag
+            (passed as endless=); defaults to Game.
+
+    Returns:
+        ReplayResult: Inputs consumed, checkpoints verified and how the session ended
+        ("exit" when the game quit, "end of input" when the recording ran out).
+
+    Raises:
+        ReplayDivergence: If a checkpoint hash does not match.
+    """
+    if game_factory is None:
+        from game import Game
+        game_factory = Game
+    seed, inputs, checkpoints, endless = decode_replay(blob)
+    game = game_factory(seed, endless=endless)
+    position = 0
+    verified = 0
+
+    def next_input(prompt=""):
+        nonlocal position, verified
+        if position in checkpoints:
+            if state_hash(game) != checkpoints[position]:
+                raise ReplayDivergence(f"State diverged before input #{position}.")
+            verified += 1
+        if position >= len(inputs):
+            raise EOFError("Replay input exhausted.")
+        line = inputs[position]
+        position += 1
+        return line
+
+    try:
+        with open(os.devnull, "w", encoding="utf-8") as devnull, \
+                use_console(Console(next_input, devnull, headless=True)):
+            game.start()
+        outcome = "finished"
+    except SystemExit:
+        outcome = "exit"
+    except EOFError:
+        outcome = "end of input"
+    return ReplayResult(position, verified, outcome)
+
+
+def replay_file(path, game_factory=None):
+    """Replay a session stored at path. See replay_session()."""
+    with open(path, "rb") as f:
+        return replay_session(f.read(), game_factory)
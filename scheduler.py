@@ -0,0 +1,83 @@
+# scheduler.py
+
+import heapq
+
+BASE_SPEED = 100
+# Time one action takes at BASE_SPEED; faster combatants act again sooner
+ACTION_TIME = 1000
+
+
+def action_delay(speed):
+    return ACTION_TIME * BASE_SPEED / speed
+
+
+class TurnScheduler:
+    """
+    Speed-based initiative on a priority queue.
+
+    Each combatant is queued at the time of its next action; the one with the earliest
+    time acts next (ties go to whoever was added first). Every operation is O(log n).
+    Changing a combatant's speed reschedules its pending action, so haste and slow
+    change when it acts rather than what it does.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self._heap = []  # (time, order, combatant, version)
+        self._entries = {}  # combatant -> [next_time, speed, order, version]
+        self._order = 0
+
+    def add(self, combatant, speed=BASE_SPEED):
+        """Add a combatant; its first action comes one action delay from now."""
+        self._order += 1
+        entry = [self.now + action_delay(speed), speed, self._order, 0]
+        self._entries[combatant] = entry
+        heapq.heappush(self._heap, (entry[0], entry[2], combatant, entry[3]))
+
+    def remove(self, combatant):
+        """Remove a combatant; its queued action is skipped lazily."""
+        self._entries.pop(combatant, None)
+
+    def __contains__(self, combatant):
+        return combatant in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def speed(self, combatant):
+        return self._entries[combatant][1]
+
+    def set_speed(self, combatant, speed):
+        """Change a combatant's speed, scaling the time left until its next action."""
+        entry = self._entries[combatant]
+        remaining = (entry[0] - self.now) * entry[1] / speed
+        entry[0] = self.now + remaining
+        entry[1] = speed
+        entry[3] += 1  # The old heap item is now stale
+        heapq.heappush(self._heap, (entry[0], entry[2], combatant, entry[3]))
+
+    def copy(self):
+        clone = TurnScheduler()
+        clone.now = self.now
+        clone._heap = list(self._heap)
+        clone._entries = {combatant: list(entry) for combatant, entry in self._entries.items()}
+        clone._order = self._order
+        return clone
+
+    def upcoming(self, count):
+        """Return who acts in each of the next count actions, without advancing time."""
+        clone = self.copy()
+        return [clone.next() for _ in range(count)]
+
+    def next(self):
+        """Advance time to the next action and return who acts."""
+        while self._heap:
+            time, order, combatant, version = heapq.heappop(self._heap)
+            entry = self._entries.get(combatant)
+            if entry is None or entry[3] != version:
+                continue
+            self.now = time
+            entry[0] = time + action_delay(entry[1])
+            heapq.heappush(self._heap, (entry[0], order, combatant, version))
+            return combatant
+        raise IndexError("No combatants scheduled.")
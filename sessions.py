@@ -0,0 +1,167 @@
+# sessions.py
+
+import os
+import pickle
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+DEFAULT_MAX_RESIDENT = 64
+SESSION_SUFFIX = ".session"
+
+
+class SessionNotFound(KeyError):
+    """Raised when a session id is neither resident nor hibernated."""
+
+
+class SessionManager:
+    """
+    Keep many game sessions with a cap on how many stay in memory.
+
+    Sessions are kept in LRU order. Once more than max_resident are loaded, the least
+    recently used idle ones are pickled to disk and dropped; get() and session() load a
+    hibernated session back transparently. Sessions checked out with session() are never
+    hibernated while in use.
+
+    Only a game at rest can be hibernated: the state of a game being played with
+    Game.start() lives on that call's stack, so such a game must stay checked out for as
+    long as it runs. Hibernation suits games driven a step at a time under short
+    checkouts (e.g. a party expedition or a market visit); nothing here loads a session
+    when its player sends input, which is up to the caller.
+    """
+
+    def __init__(self, directory, max_resident=DEFAULT_MAX_RESIDENT, game_factory=None, history=None, market=None):
+        if game_factory is None:
+            from game import Game
+            game_factory = Game
+        self.directory = directory
+        self.max_resident = max_resident
+        self.game_factory = game_factory
+        self.history = history  # Reattached to sessions when they are loaded
+        self.market = market  # Shared Market every session trades in, if any
+        self._resident = OrderedDict()  # session_id -> Game, least recently used first
+        self._in_use = {}  # session_id -> number of open checkouts
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id):
+        return os.path.join(self.directory, f"{session_id}{SESSION_SUFFIX}")
+
+    def create(self, session_id, **kwargs):
+        """Start a new session and return its Game."""
+        with self._lock:
+            if session_id in self:
+                raise ValueError(f"Session {session_id!r} already exists.")
+            game = self.game_factory(history=self.history, **kwargs)
+            game.market = self.market
+            game.market_id = session_id
+            self._resident[session_id] = game
+            self._evict()
+            return game
+
+    def get(self, session_id):
+        """Return a session's Game, loading it from disk if it was hibernated."""
+        with self._lock:
+            game = self._resident.get(session_id)
+            if game is None:
+                game = self._load(session_id)
+                self._resident[session_id] = game
+            self._resident.move_to_end(session_id)
+            self._evict()
+            return game
+
+    @contextmanager
+    def session(self, session_id):
+        """Check out a session for the duration of a block; it cannot be hibernated meanwhile."""
+        with self._lock:
+            self._in_use[session_id] = self._in_use.get(session_id, 0) + 1
+            try:
+                game = self.get(session_id)
+            except Exception:
+                self._release(session_id)
+                raise
+        try:
+            yield game
+        finally:
+            with self._lock:
+                self._release(session_id)
+                self._evict()
+
+    def _release(self, session_id):
+        count = self._in_use[session_id] - 1
+        if count:
+            self._in_use[session_id] = count
+        else:
+            del self._in_use[session_id]
+
+    def hibernate(self, session_id):
+        """Write a resident, idle session to disk and drop it from memory."""
+        with self._lock:
+            if session_id in self._in_use:
+                raise RuntimeError(f"Session {session_id!r} is in use.")
+            game = self._resident.pop(session_id, None)
+            if game is not None:
+                self._save(session_id, game)
+
+    def hibernate_all(self):
+        """Hibernate every idle session, e.g. before shutting down."""
+        with self._lock:
+            for session_id in [sid for sid in self._resident if sid not in self._in_use]:
+                self.hibernate(session_id)
+
+    def remove(self, session_id):
+        """Forget a session, in memory and on disk, along with its overworld store."""
+        with self._lock:
+            game = self._resident.pop(session_id, None)
+            if game is None:
+                try:
+                    game = self._load(session_id)
+                except SessionNotFound:
+                    return
+            game.overworld.discard()
+            try:
+                os.remove(self._path(session_id))
+            except FileNotFoundError:
+                pass
+
+    def __contains__(self, session_id):
+        return session_id in self._resident or os.path.exists(self._path(session_id))
+
+    @property
+    def resident_count(self):
+        return len(self._resident)
+
+    def _evict(self):
+        if len(self._resident) <= self.max_resident:
+            return
+        for session_id in list(self._resident):
+            if len(self._resident) <= self.max_resident:
+                break
+            if session_id not in self._in_use:
+                self._save(session_id, self._resident.pop(session_id))
+
+    def _save(self, session_id, game):
+        if self.market is not None:
+            # The session is idle, so its player has every market change made so far
+            game.market_sequence = self.market.sequence
+        path = self._path(session_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(pickle.dumps(game, pickle.HIGHEST_PROTOCOL)))
+        os.replace(tmp_path, path)
+        if self.market is not None:
+            self.market.player_saved(session_id, game.market_sequence)
+
+    def _load(self, session_id):
+        try:
+            with open(self._path(session_id), "rb") as f:
+                game = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            raise SessionNotFound(session_id) from None
+        game.history = self.history
+        game.market = self.market
+        if self.market is not None:
+            # Escrow taken or deliveries made after this save (e.g. before a crash)
+            self.market.restore_player(session_id, game.player, game.market_sequence)
+        return game
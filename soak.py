@@ -0,0 +1,212 @@
+# soak.py
+
+import argparse
+import gc
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import traceback
+import tracemalloc
+from collections import namedtuple
+
+from utils import Console, use_console
+
+DEFAULT_TURNS = 1_000_000
+DEFAULT_INTERVAL = 50_000  # Turns between samples
+DEFAULT_WARMUP = 1  # Samples taken before the baseline, while caches and tables fill up
+# p99 is compared as the median over this many samples: one interval's p99 depends on how
+# many advisor hints and dungeon builds it happened to hit
+LATENCY_WINDOW = 3
+DEFAULT_MAX_MEMORY_GROWTH = 8 * 1024 * 1024  # Bytes over the baseline
+DEFAULT_MAX_P99_RATIO = 2.0  # Allowed p99 latency relative to the baseline interval
+ADVISOR_BUDGET = 0.001  # The in-combat hint would otherwise search for 50 ms per request
+TOP_ALLOCATIONS = 10  # Allocation sites listed when memory grew too much
+
+# Only well-formed input: the soak looks for growth over time, not for input crashes (see fuzz.py)
+SOAK_INPUTS = [str(n) for n in range(10)] + ["", "y", "n"]
+# Long menus (the shop lists every item) put "Return" past 9; without these a run gets stuck there
+LONG_MENU_INPUTS = [str(n) for n in range(10, 25)]
+LONG_MENU_RATE = 0.2
+
+Sample = namedtuple("Sample", ["turns", "games", "memory", "p50", "p99"])
+
+
+class SoakFinished(Exception):
+    """Raised from the input source once the soak has played all its turns."""
+
+
+class LatencyHistogram:
+    """
+    Latency counts in logarithmic buckets.
+
+    Memory stays constant however many turns are recorded; percentiles are accurate to
+    one bucket, about 9% with 8 buckets per doubling.
+    """
+
+    BUCKETS_PER_DOUBLING = 8
+
+    def __init__(self):
+        self.counts = {}  # bucket -> count
+        self.total = 0
+
+    def add(self, nanoseconds):
+        bucket = int(math.log2(max(nanoseconds, 1)) * self.BUCKETS_PER_DOUBLING)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+
+    def percentile(self, q):
+        """Return the upper bound, in nanoseconds, of the bucket holding the q-th percentile."""
+        if not self.total:
+            return 0
+        rank = math.ceil(self.total * q / 100)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return 2 ** ((bucket + 1) / self.BUCKETS_PER_DOUBLING)
+        return 0
+
+
+class Soak:
+    """
+    Play one long headless session of random input, across as many runs as it takes.
+
+    A "turn" is one read of player input, and its latency is the time the game spent
+    between two reads. Every interval the soak takes a Sample: memory traced by
+    tracemalloc after a full collection, plus the p50 and p99 latency of that interval.
+    The first LATENCY_WINDOW samples after warm-up are the baseline. The soak fails if
+    memory grows more than max_memory_growth bytes over it, or if the median p99 of the
+    latest LATENCY_WINDOW samples reaches max_p99_ratio times the baseline's.
+    """
+
+    def __init__(self, turns=DEFAULT_TURNS, interval=DEFAULT_INTERVAL, warmup=DEFAULT_WARMUP,
+                 max_memory_growth=DEFAULT_MAX_MEMORY_GROWTH, max_p99_ratio=DEFAULT_MAX_P99_RATIO, seed=None):
+        self.turns = turns
+        self.interval = interval
+        self.warmup = warmup
+        self.max_memory_growth = max_memory_growth
+        self.max_p99_ratio = max_p99_ratio
+        self.rng = random.Random(seed)
+        self.samples = []
+        self.failures = []
+        self.crashes = 0
+        self.games = 0
+        self.played = 0
+        self._histogram = LatencyHistogram()
+        self._last_read = None
+        self._baseline = None
+        self._baseline_snapshot = None
+
+    def _next_input(self, prompt=""):
+        now = time.perf_counter_ns()
+        if self._last_read is not None:
+            self._histogram.add(now - self._last_read)
+        self.played += 1
+        if self.played % self.interval == 0:
+            self._sample()
+        if self.played >= self.turns:
+            raise SoakFinished()
+        line = self.rng.choice(LONG_MENU_INPUTS if self.rng.random() < LONG_MENU_RATE else SOAK_INPUTS)
+        # Sampling and choosing input are not part of the next turn
+        self._last_read = time.perf_counter_ns()
+        return line
+
+    def _sample(self):
+        gc.collect()
+        memory = tracemalloc.get_traced_memory()[0]
+        sample = Sample(self.played, self.games, memory,
+                        self._histogram.percentile(50), self._histogram.percentile(99))
+        self.samples.append(sample)
+        self._histogram = LatencyHistogram()
+        if len(self.samples) == self.warmup + LATENCY_WINDOW:
+            self._baseline = sample._replace(p99=self._window_p99())
+            self._baseline_snapshot = tracemalloc.take_snapshot()
+        elif self._baseline is not None:
+            self._check(sample)
+        self.report(sample)
+
+    def _check(self, sample):
+        growth = sample.memory - self._baseline.memory
+        if growth > self.max_memory_growth:
+            top = tracemalloc.take_snapshot().compare_to(self._baseline_snapshot, "lineno")[:TOP_ALLOCATIONS]
+            self.failures.append(f"Memory grew by {growth / 1024:.0f} KiB after {sample.turns} turns:\n"
+                                 + "\n".join(f"  {stat}" for stat in top))
+        p99 = self._window_p99()
+        if p99 > self._baseline.p99 * self.max_p99_ratio:
+            self.failures.append(f"p99 latency rose from {self._baseline.p99 / 1000:.0f} us to "
+                                 f"{p99 / 1000:.0f} us after {sample.turns} turns.")
+
+    def _window_p99(self):
+        return statistics.median(sample.p99 for sample in self.samples[-LATENCY_WINDOW:])
+
+    def report(self, sample):
+        print(f"{sample.turns:>10} turns {sample.games:>7} games {sample.memory / 1024:>9.0f} KiB "
+              f"p50 {sample.p50 / 1000:>7.1f} us p99 {sample.p99 / 1000:>8.1f} us", file=sys.__stdout__, flush=True)
+
+    def _new_game(self):
+        from game import Game
+        game = Game(seed=self.rng.randrange(2 ** 32))
+        game.advisor.time_budget = ADVISOR_BUDGET
+        return game
+
+    def run(self):
+        """
+        Play until the turn budget is spent.
+
+        Returns:
+            list: Failure messages; empty if memory and latency stayed within bounds.
+        """
+        tracemalloc.start()
+        try:
+            with open(os.devnull, "w", encoding="utf-8") as devnull, \
+                    use_console(Console(self._next_input, devnull, headless=True)):
+                while True:
+                    # Dying restarts inside start(); a new game is only needed after victory or Exit
+                    game = self._new_game()
+                    self.games += 1
+                    try:
+                        game.start()
+                    except SoakFinished:
+                        break
+                    except SystemExit:
+                        pass
+                    except Exception:  # Keep soaking, but a crash still fails the run
+                        self.crashes += 1
+                        self.failures.append(f"Crash after {self.played} turns:\n{traceback.format_exc()}")
+                    finally:
+                        game.overworld.close()
+        finally:
+            tracemalloc.stop()
+        return self.failures
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Soak-test Rogue Slayer for memory and latency growth.")
+    parser.add_argument("--turns", type=int, default=DEFAULT_TURNS, help="Turns (input reads) to play.")
+    parser.add_argument("--interval", type=int, default=DEFAULT_INTERVAL, help="Turns between samples.")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="Samples before the baseline.")
+    parser.add_argument("--max-memory-growth", type=int, default=DEFAULT_MAX_MEMORY_GROWTH,
+                        help="Bytes traced memory may grow over the baseline.")
+    parser.add_argument("--max-p99-ratio", type=float, default=DEFAULT_MAX_P99_RATIO,
+                        help="How many times the baseline p99 latency an interval may reach.")
+    parser.add_argument("--seed", type=int, help="Seed for a reproducible soak.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    soak = Soak(args.turns, args.interval, args.warmup, args.max_memory_growth, args.max_p99_ratio, args.seed)
+    start = time.perf_counter()
+    failures = soak.run()
+    elapsed = time.perf_counter() - start
+    print(f"{soak.played} turns over {soak.games} games in {elapsed:.1f}s, {soak.crashes} crash(es).")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# tracing.py
+
+import functools
+import json
+import os
+import threading
+import time
+
+from utils import get_input_source, set_input_source
+
+# The tracer currently recording, if any. Traced methods cost one check when it is None.
+_active_tracer = None
+
+
+def traced(category):
+    """
+    Decorator that records a span for every call of a method while a Tracer is running.
+
+    Args:
+        category (str): Trace category, e.g. "screen" or "turn".
+    """
+    def decorator(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _active_tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            tracer.begin(name, category)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracer.end()
+        return wrapper
+    return decorator
+
+
+class Tracer:
+    """
+    Record begin/end spans as Chrome trace events (chrome://tracing, Perfetto).
+
+    Time spent waiting for player input gets its own "input" spans, and every span's
+    end event reports how much of it was input wait and how much was compute and render.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._open = []  # [name, category, start_us, input_wait_us] for each open span
+        self._pid = os.getpid()
+        self._previous_source = None
+
+    @staticmethod
+    def _now():
+        return time.perf_counter_ns() // 1000
+
+    def _event(self, phase, name, category, ts, args=None):
+        event = {"name": name, "cat": category, "ph": phase, "ts": ts,
+                 "pid": self._pid, "tid": threading.get_ident()}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def start(self):
+        """Start recording spans and input waits."""
+        global _active_tracer
+        _active_tracer = self
+        self._previous_source = get_input_source()
+        set_input_source(self._traced_input)
+        self.events.append({"name": "thread_name", "ph": "M", "pid": self._pid,
+                            "tid": threading.get_ident(), "args": {"name": "game loop"}})
+
+    def stop(self):
+        """Stop recording, closing any spans still open."""
+        global _active_tracer
+        while self._open:
+            self.end()
+        if _active_tracer is self:
+            _active_tracer = None
+        set_input_source(self._previous_source)
+
+    def begin(self, name, category):
+        now = self._now()
+        self._open.append([name, category, now, 0])
+        self._event("B", name, category, now)
+
+    def end(self):
+        name, category, start, input_wait = self._open.pop()
+        now = self._now()
+        self._event("E", name, category, now, {
+            "input_wait_us": input_wait,
+            "active_us": now - start - input_wait,
+        })
+
+    def _traced_input(self, prompt=""):
+        start = self._now()
+        self._event("B", "input", "input", start)
+        try:
+            return self._previous_source(prompt)
+        finally:
+            now = self._now()
+            self._event("E", "input", "input", now)
+            for frame in self._open:
+                frame[3] += now - start
+
+    def save(self, path):
+        """Write the trace as Chrome trace-event JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
@@ -1,13 +1,203 @@
 # utils.py
 
 import os
+import sys
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
 from colorama import init, Fore, Style
-from entities import ALL_ACHIEVEMENTS
+from entities import INVENTORY_SORTS, RARITIES, all_achievements
+from effects import FORTITUDE, FORTITUDE_DEFENSE
 
 init(autoreset=True)
 
+class Console:
+    """
+    Where one session's output goes and its input comes from.
+
+    Every input and screen function below works on the current console, so sessions run
+    side by side (a party on its own thread, a replay being verified) each keep their own
+    input, type-ahead and screen, without touching the process-wide sys.stdout.
+
+    Args:
+        source (callable): Reads one line of input, called like input().
+        stream: File-like object output is written to; None for the process's stdout.
+        headless (bool): Skip terminal side effects such as clearing the screen.
+    """
+
+    def __init__(self, source=input, stream=None, headless=False):
+        self.source = source
+        self.stream = stream
+        self.headless = headless
+        self.type_ahead = deque()  # Choices typed ahead on one line (e.g. "1 1 1 2"), answering the next prompts
+        self.input_listeners = []  # Who gets to see player input (e.g. the replay recorder)
+        self.screen_listeners = []
+
+
+class _ConsoleStdout:
+    """Stand-in for sys.stdout that writes to the current console's stream, if it has one."""
+
+    def __init__(self, stdout):
+        self.stdout = stdout
+
+    def _target(self):
+        stream = _console.get().stream
+        return self.stdout if stream is None else stream
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+_console = ContextVar("console", default=Console())
+
+INVENTORY_PAGE_SIZE = 20
+SORT_LABELS = {"acquired": "order acquired", "name": "name", "rarity": "rarity", "price": "price"}
+
+def current_console():
+    """Return the console the current thread (or task) reads and writes through."""
+    return _console.get()
+
+@contextmanager
+def use_console(console):
+    """
+    Run the body with console as the current console, in this thread (or task) only.
+
+    Args:
+        console (Console): The console to use.
+    """
+    if console.stream is not None and not isinstance(sys.stdout, _ConsoleStdout):
+        sys.stdout = _ConsoleStdout(sys.stdout)
+    token = _console.set(console)
+    try:
+        yield console
+    finally:
+        _console.reset(token)
+
+def output_stream():
+    """Return the stream the current console writes to, under any stand-in for sys.stdout."""
+    stream = _console.get().stream
+    if stream is not None:
+        return stream
+    return sys.stdout.stdout if isinstance(sys.stdout, _ConsoleStdout) else sys.stdout
+
+def set_output_stream(stream):
+    """
+    Send the current console's output to stream.
+
+    Args:
+        stream: File-like object; None for the process's stdout.
+    """
+    if stream is not None and not isinstance(sys.stdout, _ConsoleStdout):
+        sys.stdout = _ConsoleStdout(sys.stdout)
+    _console.get().stream = stream
+
+def set_input_source(source):
+    """
+    Replace the function used to read player input.
+
+    Args:
+        source (callable): Called with the prompt, returns one line. None restores input().
+    """
+    console = _console.get()
+    console.source = source if source is not None else input
+    console.type_ahead.clear()
+
+def get_input_source():
+    """Return the function currently used to read player input."""
+    return _console.get().source
+
+def add_input_listener(listener):
+    """Register a callable that is passed every line of player input as it is read."""
+    _console.get().input_listeners.append(listener)
+
+def remove_input_listener(listener):
+    """Unregister a listener added with add_input_listener."""
+    listeners = _console.get().input_listeners
+    if listener in listeners:
+        listeners.remove(listener)
+
+def read_input(prompt=""):
+    """
+    Read one choice of player input. All game input goes through here.
+
+    A line may hold several choices separated by spaces ("1 1 1 2"): the first is
+    returned and the rest answer the following prompts without another read, so a remote
+    player can send a run of actions in one round trip. Listeners get each line as it was
+    read, so a replay splits it the same way.
+
+    Args:
+        prompt (str): The prompt to show.
+
+    Returns:
+        str: The choice entered ("" for a blank line).
+    """
+    console = _console.get()
+    type_ahead = console.type_ahead
+    if type_ahead:
+        choice = type_ahead.popleft()
+        print(f"{prompt}{choice}")
+        return choice
+    line = console.source(prompt)
+    for listener in list(console.input_listeners):
+        listener(line)
+    type_ahead.extend(line.split())
+    return type_ahead.popleft() if type_ahead else ""
+
+def read_line(prompt=""):
+    """
+    Read a whole line of player input, spaces included, for free text such as a name.
+
+    Unlike read_input() the line is not split into choices, so choices typed ahead are
+    dropped first: the line must be read fresh, not taken from an earlier one.
+
+    Args:
+        prompt (str): The prompt to show.
+
+    Returns:
+        str: The line entered.
+    """
+    console = _console.get()
+    console.type_ahead.clear()
+    line = console.source(prompt)
+    for listener in list(console.input_listeners):
+        listener(line)
+    return line
+
+def has_type_ahead():
+    """Return True if choices typed ahead are still waiting to be used."""
+    return bool(_console.get().type_ahead)
+
+def clear_type_ahead():
+    """Drop choices typed ahead, e.g. after an invalid one: the rest were meant for screens that did not come."""
+    _console.get().type_ahead.clear()
+
+def add_screen_listener(listener):
+    """Register a callable that is called (with no arguments) whenever the screen is cleared."""
+    _console.get().screen_listeners.append(listener)
+
+def remove_screen_listener(listener):
+    """Unregister a listener added with add_screen_listener."""
+    listeners = _console.get().screen_listeners
+    if listener in listeners:
+        listeners.remove(listener)
+
+def set_headless(headless):
+    """Turn terminal side effects (like clearing the screen) off or on."""
+    _console.get().headless = headless
+
 def clear_screen():
     """Clear the terminal screen."""
+    console = _console.get()
+    for listener in list(console.screen_listeners):
+        listener()
+    if console.headless:
+        return
     os.system('cls' if os.name == 'nt' else 'clear')
 
 def display_hud(player):
@@ -53,16 +243,39 @@ def get_player_choice(options):
             option_color = Fore.WHITE
         print(f"{Fore.WHITE}{idx}. {option_color}{option}{Style.RESET_ALL}")
     while True:
-        choice = input("Choose an action: ")
-        if choice.isdigit():
+        choice = read_input("Choose an action: ")
+        if choice.isascii() and choice.isdigit():
             choice_int = int(choice)
             if 1 <= choice_int <= len(options):
                 return choice_int
         print(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}")
+        clear_type_ahead()
 
 def press_enter_to_continue():
-    """Prompt the player to press Enter to continue."""
-    input(f"\n{Fore.GREEN}Press Enter to continue...{Style.RESET_ALL}")
+    """Prompt the player to press Enter to continue, unless they already typed ahead."""
+    if has_type_ahead():
+        return
+    read_input(f"\n{Fore.GREEN}Press Enter to continue...{Style.RESET_ALL}")
+
+def get_quantity(maximum, prompt="How many"):
+    """
+    Ask for a quantity between 1 and maximum; skips the question when only one is possible.
+
+    Args:
+        maximum (int): The largest quantity allowed.
+        prompt (str): The question to ask.
+
+    Returns:
+        int: The chosen quantity, or 0 if the player cancels.
+    """
+    if maximum <= 1:
+        return maximum
+    while True:
+        choice = read_input(f"{prompt}? (1-{maximum}, 0 to cancel): ")
+        if choice.isascii() and choice.isdigit() and 0 <= int(choice) <= maximum:
+            return int(choice)
+        print(f"{Fore.RED}Invalid quantity. Please try again.{Style.RESET_ALL}")
+        clear_type_ahead()
 
 def display_message(message, color=Fore.WHITE):
     """
@@ -74,196 +287,278 @@ def display_message(message, color=Fore.WHITE):
     """
     print(f"{color}{message}{Style.RESET_ALL}")
 
-def display_inventory(player):
-    """Display the player's inventory and handle item interactions."""
+def display_inventory(player, effects, equip_best=None):
+    """
+    Display the player's inventory a page at a time and handle item interactions.
+
+    Items are chosen by their number on the page shown. The list can be filtered by type,
+    rarity or the start of the name, and sorted; pages come from the inventory's
+    maintained views (Inventory.page), so showing one costs the same however much is held.
+
+    Args:
+        player (Player): The player object.
+        effects (EffectEngine): The game's status effects.
+        equip_best (callable): Wears the best gear, offered as "B" if given.
+    """
+    inventory = player.inventory
+    page = 0
+    item_type = rarity = None
+    prefix = ""
+    sort = INVENTORY_SORTS[0]
     while True:
         clear_screen()
         display_message("--- Inventory --- 📦", Fore.CYAN)
-        if player.inventory.items:
-            for idx, item in enumerate(player.inventory.items, 1):
-                equipped = ""
-                if player.inventory.equipped_weapon == item:
-                    equipped = f" {Fore.GREEN}(Equipped as Weapon){Style.RESET_ALL}"
-                elif player.inventory.equipped_armor == item:
-                    equipped = f" {Fore.GREEN}(Equipped as Armor){Style.RESET_ALL}"
-                print(f"{idx}. {item.emoji()} {item.name} - {item.description}{equipped}")
-        else:
-            display_message("Your inventory is empty.", Fore.YELLOW)
+        entries, total = inventory.page(page, INVENTORY_PAGE_SIZE, item_type, rarity, prefix, sort)
+        pages = max(1, -(-total // INVENTORY_PAGE_SIZE))
+        if page >= pages:  # Items left the last page
+            page = pages - 1
+            entries, total = inventory.page(page, INVENTORY_PAGE_SIZE, item_type, rarity, prefix, sort)
+        filtered = item_type or rarity or prefix
+        if filtered or sort != INVENTORY_SORTS[0] or pages > 1:
+            shown = [item_type.capitalize() if item_type else "All items"]
+            if rarity:
+                shown.append(rarity.capitalize())
+            if prefix:
+                shown.append(f"names starting with '{prefix}'")
+            sort_label = SORT_LABELS["name" if prefix else sort]
+            display_message(f"{', '.join(shown)} | sorted by {sort_label} | page {page + 1}/{pages} ({total})",
+                            Fore.CYAN)
+        for idx, entry in enumerate(entries, 1):
+            item = entry.item
+            count = f" x{entry.count}" if entry.count > 1 else ""
+            equipped = ""
+            if inventory.equipped_weapon is item:
+                equipped = f" {Fore.GREEN}(Equipped as Weapon){Style.RESET_ALL}"
+            elif inventory.equipped_armor is item:
+                equipped = f" {Fore.GREEN}(Equipped as Armor){Style.RESET_ALL}"
+            print(f"{idx}. {item.emoji()} {item.name}{count} - {item.description}{equipped}")
+        if not entries:
+            display_message("No items match." if filtered else "Your inventory is empty.", Fore.YELLOW)
+        print("\nN/P. Next/previous page | T. Type | R. Rarity | F. Find by name | S. Sort | C. Clear filters")
+        if equip_best is not None:
+            print("B. Equip best gear ⚔️")
         print("\n0. Return to main menu")
-        choice = input("Choose an item to equip/use/sell or return: ")
+        choice = read_input("Choose an item to equip/use/sell or return: ")
+        command = choice.lower()
         if choice == '0':
             return
-        elif choice.isdigit() and 1 <= int(choice) <= len(player.inventory.items):
-            selected_item = player.inventory.items[int(choice)-1]
-            equip_or_use_or_sell_menu(player, selected_item)
+        elif command == 'n' and page + 1 < pages:
+            page += 1
+        elif command == 'p' and page > 0:
+            page -= 1
+        elif command == 't':
+            types = sorted(t for t in inventory.type_counts if inventory.count_type(t))
+            selected = get_player_choice([t.capitalize() for t in types] + ["Any type"])
+            item_type = types[selected - 1] if selected <= len(types) else None
+            page = 0
+        elif command == 'r':
+            selected = get_player_choice([r.capitalize() for r in RARITIES] + ["Any rarity"])
+            rarity = RARITIES[selected - 1] if selected <= len(RARITIES) else None
+            page = 0
+        elif command == 'f':
+            prefix = read_line("Name starts with (blank for any): ").strip()
+            page = 0
+        elif command == 's':
+            sort = INVENTORY_SORTS[(INVENTORY_SORTS.index(sort) + 1) % len(INVENTORY_SORTS)]
+            page = 0
+        elif command == 'c':
+            item_type = rarity = None
+            prefix = ""
+            sort = INVENTORY_SORTS[0]
+            page = 0
+        elif equip_best is not None and command == 'b':
+            equip_best()
+            press_enter_to_continue()
+        elif choice.isascii() and choice.isdigit() and 1 <= int(choice) <= len(entries):
+            selected_item = entries[int(choice)-1].item
+            equip_or_use_or_sell_menu(player, selected_item, effects)
         else:
             display_message(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}", Fore.RED)
+            clear_type_ahead()
             press_enter_to_continue()
 
-def equip_or_use_or_sell_menu(player, item):
+def equip_or_use_or_sell_menu(player, item, effects):
     """
     Provide options to equip, use, or sell the selected item based on its type.
     
     Args:
         player (Player): The player object.
         item (Item): The selected item.
+        effects (EffectEngine): The game's status effects.
     """
     display_message(f"\nSelected: {item.emoji()} {item.name}", Fore.CYAN)
     if item.type == "weapon":
         print("1. Equip as Weapon 🗡️")
-        print("2. Sell Item 💰")
+        print("2. Sell Item(s) 💰")
         print("3. Return to Inventory ↩️")
-        choice = input("Choose an action: ")
+        choice = read_input("Choose an action: ")
         if choice == '1':
-            if player.inventory.equipped_weapon:
-                player.attack -= player.inventory.equipped_weapon.attack_bonus
-                display_message(f"Unequipped {player.inventory.equipped_weapon.name} from Weapon slot.", Fore.YELLOW)
-            player.inventory.equipped_weapon = item
-            player.attack += item.attack_bonus
+            previous = player.equip(item)
+            if previous:
+                display_message(f"Unequipped {previous.name} from Weapon slot.", Fore.YELLOW)
             display_message(f"Equipped {item.emoji()} {item.name} as Weapon. +{item.attack_bonus} Attack.", Fore.GREEN)
             # Achievement for equipping weapon
             player.unlock_achievement(f"Equipped {item.name} as Weapon")
         elif choice == '2':
-            player.gold += item.price
-            player.inventory.remove_item(item)
-            display_message(f"Sold {item.emoji()} {item.name} for {item.price} gold.", Fore.GREEN)
-            # Achievement for selling items
-            player.unlock_achievement(f"Sold {item.name}")
+            sell_item(player, item)
         elif choice == '3':
             return
         else:
             display_message(f"{Fore.RED}Invalid choice. Returning to inventory.{Style.RESET_ALL}", Fore.RED)
+            clear_type_ahead()
             press_enter_to_continue()
     elif item.type == "armor":
         print("1. Equip as Armor 🛡️")
-        print("2. Sell Item 💰")
+        print("2. Sell Item(s) 💰")
         print("3. Return to Inventory ↩️")
-        choice = input("Choose an action: ")
+        choice = read_input("Choose an action: ")
         if choice == '1':
-            if player.inventory.equipped_armor:
-                player.defense -= player.inventory.equipped_armor.defense_bonus
-                display_message(f"Unequipped {player.inventory.equipped_armor.name} from Armor slot.", Fore.YELLOW)
+            previous = player.equip(item)
+            if previous:
+                display_message(f"Unequipped {previous.name} from Armor slot.", Fore.YELLOW)
 
-            # Check if the item is Amulet of Vitality
-            if item.name == "Amulet of Vitality":
-                player.max_hp += 30
+            # Amulet of Vitality raises max HP while worn; the new HP comes with it
+            if item.name == "Amulet of Vitality" and previous is not item:
                 player.hp = min(player.hp + 30, player.max_hp)
                 display_message(f"\nYou feel stronger! Max HP increased by 30. ❤️", Fore.GREEN)
 
-            player.inventory.equipped_armor = item
-            player.defense += item.defense_bonus
             display_message(f"Equipped {item.emoji()} {item.name} as Armor. +{item.defense_bonus} Defense.", Fore.GREEN)
             # Achievement for equipping armor
             player.unlock_achievement(f"Equipped {item.name} as Armor")
 
         elif choice == '2':
-            player.gold += item.price
-            player.inventory.remove_item(item)
-            display_message(f"Sold {item.emoji()} {item.name} for {item.price} gold.", Fore.GREEN)
-            # Achievement for selling items
-            player.unlock_achievement(f"Sold {item.name}")
+            sell_item(player, item)
         elif choice == '3':
             return
         else:
             display_message(f"{Fore.RED}Invalid choice. Returning to inventory.{Style.RESET_ALL}", Fore.RED)
+            clear_type_ahead()
             press_enter_to_continue()
     elif item.type == "consumable":
         print("1. Use Item 🍎")
-        print("2. Sell Item 💰")
+        print("2. Sell Item(s) 💰")
         print("3. Return to Inventory ↩️")
-        choice = input("Choose an action: ")
+        choice = read_input("Choose an action: ")
         if choice == '1':
-            use_consumable(player, item)
+            quantity = get_quantity(player.inventory.count(item), "Use how many")
+            if quantity:
+                use_consumable(player, item, effects, quantity)
         elif choice == '2':
-            player.gold += item.price
-            player.inventory.remove_item(item)
-            display_message(f"Sold {item.emoji()} {item.name} for {item.price} gold.", Fore.GREEN)
-            # Achievement for selling consumables
-            player.unlock_achievement(f"Sold {item.name}")
+            sell_item(player, item)
         elif choice == '3':
             return
         else:
             display_message(f"{Fore.RED}Invalid choice. Returning to inventory.{Style.RESET_ALL}", Fore.RED)
+            clear_type_ahead()
             press_enter_to_continue()
     elif item.type == "key":
-        print("1. Sell Key 💰")
+        print("1. Sell Key(s) 💰")
         print("2. Return to Inventory ↩️")
-        choice = input("Choose an action: ")
+        choice = read_input("Choose an action: ")
         if choice == '1':
-            player.gold += item.price
-            player.keys -= 1
-            player.inventory.remove_item(item)
-            display_message(f"Sold {item.emoji()} {item.name} for {item.price} gold.", Fore.GREEN)
-            # Achievement for selling keys
-            player.unlock_achievement(f"Sold {item.name}")
+            sell_item(player, item)
         elif choice == '2':
             return
         else:
             display_message(f"{Fore.RED}Invalid choice. Returning to inventory.{Style.RESET_ALL}", Fore.RED)
+            clear_type_ahead()
             press_enter_to_continue()
     else:
         print(f"{Fore.RED}Unknown item type. Returning to inventory.{Style.RESET_ALL}")
         press_enter_to_continue()
 
-def use_consumable(player, item):
+def sell_item(player, item):
     """
-    Apply the effects of a consumable item.
+    Sell one or more of an item at its price, asking how many when more than one is held.
+
+    Args:
+        player (Player): The player object.
+        item (Item): The item to sell.
+    """
+    quantity = get_quantity(player.inventory.count(item), "Sell how many")
+    if not quantity:
+        return
+    sold = player.inventory.remove_item(item, quantity)
+    player.gold += item.price * sold
+    count = f" x{sold}" if sold > 1 else ""
+    display_message(f"Sold {item.emoji()} {item.name}{count} for {item.price * sold} gold.", Fore.GREEN)
+    # Achievement for selling items
+    player.unlock_achievement(f"Sold {item.name}")
+
+def use_consumable(player, item, effects, quantity=1):
+    """
+    Apply the effects of a consumable item outside of combat, possibly several times.
     
     Args:
         player (Player): The player object.
         item (Item): The consumable item.
+        effects (EffectEngine): The game's status effects.
+        quantity (int): How many to use; stops early once another would have no effect.
     """
-    # Implement the effects of consumable items
-    if item.name in ["Health Potion", "Healing Herb"]:
+    used = 0
+    while used < quantity and _apply_consumable(player, item, effects):
+        used += 1
+    if used:
+        player.inventory.remove_item(item, used)
+        # Achievement for using consumables
+        player.unlock_achievement(f"Used {item.name}")
 
-        player.inventory.remove_item(item)  # Ensure only one item is removed after use
-            # Scale healing based on player pages
+def _apply_consumable(player, item, effects):
+    """Apply one consumable outside of combat; returns False if it has no effect and is kept."""
+    if item.name in ["Health Potion", "Healing Herb"]:
+        if player.hp >= player.max_hp:
+            display_message("\n🩸 You are already at full health.", Fore.YELLOW)
+            return False
+        heal_amount = 50 if item.name == "Health Potion" else 40
+        # Scale healing based on player pages
         heal_amount += player.pages * 2
         player.hp = min(player.hp + heal_amount, player.max_hp)
         display_message(f"\nYou used {item.emoji()} {item.name} and healed {heal_amount} HP. 🩸", Fore.GREEN)
-    elif item.name == "Bomb":
-        # Implement Bomb usage during combat
-        display_message(f"\n🧨 You used {item.emoji()} {item.name}! It deals 20 damage to the enemy. 💣", Fore.MAGENTA)
-        # The actual damage application is handled in the combat loop
-    elif item.name == "Scroll of Fireball":
-        # Implement Fireball effect
-        display_message(f"\n🔥 You used {item.emoji()} {item.name}! It deals 30 damage to all enemies. 🔥", Fore.MAGENTA)
-        # The actual damage application is handled in the combat loop
+    elif item.name in ["Bomb", "Scroll of Fireball", "Lightning Scroll", "Poison Dagger"]:
+        # These have to be used on an enemy
+        display_message(f"\n⚔️ The {item.name} can only be used on an enemy in combat.", Fore.YELLOW)
+        return False
     elif item.name == "Elixir of Fortitude":
-        # Implement temporary defense boost
-        player.defense += 5
+        # Temporary defense boost, lasting until the end of the next combat
+        effects.apply("player", player, FORTITUDE, FORTITUDE_DEFENSE)
         display_message(f"\nYou used {item.emoji()} {item.name}! Defense increased by 5 for the next combat. 🛡️", Fore.MAGENTA)
-    elif item.name == "Poison Dagger":
-        # Implement poison effect
-        poison_damage = 15 + player.pages * 1
-        player.hp -= poison_damage
-        display_message(f"\n☠️ You used {item.emoji()} {item.name}! It deals {poison_damage} poison damage over time. 🩸", Fore.MAGENTA)
     elif item.name == "Revive Potion":
-        # Implement revive effect
-        if player.hp <= 0:
-            player.hp = int(player.max_hp * 0.5)
-            display_message(f"\n🛡️ You used {item.emoji()} {item.name}! You have been revived with {player.hp} HP. 🩸", Fore.GREEN)
-        else:
+        if player.hp > 0:
             display_message(f"\n🔮 {item.name} has no effect right now.", Fore.YELLOW)
-    elif item.name == "Lightning Scroll":
-        # Implement lightning scroll effect
-        display_message(f"\n⚡ You used {item.emoji()} {item.name}! It deals 40 lightning damage to all enemies. ⚡", Fore.MAGENTA)
-        # The actual damage application is handled in the combat loop
+            return False
+        player.hp = int(player.max_hp * 0.5)
+        display_message(f"\n🛡️ You used {item.emoji()} {item.name}! You have been revived with {player.hp} HP. 🩸", Fore.GREEN)
     else:
         display_message(f"\nYou used {item.name}, but nothing happened. ❓", Fore.YELLOW)
-    # Remove the item after use
-        player.inventory.remove_item(item)  # Ensure only one item is removed after use
-    # Achievement for using consumables
-    player.unlock_achievement(f"Used {item.name}")
+    return True
 
 def display_achievements(player):
     """Display the list of achievements, showing which are unlocked."""
     clear_screen()
     display_message("--- Achievements --- 🏆", Fore.CYAN)
     unlocked_names = [ach.name for ach in player.achievements]
-    for achievement in ALL_ACHIEVEMENTS:
+    for achievement in all_achievements():
         if achievement.name in unlocked_names:
             print(f"{Fore.GREEN}✔️ {achievement.name} - {achievement.description}{Style.RESET_ALL}")
         else:
             print(f"{Fore.RED}❌ {achievement.name} - {achievement.description}{Style.RESET_ALL}")
     press_enter_to_continue()
+
+def display_leaderboard(history):
+    """Display the best recorded runs."""
+    clear_screen()
+    display_message("--- Leaderboard --- 🥇", Fore.CYAN)
+    if history is None:
+        display_message("Run history is turned off.", Fore.YELLOW)
+    else:
+        runs = history.top_runs(10)
+        if not runs:
+            display_message("No finished runs yet.", Fore.YELLOW)
+        for rank, run in enumerate(runs, 1):
+            result = "🌟 Victory" if run.outcome == "victory" else (
+                f"💀 Slain by {run.death_cause}" if run.outcome == "death" else "🚪 Retired")
+            print(
+                f"{rank}. {run.player} - Level {run.level}, {run.pages} Page(s), "
+                f"{run.dungeons_cleared} Dungeon(s), {run.gold} Gold - {result}"
+            )
+    press_enter_to_continue()